@@ -1,6 +1,32 @@
 """Autonomous AI Marketing Agent module."""
 
+from .admission import AdmissionController, AdmissionRejectedError
+from .async_memory import AsyncAgentMemory
+from .brand import BrandContext
+from .cache import DirectoryFingerprint, ResponseCache
 from .client import AgentClient
+from .coalesce import SingleFlight
+from .executor import TaskExecutor, QueuedTask, TaskQueueFullError
+from .health import HealthMonitor
 from .memory import AgentMemory
+from .pool import SessionPool, SessionPoolTimeoutError
+from .usage import PromptCacheStats
 
-__all__ = ["AgentClient", "AgentMemory"]
+__all__ = [
+    "AdmissionController",
+    "AdmissionRejectedError",
+    "AgentClient",
+    "AgentMemory",
+    "AsyncAgentMemory",
+    "TaskExecutor",
+    "QueuedTask",
+    "TaskQueueFullError",
+    "SessionPool",
+    "SessionPoolTimeoutError",
+    "ResponseCache",
+    "DirectoryFingerprint",
+    "BrandContext",
+    "HealthMonitor",
+    "PromptCacheStats",
+    "SingleFlight",
+]
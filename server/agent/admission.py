@@ -0,0 +1,220 @@
+"""Admission control for agent runs, which each hold a CLI subprocess."""
+
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejectedError(RuntimeError):
+    """Raised when an agent run is shed instead of queued."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After value in whole seconds."""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class _Waiter:
+    def __init__(self, caller: str):
+        self.caller = caller
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.queued_at = time.monotonic()
+
+
+class AdmissionController:
+    """
+    Caps how many agent runs (and so CLI subprocesses) execute at once.
+
+    Runs over `max_concurrent` wait in a bounded queue. Waiters are kept
+    per caller and slots are handed out round-robin across callers, so a
+    burst from one caller queues behind everybody else's next request
+    rather than in front of it. Once the server is busy, a caller that
+    already has `max_per_caller` runs going or queued cannot queue more.
+
+    `max_queue_wait` is the queue-time objective: a request is rejected
+    up front when the estimated wait (from recent run durations) already
+    exceeds it, and any request still queued when it runs out is dropped.
+    Rejections carry a Retry-After estimate for a 429 response.
+    """
+
+    # Weight of the newest run in the moving average of run duration
+    DURATION_ALPHA = 0.2
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        max_queue: int = 32,
+        max_queue_wait: float = 60.0,
+        max_per_caller: int = 4,
+        initial_run_estimate: float = 30.0
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait
+        self.max_per_caller = max(1, max_per_caller)
+        self._avg_run = initial_run_estimate
+        self._running = 0
+        self._running_by_caller: dict[str, int] = {}
+        # caller -> waiters; callers are served round-robin in this order
+        self._queues: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+        self._queued = 0
+
+        # Metrics
+        self._admitted = 0
+        self._rejected_queue_full = 0
+        self._rejected_caller_limit = 0
+        self._rejected_slo = 0
+        self._timed_out = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @asynccontextmanager
+    async def slot(self, caller: str, shed: bool = True) -> AsyncGenerator[None, None]:
+        """
+        Hold a run slot for the duration of the block.
+
+        Args:
+            caller: Identity used for per-caller fairness
+            shed: Reject when overloaded; False waits however long it takes
+                (for work that was already accepted, like queued tasks)
+
+        Raises:
+            AdmissionRejectedError: If `shed` and the request was not admitted
+        """
+        await self.acquire(caller, shed)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._avg_run += self.DURATION_ALPHA * (time.monotonic() - start - self._avg_run)
+            self.release(caller)
+
+    def check(self, caller: str) -> None:
+        """
+        Raise now if a request from `caller` would be shed.
+
+        Lets endpoints that stream their response answer 429 before the
+        stream starts; the run itself still goes through slot().
+        """
+        if self._running < self.max_concurrent and not self._queued:
+            return
+        held = self._running_by_caller.get(caller, 0) + len(self._queues.get(caller, ()))
+        if held >= self.max_per_caller:
+            self._rejected_caller_limit += 1
+            raise AdmissionRejectedError(
+                f"Too many requests in progress for this caller ({held})",
+                self._estimated_wait(1)
+            )
+        if self._queued >= self.max_queue:
+            self._rejected_queue_full += 1
+            raise AdmissionRejectedError(
+                f"Server busy: {self._queued} requests already waiting",
+                self._estimated_wait(self._queued + 1)
+            )
+        estimate = self._estimated_wait(self._queued + 1)
+        if estimate > self.max_queue_wait:
+            self._rejected_slo += 1
+            raise AdmissionRejectedError(
+                f"Server busy: estimated wait {estimate:.0f}s exceeds {self.max_queue_wait:.0f}s",
+                estimate
+            )
+
+    async def acquire(self, caller: str, shed: bool = True) -> None:
+        """Wait for a run slot. Prefer slot(), which also releases it."""
+        if self._running < self.max_concurrent and not self._queued:
+            self._grant(caller, 0.0)
+            return
+        if shed:
+            self.check(caller)
+
+        waiter = _Waiter(caller)
+        self._queues.setdefault(caller, deque()).append(waiter)
+        self._queued += 1
+        try:
+            done, _ = await asyncio.wait({waiter.future}, timeout=self.max_queue_wait if shed else None)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if not done:
+            self._abandon(waiter)
+            self._timed_out += 1
+            raise AdmissionRejectedError(
+                f"Server busy: not admitted within {self.max_queue_wait:.0f}s",
+                self._estimated_wait(self._queued + 1)
+            )
+
+    def release(self, caller: str) -> None:
+        """Give back a slot taken with acquire()."""
+        self._running -= 1
+        remaining = self._running_by_caller.get(caller, 1) - 1
+        if remaining > 0:
+            self._running_by_caller[caller] = remaining
+        else:
+            self._running_by_caller.pop(caller, None)
+        self._dispatch()
+
+    def stats(self) -> dict:
+        """Get slot usage, queue and shedding metrics."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self._running,
+            "queued": self._queued,
+            "max_queue": self.max_queue,
+            "queued_callers": len(self._queues),
+            "admitted": self._admitted,
+            "rejected_queue_full": self._rejected_queue_full,
+            "rejected_caller_limit": self._rejected_caller_limit,
+            "rejected_slo": self._rejected_slo,
+            "timed_out": self._timed_out,
+            "avg_wait_ms": round(self._wait_total / self._admitted * 1000, 1) if self._admitted else None,
+            "max_wait_ms": round(self._wait_max * 1000, 1),
+            "avg_run_s": round(self._avg_run, 1),
+        }
+
+    def _estimated_wait(self, position: int) -> float:
+        """Rough seconds until the request at `position` in the queue starts."""
+        # Running work is on average half done
+        return (math.ceil(position / self.max_concurrent) - 0.5) * self._avg_run
+
+    def _grant(self, caller: str, waited: float) -> None:
+        self._running += 1
+        self._running_by_caller[caller] = self._running_by_caller.get(caller, 0) + 1
+        self._admitted += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters, one caller at a time in rotation."""
+        while self._running < self.max_concurrent and self._queues:
+            caller, waiters = next(iter(self._queues.items()))
+            waiter = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                self._queues.move_to_end(caller)
+            else:
+                del self._queues[caller]
+            self._grant(caller, time.monotonic() - waiter.queued_at)
+            waiter.future.set_result(None)
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Drop a waiter that gave up, returning its slot if it was just granted."""
+        if waiter.future.done():
+            self.release(waiter.caller)
+            return
+        waiter.future.cancel()
+        waiters = self._queues.get(waiter.caller)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            self._queued -= 1
+            if not waiters:
+                del self._queues[waiter.caller]
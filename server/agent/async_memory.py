@@ -0,0 +1,630 @@
+"""Async agent memory operations using Supabase."""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from db.supabase import get_async_supabase_client
+from supabase import AsyncClient
+
+from .search import ContentIndex
+from .write_behind import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAgentMemory:
+    """
+    Async implementation of the AgentMemory interface.
+
+    Every query is awaited on a shared, pooled HTTP/2 Supabase client, so
+    a slow database call only suspends the request that made it instead of
+    blocking the event loop.
+    """
+
+    # Tables counted by get_stats, keyed by stat name
+    STAT_TABLES = {
+        "total_sessions": "sessions",
+        "total_content": "content_log",
+        "total_tasks": "tasks",
+    }
+
+    # content_log columns returned to callers (excludes search_vector)
+    CONTENT_COLUMNS = "id, session_id, created_at, content_type, platform, title, content, metadata, performance"
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        write_buffer: Optional[WriteBehindBuffer] = None,
+        stats_reconcile_interval: float = 300.0,
+        search_index: Optional[ContentIndex] = None
+    ):
+        self.client = client
+        # When set, message inserts and session updates are written behind
+        self.write_buffer = write_buffer
+
+        # In-process counters served by get_stats, reconciled periodically
+        self.stats_reconcile_interval = stats_reconcile_interval
+        self.stats_reconciled_at: Optional[datetime] = None
+        self.stats_reconcile_ok = False
+        self._counts: Optional[dict] = None
+        self._created = dict.fromkeys(self.STAT_TABLES, 0)
+        self._reconcile_task: Optional[asyncio.Task] = None
+
+        # Local fallback for search_content, fed by log_content
+        self.search_index = search_index
+        self._search_fallbacks = 0
+        self._warm_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def create(
+        cls,
+        write_behind: bool = False,
+        flush_batch_size: int = 50,
+        flush_interval: float = 1.0,
+        stats_reconcile_interval: float = 300.0,
+        search_index_size: int = 0
+    ) -> "AsyncAgentMemory":
+        """Create memory backed by the shared async Supabase client."""
+        client = await get_async_supabase_client()
+        write_buffer = None
+        if write_behind:
+            write_buffer = WriteBehindBuffer(
+                client,
+                max_batch=flush_batch_size,
+                flush_interval=flush_interval
+            )
+        return cls(
+            client,
+            write_buffer=write_buffer,
+            stats_reconcile_interval=stats_reconcile_interval,
+            search_index=ContentIndex(search_index_size) if search_index_size > 0 else None
+        )
+
+    async def start(self) -> None:
+        """Start background flushing and stats reconciliation."""
+        if self.write_buffer:
+            await self.write_buffer.start()
+        if not self._reconcile_task:
+            self._reconcile_task = asyncio.create_task(self._reconcile_loop())
+        if self.search_index is not None and not self._warm_task:
+            self._warm_task = asyncio.create_task(self._warm_search_index())
+
+    async def close(self) -> None:
+        """Flush buffered writes before shutdown."""
+        if self._reconcile_task:
+            self._reconcile_task.cancel()
+            self._reconcile_task = None
+        if self._warm_task:
+            self._warm_task.cancel()
+            self._warm_task = None
+        if self.write_buffer:
+            await self.write_buffer.close()
+
+    async def ping(self) -> None:
+        """Run the cheapest possible query to check the database is reachable."""
+        try:
+            await self.client.table("sessions").select("id").limit(1).execute()
+        except Exception as e:
+            raise RuntimeError(f"Database error: {e}")
+
+    # ==================== Sessions ====================
+
+    async def create_session(self, metadata: Optional[dict] = None) -> str:
+        """Create a new session and return session_id."""
+        session_id = f"session-{uuid.uuid4().hex[:12]}"
+
+        try:
+            await self.client.table("sessions").insert({
+                "session_id": session_id,
+                "metadata": metadata or {}
+            }).execute()
+        except Exception as e:
+            logger.error(f"Failed to create session: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+        self._count_created("total_sessions")
+        return session_id
+
+    async def get_session(self, session_id: str) -> Optional[dict]:
+        """Get session by ID."""
+        try:
+            result = await self.client.table("sessions").select("*").eq(
+                "session_id", session_id
+            ).execute()
+            if not result.data:
+                return None
+            session = result.data[0]
+            if self.write_buffer:
+                session.update(self.write_buffer.pending_session_fields(session_id))
+            return session
+        except Exception as e:
+            logger.error(f"Failed to get session {session_id}: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+    async def update_session(
+        self,
+        session_id: str,
+        summary: Optional[str] = None,
+        tags: Optional[list] = None,
+        metadata: Optional[dict] = None,
+        claude_session_id: Optional[str] = None
+    ) -> None:
+        """Update session with summary, tags, metadata, or Claude SDK session ID."""
+        update_data = {}
+        if summary is not None:
+            update_data["summary"] = summary
+        if tags is not None:
+            update_data["tags"] = tags
+        if metadata is not None:
+            update_data["metadata"] = metadata
+        if claude_session_id is not None:
+            update_data["claude_session_id"] = claude_session_id
+
+        if update_data and self.write_buffer:
+            self.write_buffer.update_session(session_id, update_data)
+        elif update_data:
+            try:
+                await self.client.table("sessions").update(update_data).eq(
+                    "session_id", session_id
+                ).execute()
+            except Exception as e:
+                logger.error(f"Failed to update session {session_id}: {e}")
+                raise RuntimeError(f"Database error: {e}")
+
+    async def get_claude_session_id(self, session_id: str) -> Optional[str]:
+        """Get the Claude SDK session ID for resuming conversations."""
+        if self.write_buffer:
+            pending = self.write_buffer.pending_session_fields(session_id)
+            if pending.get("claude_session_id"):
+                return pending["claude_session_id"]
+
+        try:
+            result = await self.client.table("sessions").select("claude_session_id").eq(
+                "session_id", session_id
+            ).execute()
+            if result.data and result.data[0].get("claude_session_id"):
+                return result.data[0]["claude_session_id"]
+            return None
+        except Exception as e:
+            logger.error(f"Failed to get Claude session ID for {session_id}: {e}")
+            return None
+
+    async def list_sessions(self, limit: int = 20) -> list:
+        """List recent sessions."""
+        try:
+            result = await self.client.table("sessions").select("*").order(
+                "created_at", desc=True
+            ).limit(limit).execute()
+            return result.data
+        except Exception as e:
+            logger.error(f"Failed to list sessions: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+    # ==================== Messages ====================
+
+    async def add_message(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        metadata: Optional[dict] = None
+    ) -> str:
+        """Add a message to conversation history."""
+        message_id = str(uuid.uuid4())
+        row = {
+            "id": message_id,
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "metadata": metadata or {},
+            # Set here so batched inserts keep conversation order
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+
+        if self.write_buffer:
+            self.write_buffer.add_message(row)
+            return message_id
+
+        try:
+            await self.client.table("messages").insert(row).execute()
+        except Exception as e:
+            logger.error(f"Failed to add message: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+        return message_id
+
+    async def get_messages(self, session_id: str, limit: int = 50) -> list:
+        """Get conversation history for a session."""
+        try:
+            result = await self.client.table("messages").select("*").eq(
+                "session_id", session_id
+            ).order("created_at", desc=False).limit(limit).execute()
+            messages = result.data
+        except Exception as e:
+            logger.error(f"Failed to get messages for {session_id}: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+        if self.write_buffer:
+            written = {m["id"] for m in messages}
+            pending = [
+                m for m in self.write_buffer.pending_messages(session_id)
+                if m["id"] not in written
+            ]
+            messages = (messages + pending)[:limit]
+
+        return messages
+
+    async def get_recent_messages(self, session_id: str, limit: int = 50) -> list:
+        """Get the latest messages of a session, oldest first."""
+        try:
+            result = await self.client.table("messages").select("*").eq(
+                "session_id", session_id
+            ).order("created_at", desc=True).limit(limit).execute()
+            messages = list(reversed(result.data))
+        except Exception as e:
+            logger.error(f"Failed to get messages for {session_id}: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+        if self.write_buffer:
+            written = {m["id"] for m in messages}
+            pending = [
+                m for m in self.write_buffer.pending_messages(session_id)
+                if m["id"] not in written
+            ]
+            messages = (messages + pending)[-limit:]
+
+        return messages
+
+    async def get_conversation_context(
+        self,
+        session_id: str,
+        max_tokens: int = 4000,
+        limit: int = 50,
+        exclude_id: Optional[str] = None
+    ) -> str:
+        """
+        Get the most recent conversation history that fits a token budget.
+
+        Messages are taken newest first until the budget (estimated at four
+        characters per token) runs out; the oldest one included may be cut.
+
+        Args:
+            session_id: Session to read
+            max_tokens: Approximate token budget for the history
+            limit: Maximum number of messages to consider
+            exclude_id: Message to leave out, e.g. the turn being answered
+
+        Returns:
+            Formatted history, or "" if there is none
+        """
+        messages = [m for m in await self.get_recent_messages(session_id, limit) if m["id"] != exclude_id]
+        budget = max_tokens * 4
+        context_parts = []
+        for msg in reversed(messages):
+            if budget <= 0:
+                break
+            role = "User" if msg["role"] == "user" else "Assistant"
+            content = msg["content"]
+            if len(content) > budget:
+                content = "..." + content[-budget:]
+            budget -= len(content)
+            context_parts.append(f"{role}: {content}")
+
+        if not context_parts:
+            return ""
+        return "\n\n".join(["Previous conversation:", *reversed(context_parts)])
+
+    # ==================== Content Log ====================
+
+    async def log_content(
+        self,
+        content: str,
+        content_type: str,
+        session_id: Optional[str] = None,
+        platform: Optional[str] = None,
+        title: Optional[str] = None,
+        metadata: Optional[dict] = None
+    ) -> str:
+        """Log content created by the agent."""
+        content_id = str(uuid.uuid4())
+        row = {
+            "id": content_id,
+            "session_id": session_id,
+            "content_type": content_type,
+            "platform": platform,
+            "title": title,
+            "content": content,
+            "metadata": metadata or {}
+        }
+
+        try:
+            await self.client.table("content_log").insert(row).execute()
+        except Exception as e:
+            logger.error(f"Failed to log content: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+        self._count_created("total_content")
+        if self.search_index is not None:
+            self.search_index.add({**row, "created_at": datetime.now(timezone.utc).isoformat()})
+        return content_id
+
+    async def get_recent_content(self, days: int = 30, limit: int = 50) -> list:
+        """Get content created in the last N days."""
+        since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+        try:
+            result = await self.client.table("content_log").select(self.CONTENT_COLUMNS).gte(
+                "created_at", since
+            ).order("created_at", desc=True).limit(limit).execute()
+            return result.data
+        except Exception as e:
+            logger.error(f"Failed to get recent content: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+    async def get_content_by_type(self, content_type: str, limit: int = 20) -> list:
+        """Get content by type (linkedin, email, etc.)."""
+        try:
+            result = await self.client.table("content_log").select(self.CONTENT_COLUMNS).eq(
+                "content_type", content_type
+            ).order("created_at", desc=True).limit(limit).execute()
+            return result.data
+        except Exception as e:
+            logger.error(f"Failed to get content by type {content_type}: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+    async def search_content(
+        self,
+        query: str,
+        content_type: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> list:
+        """
+        Ranked full-text search over content title, platform and body.
+
+        Uses the search_content_log database function (migration 004). If
+        that fails and a local index is configured, falls back to
+        searching the recently logged content held in process.
+
+        Args:
+            query: Search terms (quoted phrases, "or" and "-term" supported,
+                including by the local fallback)
+            content_type: Only return content of this type
+            limit: Page size
+            offset: Number of results to skip
+
+        Returns:
+            Matching content rows, best first, each with a `rank`
+        """
+        try:
+            result = await self.client.rpc("search_content_log", {
+                "search_query": query,
+                "filter_content_type": content_type,
+                "result_limit": limit,
+                "result_offset": offset
+            }).execute()
+            return result.data
+        except Exception as e:
+            if self.search_index is None:
+                logger.error(f"Failed to search content: {e}")
+                raise RuntimeError(f"Database error: {e}")
+
+            self._search_fallbacks += 1
+            logger.warning(f"Content search failed, using local index: {e}")
+            return self.search_index.search(query, content_type=content_type, limit=limit, offset=offset)
+
+    async def update_content_performance(
+        self,
+        content_id: str,
+        performance: dict
+    ) -> None:
+        """Update content with performance metrics."""
+        try:
+            await self.client.table("content_log").update({
+                "performance": performance
+            }).eq("id", content_id).execute()
+        except Exception as e:
+            logger.error(f"Failed to update content performance: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+    # ==================== Preferences ====================
+
+    async def get_preference(self, key: str) -> Optional[dict]:
+        """Get a preference by key."""
+        try:
+            result = await self.client.table("preferences").select("value").eq(
+                "key", key
+            ).execute()
+            return result.data[0]["value"] if result.data else None
+        except Exception as e:
+            logger.error(f"Failed to get preference {key}: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+    async def set_preference(self, key: str, value: dict) -> None:
+        """Set a preference (upsert)."""
+        try:
+            await self.client.table("preferences").upsert({
+                "key": key,
+                "value": value
+            }, on_conflict="key").execute()
+        except Exception as e:
+            logger.error(f"Failed to set preference {key}: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+    async def get_all_preferences(self) -> dict:
+        """Get all preferences as a dictionary."""
+        try:
+            result = await self.client.table("preferences").select("*").execute()
+            return {row["key"]: row["value"] for row in result.data}
+        except Exception as e:
+            logger.error(f"Failed to get all preferences: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+    # ==================== Tasks ====================
+
+    async def create_task(
+        self,
+        goal: str,
+        session_id: Optional[str] = None,
+        webhook_url: Optional[str] = None
+    ) -> str:
+        """Create a new autonomous task."""
+        task_id = f"task-{uuid.uuid4().hex[:12]}"
+
+        try:
+            await self.client.table("tasks").insert({
+                "task_id": task_id,
+                "session_id": session_id,
+                "goal": goal,
+                "status": "pending",
+                "webhook_url": webhook_url
+            }).execute()
+        except Exception as e:
+            logger.error(f"Failed to create task: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+        self._count_created("total_tasks")
+        return task_id
+
+    async def update_task(
+        self,
+        task_id: str,
+        status: Optional[str] = None,
+        progress: Optional[str] = None,
+        result: Optional[dict] = None,
+        error: Optional[str] = None,
+        cost_usd: Optional[float] = None
+    ) -> None:
+        """Update task status and progress."""
+        update_data = {}
+
+        if status is not None:
+            update_data["status"] = status
+            if status == "in_progress" and "started_at" not in update_data:
+                update_data["started_at"] = datetime.now(timezone.utc).isoformat()
+            elif status in ("completed", "failed"):
+                update_data["completed_at"] = datetime.now(timezone.utc).isoformat()
+
+        if progress is not None:
+            update_data["progress"] = progress
+        if result is not None:
+            update_data["result"] = result
+        if error is not None:
+            update_data["error"] = error
+        if cost_usd is not None:
+            update_data["cost_usd"] = cost_usd
+
+        if update_data:
+            try:
+                await self.client.table("tasks").update(update_data).eq(
+                    "task_id", task_id
+                ).execute()
+            except Exception as e:
+                logger.error(f"Failed to update task {task_id}: {e}")
+                raise RuntimeError(f"Database error: {e}")
+
+    async def get_task(self, task_id: str) -> Optional[dict]:
+        """Get task by ID."""
+        try:
+            result = await self.client.table("tasks").select("*").eq(
+                "task_id", task_id
+            ).execute()
+            return result.data[0] if result.data else None
+        except Exception as e:
+            logger.error(f"Failed to get task {task_id}: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+    async def list_tasks(self, status: Optional[str] = None, limit: int = 20) -> list:
+        """List tasks, optionally filtered by status."""
+        try:
+            query = self.client.table("tasks").select("*")
+
+            if status:
+                query = query.eq("status", status)
+
+            result = await query.order("started_at", desc=True).limit(limit).execute()
+            return result.data
+        except Exception as e:
+            logger.error(f"Failed to list tasks: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+    # ==================== Aggregations ====================
+
+    async def get_stats(self) -> dict:
+        """
+        Get overall agent statistics.
+
+        Served from in-process counters that are bumped on every create and
+        reconciled against estimated table counts in the background, so
+        this only touches the database the first time it is called.
+        """
+        if self._counts is None:
+            await self.reconcile_stats()
+        return dict(self._counts)
+
+    async def reconcile_stats(self) -> None:
+        """Reset the counters from estimated table counts."""
+        created_before = dict(self._created)
+        try:
+            results = await asyncio.gather(*(
+                self.client.table(table).select("id", count="estimated").limit(1).execute()
+                for table in self.STAT_TABLES.values()
+            ))
+        except Exception as e:
+            self.stats_reconcile_ok = False
+            logger.error(f"Failed to get stats: {e}")
+            raise RuntimeError(f"Database error: {e}")
+
+        # Keep rows created while the counts were in flight
+        self._counts = {
+            name: (result.count or 0) + self._created[name] - created_before[name]
+            for name, result in zip(self.STAT_TABLES, results)
+        }
+        self.stats_reconciled_at = datetime.now(timezone.utc)
+        self.stats_reconcile_ok = True
+
+    def _count_created(self, name: str) -> None:
+        self._created[name] += 1
+        if self._counts is not None:
+            self._counts[name] += 1
+
+    def search_stats(self) -> Optional[dict]:
+        """Get local search index state, if one is configured."""
+        if self.search_index is None:
+            return None
+        return {**self.search_index.stats(), "fallbacks": self._search_fallbacks}
+
+    async def _warm_search_index(self, page_size: int = 1000) -> None:
+        """Load the most recent content into the local search index."""
+        rows = []
+        try:
+            while len(rows) < self.search_index.max_documents:
+                size = min(page_size, self.search_index.max_documents - len(rows))
+                result = await self.client.table("content_log").select(self.CONTENT_COLUMNS).order(
+                    "created_at", desc=True
+                ).range(len(rows), len(rows) + size - 1).execute()
+                rows.extend(result.data)
+                if len(result.data) < size:
+                    break
+        except Exception as e:
+            logger.warning(f"Search index warm-up stopped after {len(rows)} rows: {e}")
+
+        # Oldest first, so the index evicts in age order
+        for i, row in enumerate(reversed(rows)):
+            if row["id"] not in self.search_index:
+                self.search_index.add(row)
+            if i % 200 == 199:
+                # Let requests run while a large index is built
+                await asyncio.sleep(0)
+        logger.info(f"Search index warmed with {len(rows)} rows")
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            try:
+                await self.reconcile_stats()
+            except RuntimeError:
+                pass
+            await asyncio.sleep(self.stats_reconcile_interval)
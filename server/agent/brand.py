@@ -0,0 +1,137 @@
+"""Precompiled brand context bundle."""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import re
+import time
+from typing import Optional
+
+from .cache import DirectoryFingerprint
+
+logger = logging.getLogger(__name__)
+
+# Brand files compiled into the bundle, in prompt order
+DEFAULT_BRAND_FILES = [
+    "tone-of-voice.md",
+    "brand.json",
+    "brand-system.md",
+    "facts/*.md",
+    "case-studies/*.md",
+    "feedback/testimonials.md",
+]
+
+
+def compact_markdown(text: str) -> str:
+    """Strip horizontal rules, trailing spaces and repeated blank lines."""
+    lines = [line.rstrip() for line in text.splitlines()]
+    lines = [line for line in lines if not re.fullmatch(r"-{3,}|\*{3,}|_{3,}", line.strip())]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def compact_json(text: str) -> str:
+    """Re-serialize JSON without whitespace."""
+    try:
+        return json.dumps(json.loads(text), separators=(",", ":"), ensure_ascii=False)
+    except ValueError:
+        return text.strip()
+
+
+class BrandContext:
+    """
+    Brand directory compiled into one compact prompt section.
+
+    The bundle is built at startup and rebuilt by a background watcher
+    whenever a brand file changes, so prompts can carry the brand context
+    directly instead of the agent spending turns reading the files.
+    """
+
+    def __init__(
+        self,
+        brand_dir: str,
+        patterns: Optional[list[str]] = None,
+        poll_interval: float = 2.0
+    ):
+        self.brand_dir = brand_dir
+        self.patterns = patterns or DEFAULT_BRAND_FILES
+        self.poll_interval = poll_interval
+        self.bundle = ""
+        self.version = ""
+        self.files: list[str] = []
+        self.built_at: Optional[float] = None
+        self.rebuilds = 0
+        self._fingerprint = DirectoryFingerprint([brand_dir], check_interval=0)
+        self._watch_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Build the bundle and start watching for changes."""
+        await asyncio.to_thread(self.build)
+        if not self._watch_task:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        """Stop the file watcher."""
+        if self._watch_task:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+    def build(self) -> None:
+        """Compile the brand files into the bundle."""
+        version = self._fingerprint.current()
+        sections = []
+        files = []
+
+        for path in self._matched_files():
+            relative = os.path.relpath(path, self.brand_dir)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    text = f.read()
+            except OSError as e:
+                logger.warning(f"Skipping brand file {relative}: {e}")
+                continue
+
+            body = compact_json(text) if path.endswith(".json") else compact_markdown(text)
+            sections.append(f"### {relative}\n{body}")
+            files.append(relative)
+
+        self.bundle = "\n\n".join(sections)
+        self.version = version
+        self.files = files
+        self.built_at = time.time()
+        self.rebuilds += 1
+        logger.info(f"Brand context built from {len(files)} files ({len(self.bundle)} chars)")
+
+    def stats(self) -> dict:
+        """Get bundle state for monitoring."""
+        return {
+            "brand_dir": self.brand_dir,
+            "version": self.version[:12],
+            "files": self.files,
+            "chars": len(self.bundle),
+            "built_at": self.built_at,
+            "rebuilds": self.rebuilds,
+        }
+
+    def _matched_files(self) -> list[str]:
+        paths = []
+        for pattern in self.patterns:
+            for path in sorted(glob.glob(os.path.join(self.brand_dir, pattern))):
+                # Skip templates such as case-studies/_template.md
+                if os.path.basename(path).startswith("_") or path in paths:
+                    continue
+                paths.append(path)
+        return paths
+
+    async def _watch(self) -> None:
+        """Rebuild the bundle when any brand file changes."""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                version = await asyncio.to_thread(self._fingerprint.current)
+                if version != self.version:
+                    logger.info("Brand files changed, rebuilding context")
+                    await asyncio.to_thread(self.build)
+            except Exception as e:
+                logger.error(f"Brand context rebuild failed: {e}")
@@ -0,0 +1,247 @@
+"""Response cache for stateless content generation."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from claude_agent_sdk import ClaudeAgentOptions
+from supabase import AsyncClient
+
+logger = logging.getLogger(__name__)
+
+
+class DirectoryFingerprint:
+    """
+    Content hash of every file under a set of directories.
+
+    File stats are rescanned at most every `check_interval` seconds and
+    file contents are only re-hashed when a stat changed. current() does
+    that scan on the calling thread; after start(), a background task
+    runs it in a worker thread instead and `value` reads the last hash
+    without any I/O, which is what request handlers should use.
+    """
+
+    def __init__(self, directories: list[str], check_interval: float = 5.0):
+        self.directories = directories
+        self.check_interval = check_interval
+        self._stat_signature: Optional[tuple] = None
+        self._hash = ""
+        self._checked_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def value(self) -> str:
+        """The most recently computed hash."""
+        return self._hash
+
+    async def start(self) -> None:
+        """Compute the hash, then keep refreshing it in the background."""
+        await asyncio.to_thread(self.current)
+        if not self._refresh_task:
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def stop(self) -> None:
+        """Stop background refreshes."""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    def current(self) -> str:
+        """Get the hash, rebuilding it if any file changed. Blocks on file I/O."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval and self._stat_signature is not None:
+            return self._hash
+        self._checked_at = now
+
+        files = self._list_files()
+        signature = tuple(files)
+        if signature != self._stat_signature:
+            self._stat_signature = signature
+            self._hash = self._hash_files([path for path, _, _ in files])
+        return self._hash
+
+    async def _refresh(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await asyncio.to_thread(self.current)
+            except Exception as e:
+                logger.error(f"Fingerprint refresh failed: {e}")
+
+    def _list_files(self) -> list[tuple]:
+        files = []
+        for directory in self.directories:
+            for root, dirs, names in os.walk(directory):
+                dirs.sort()
+                for name in sorted(names):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((path, stat.st_size, stat.st_mtime_ns))
+        return files
+
+    @staticmethod
+    def _hash_files(paths: list[str]) -> str:
+        digest = hashlib.sha256()
+        for path in paths:
+            digest.update(path.encode())
+            try:
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(65536), b""):
+                        digest.update(block)
+            except OSError:
+                continue
+        return digest.hexdigest()
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so retries that only differ in spacing share a key."""
+    # Case is kept: the model's output depends on it
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def options_fingerprint(options: ClaudeAgentOptions) -> str:
+    """Stable description of the options that affect generated output."""
+    return json.dumps({
+        "allowed_tools": sorted(options.allowed_tools or []),
+        "cwd": str(options.cwd),
+        "max_turns": options.max_turns,
+        "max_budget_usd": options.max_budget_usd,
+        "permission_mode": options.permission_mode,
+        "setting_sources": options.setting_sources,
+        "model": options.model,
+    }, sort_keys=True)
+
+
+class ResponseCache:
+    """
+    Two-tier cache of generated content.
+
+    The first tier is an in-process LRU with TTL. The optional second tier
+    is the Supabase `response_cache` table, shared by every replica.
+    Entries are keyed on the normalized prompt, a content hash of the
+    brand and skill files, and the option profile, so editing a brand file
+    or changing options never serves stale content.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 3600,
+        fingerprint: Optional[DirectoryFingerprint] = None,
+        shared_client: Optional[AsyncClient] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.fingerprint = fingerprint
+        self.shared_client = shared_client
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+        # Metrics
+        self._local_hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+        self._bypasses = 0
+        self._refreshes = 0
+        self._shared_errors = 0
+
+    def make_key(self, prompt: str, options: ClaudeAgentOptions) -> str:
+        """Build the cache key for a prompt and option profile."""
+        # Refreshed in the background; reading it never touches the disk
+        files_hash = self.fingerprint.value if self.fingerprint else ""
+        raw = "\n".join([normalize_prompt(prompt), files_hash, options_fingerprint(options)])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[dict]:
+        """Look up a cached response, checking the local tier first."""
+        entry = self._entries.get(key)
+        if entry:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._local_hits += 1
+                return value
+            del self._entries[key]
+
+        value = await self._get_shared(key)
+        if value is not None:
+            self._shared_hits += 1
+            self._store_local(key, value)
+            return value
+
+        self._misses += 1
+        return None
+
+    async def set(self, key: str, value: dict) -> None:
+        """Store a response in both tiers."""
+        self._stores += 1
+        self._store_local(key, value)
+        await self._set_shared(key, value)
+
+    def record_bypass(self) -> None:
+        self._bypasses += 1
+
+    def record_refresh(self) -> None:
+        self._refreshes += 1
+
+    def stats(self) -> dict:
+        """Get hit/miss metrics."""
+        lookups = self._local_hits + self._shared_hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "local_hits": self._local_hits,
+            "shared_hits": self._shared_hits,
+            "misses": self._misses,
+            "hit_rate": round((self._local_hits + self._shared_hits) / lookups, 3) if lookups else None,
+            "stores": self._stores,
+            "evictions": self._evictions,
+            "bypasses": self._bypasses,
+            "refreshes": self._refreshes,
+            "shared_tier": self.shared_client is not None,
+            "shared_errors": self._shared_errors,
+        }
+
+    def _store_local(self, key: str, value: dict) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    async def _get_shared(self, key: str) -> Optional[dict]:
+        if not self.shared_client:
+            return None
+        try:
+            result = await self.shared_client.table("response_cache").select("value").eq(
+                "cache_key", key
+            ).gt("expires_at", datetime.now(timezone.utc).isoformat()).execute()
+            return result.data[0]["value"] if result.data else None
+        except Exception as e:
+            self._shared_errors += 1
+            logger.warning(f"Shared cache lookup failed: {e}")
+            return None
+
+    async def _set_shared(self, key: str, value: dict) -> None:
+        if not self.shared_client:
+            return
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+        try:
+            await self.shared_client.table("response_cache").upsert({
+                "cache_key": key,
+                "value": value,
+                "expires_at": expires_at.isoformat()
+            }, on_conflict="cache_key").execute()
+        except Exception as e:
+            self._shared_errors += 1
+            logger.warning(f"Shared cache store failed: {e}")
@@ -1,12 +1,19 @@
 """Stateful Claude Agent SDK client wrapper."""
 
+import asyncio
+import glob
+import hashlib
+import logging
 import os
-from typing import AsyncGenerator, Optional
+import time
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncGenerator, Awaitable, Callable, Optional
 
 from dotenv import load_dotenv
 
 from claude_agent_sdk import (
-    ClaudeSDKClient,
     ClaudeAgentOptions,
     AssistantMessage,
     TextBlock,
@@ -15,11 +22,22 @@ from claude_agent_sdk import (
     ClaudeSDKError,
 )
 
-from .memory import AgentMemory
+from .async_memory import AsyncAgentMemory
+from .admission import AdmissionController
+from .brand import BrandContext
+from .cache import normalize_prompt
+from .coalesce import SingleFlight
+from .pool import SessionPool, SessionPoolTimeoutError
+from .usage import PromptCacheStats, usage_tokens
 
 # Load environment variables
 load_dotenv(override=True)
 
+logger = logging.getLogger(__name__)
+
+# Where the Claude CLI keeps conversation transcripts needed for resume
+CLAUDE_CONFIG_DIR = Path(os.getenv("CLAUDE_CONFIG_DIR", Path.home() / ".claude"))
+
 # System prompt for the marketing agent
 SYSTEM_PROMPT = """You are an AI marketing assistant for Base44.
 
@@ -30,9 +48,22 @@ CREATIVE: base44-video, pptx-generator, excalidraw-diagram, nano-banana
 STRATEGY: marketing-ideas, brand-voice
 GENERATORS: brand-voice-generator, sop-creator, skill-creator
 
-## BRAND CONTEXT (READ BEFORE GENERATING CONTENT)
+## BRAND CONTEXT
+
+{brand_context}
+
+## GUIDELINES
 
-Before creating any marketing content, read the brand files:
+1. Base content on the brand context above - don't assume
+2. Match requests to the appropriate skill
+3. Respond in the user's language (Hebrew, English, etc.)
+4. Output ready-to-use content, not explanations
+5. Be specific with numbers, names, and results
+
+You have access to tools for reading files, searching the web, and writing content."""
+
+# Used when no precompiled brand bundle is available
+BRAND_FILES_TO_READ = """Before creating any marketing content, read the brand files:
 - `brands/base44/tone-of-voice.md` - Voice guidelines, vocabulary, writing rules
 - `brands/base44/brand.json` - Colors, fonts, visual identity
 - `brands/base44/brand-system.md` - Design philosophy
@@ -40,17 +71,41 @@ Before creating any marketing content, read the brand files:
 For specific content, also read:
 - `brands/base44/facts/metrics.md` - Current stats and numbers
 - `brands/base44/case-studies/` - Builder success stories
-- `brands/base44/feedback/testimonials.md` - Quotable quotes
+- `brands/base44/feedback/testimonials.md` - Quotable quotes"""
 
-## GUIDELINES
 
-1. READ brand files before generating content - don't assume
-2. Match requests to the appropriate skill
-3. Respond in the user's language (Hebrew, English, etc.)
-4. Output ready-to-use content, not explanations
-5. Be specific with numbers, names, and results
+def build_system_prompt(brand_bundle: str = "") -> str:
+    """Build the system prompt, inlining the brand bundle when available."""
+    if brand_bundle:
+        brand_context = (
+            "The Base44 brand files are already loaded below - do not Read them again. "
+            "Only read other files in `brands/base44/` (such as content-library/) if you need more.\n\n"
+            f"{brand_bundle}"
+        )
+    else:
+        brand_context = BRAND_FILES_TO_READ
+    return SYSTEM_PROMPT.replace("{brand_context}", brand_context)
 
-You have access to tools for reading files, searching the web, and writing content."""
+
+def transcript_exists(claude_session_id: str) -> bool:
+    """Whether the CLI on this machine still has the transcript to resume a session."""
+    pattern = CLAUDE_CONFIG_DIR / "projects" / "*" / f"{glob.escape(claude_session_id)}.jsonl"
+    return any(glob.iglob(str(pattern)))
+
+
+@dataclass
+class _Turn:
+    """What one agent run produced."""
+    content_parts: list[str] = field(default_factory=list)
+    tool_uses: list[str] = field(default_factory=list)
+    result: Optional[dict] = None
+    claude_session_id: Optional[str] = None
+    usage: Optional[dict] = None
+    ttft_ms: Optional[float] = None
+
+    @property
+    def produced(self) -> bool:
+        return bool(self.content_parts or self.tool_uses)
 
 
 class AgentClient:
@@ -59,21 +114,47 @@ class AgentClient:
 
     Unlike the stateless query() function, this client:
     - Maintains session state
-    - Can resume previous sessions
+    - Resumes previous CLI conversations, or replays recent history
     - Tracks costs and usage
     - Integrates with memory for persistence
+    - Runs on pre-warmed CLI sessions from a SessionPool
     """
 
     def __init__(
         self,
+        memory: AsyncAgentMemory,
         skills_dir: Optional[str] = None,
         max_turns: int = 20,
-        max_budget_usd: float = 5.0
+        max_budget_usd: float = 5.0,
+        session_pool: Optional[SessionPool] = None,
+        brand_context: Optional[BrandContext] = None,
+        resume_sessions: bool = True,
+        history_max_tokens: int = 4000,
+        prompt_stats: Optional[PromptCacheStats] = None,
+        coalescer: Optional[SingleFlight] = None,
+        admission: Optional[AdmissionController] = None
     ):
         self.skills_dir = skills_dir or os.getenv("SKILLS_DIR", "/app")
         self.max_turns = max_turns
         self.max_budget_usd = max_budget_usd
-        self.memory = AgentMemory()
+        self.memory = memory
+        # Without a shared pool, sessions are spawned on demand
+        self.session_pool = session_pool or SessionPool(min_size=0)
+        self.brand_context = brand_context
+        self.resume_sessions = resume_sessions
+        self.history_max_tokens = history_max_tokens
+        self.prompt_stats = prompt_stats
+        self.coalescer = coalescer
+        self.admission = admission
+
+        # Metrics
+        self._resumes = 0
+        self._resume_fallbacks = 0
+        self._history_replays = 0
+
+    def warm_up(self) -> None:
+        """Start spawning CLI sessions for the chat option profile."""
+        self.session_pool.warm(self._get_options())
 
     def _get_options(self, claude_session_id: Optional[str] = None, is_resume: bool = False) -> ClaudeAgentOptions:
         """Build ClaudeAgentOptions with skills and settings.
@@ -95,11 +176,27 @@ class AgentClient:
         # Resume from previous SDK session if available and valid
         if claude_session_id and is_resume:
             options.resume = claude_session_id
-            # When resuming, context is preserved so we don't need system prompt again
-            # But we keep it for safety in case session expired
 
         return options
 
+    async def _can_resume(self, session: Optional[dict]) -> bool:
+        """Whether a stored session can be continued with SDK resume."""
+        claude_session_id = session.get("claude_session_id") if session else None
+        if not (self.resume_sessions and claude_session_id):
+            return False
+        # Globs every project directory, which grows with each session
+        return await asyncio.to_thread(transcript_exists, claude_session_id)
+
+    def stats(self) -> dict:
+        """Get conversation continuation metrics."""
+        return {
+            "resume_enabled": self.resume_sessions,
+            "resumes": self._resumes,
+            "resume_fallbacks": self._resume_fallbacks,
+            "history_replays": self._history_replays,
+            "history_max_tokens": self.history_max_tokens,
+        }
+
     async def chat(
         self,
         message: str,
@@ -108,6 +205,11 @@ class AgentClient:
         """
         Send a message and stream responses.
 
+        Follow-ups resume the session's CLI conversation when its transcript
+        is still on this machine. Otherwise, or if the resume fails before
+        producing anything, the most recent history that fits
+        `history_max_tokens` is replayed ahead of the message.
+
         Args:
             message: User message
             session_id: Optional session ID to resume
@@ -116,112 +218,187 @@ class AgentClient:
             Dict with response chunks and metadata
         """
         # Create or resume session
-        is_resume = False
-        claude_session_id = None
-
-        if not session_id:
-            session_id = self.memory.create_session(metadata={"type": "chat"})
-        else:
-            # Verify session exists
-            existing = self.memory.get_session(session_id)
-            if not existing:
-                session_id = self.memory.create_session(metadata={"type": "chat"})
-            else:
-                is_resume = True
-                # Get Claude SDK session ID for true resume
-                claude_session_id = self.memory.get_claude_session_id(session_id)
+        existing = await self.memory.get_session(session_id) if session_id else None
+        if not existing:
+            session_id = await self.memory.create_session(metadata={"type": "chat"})
 
         # Store user message
-        self.memory.add_message(session_id, "user", message)
-
-        # Prepend system prompt to message (SDK system_prompt option doesn't work as expected)
-        full_prompt = f"{SYSTEM_PROMPT}\n\nUser: {message}"
-
-        # Don't use session resume for now - it causes empty responses
-        options = self._get_options(claude_session_id=None, is_resume=False)
-
-        content_parts = []
-        tool_uses = []
-        total_cost = 0.0
-        duration_ms = 0
-        new_claude_session_id = None
+        message_id = await self.memory.add_message(session_id, "user", message)
 
+        turn = _Turn()
+        label = "chat"
+        stable_prefix = None
         try:
-            async with ClaudeSDKClient(options=options) as client:
-                # Send the full prompt with system context
-                await client.query(full_prompt)
-
-                # Receive and process response
-                async for msg in client.receive_response():
-                    if isinstance(msg, AssistantMessage):
-                        for block in msg.content:
-                            if isinstance(block, TextBlock):
-                                content_parts.append(block.text)
-                                yield {
-                                    "type": "text",
-                                    "content": block.text,
-                                    "session_id": session_id
-                                }
-                            elif isinstance(block, ToolUseBlock):
-                                # Track and yield tool usage for visibility
-                                tool_name = block.name
-                                tool_uses.append(tool_name)
-                                yield {
-                                    "type": "tool_use",
-                                    "tool": tool_name,
-                                    "session_id": session_id
-                                }
-
-                    elif isinstance(msg, ResultMessage):
-                        total_cost = msg.total_cost_usd or 0
-                        duration_ms = msg.duration_ms or 0
-                        # Capture Claude SDK session ID for future resume
-                        new_claude_session_id = getattr(msg, 'session_id', None)
-
-                        yield {
-                            "type": "result",
-                            "session_id": session_id,
-                            "is_error": msg.is_error,
-                            "cost_usd": total_cost,
-                            "duration_ms": duration_ms,
-                            "tools_used": tool_uses
-                        }
+            if await self._can_resume(existing):
+                # The system prompt and earlier turns are already in the resumed conversation
+                self._resumes += 1
+                options = self._get_options(claude_session_id=existing["claude_session_id"], is_resume=True)
+                try:
+                    async for chunk in self._run(options, message, session_id, turn):
+                        yield chunk
+                except ClaudeSDKError as e:
+                    if turn.produced:
+                        raise
+                    logger.warning(f"Resume failed for session {session_id}: {e}")
+                if turn.produced:
+                    label = "chat_resume"
+                else:
+                    self._resume_fallbacks += 1
+                    turn = _Turn()
+
+            if not turn.produced:
+                # Prepend system prompt to message (SDK system_prompt option doesn't work as expected).
+                # It is byte-identical across requests, so it forms a cacheable prefix;
+                # history and the message always come after it.
+                brand_bundle = self.brand_context.bundle if self.brand_context else ""
+                stable_prefix = build_system_prompt(brand_bundle)
+                full_prompt = stable_prefix
+                if existing:
+                    history = await self.memory.get_conversation_context(
+                        session_id, max_tokens=self.history_max_tokens, exclude_id=message_id
+                    )
+                    if history:
+                        self._history_replays += 1
+                        full_prompt = f"{full_prompt}\n\n{history}"
+                full_prompt = f"{full_prompt}\n\nUser: {message}"
+
+                async for chunk in self._run(self._get_options(), full_prompt, session_id, turn):
+                    yield chunk
+
+            if turn.result:
+                if self.prompt_stats:
+                    tokens = self.prompt_stats.record(label, turn.usage, turn.ttft_ms, stable_prefix)
+                else:
+                    tokens = usage_tokens(turn.usage)
+                turn.result["usage"] = tokens
+                turn.result["ttft_ms"] = round(turn.ttft_ms) if turn.ttft_ms is not None else None
+                yield turn.result
 
             # Store assistant response and update session
-            full_content = "".join(content_parts)
+            full_content = "".join(turn.content_parts)
             if full_content:
                 # Store the assistant message
-                self.memory.add_message(session_id, "assistant", full_content)
+                await self.memory.add_message(session_id, "assistant", full_content)
                 # Update session summary and Claude session ID for resume
                 summary = full_content[:200] + "..." if len(full_content) > 200 else full_content
-                self.memory.update_session(
+                await self.memory.update_session(
                     session_id,
                     summary=summary,
-                    claude_session_id=new_claude_session_id
+                    claude_session_id=turn.claude_session_id
                 )
 
-        except ClaudeSDKError as e:
+        except (ClaudeSDKError, SessionPoolTimeoutError) as e:
             yield {
                 "type": "error",
                 "session_id": session_id,
                 "error": str(e)
             }
 
+    async def _run(
+        self,
+        options: ClaudeAgentOptions,
+        prompt: str,
+        session_id: str,
+        turn: _Turn
+    ) -> AsyncGenerator[dict, None]:
+        """
+        Run one prompt, yielding text and tool chunks as they arrive.
+
+        The result chunk is kept on `turn` rather than yielded, so the
+        caller can still discard an empty resumed run.
+        """
+        start = time.monotonic()
+        async with self.session_pool.session(options) as session, \
+                aclosing(session.run(prompt)) as messages:
+            async for msg in messages:
+                if isinstance(msg, AssistantMessage):
+                    for block in msg.content:
+                        if isinstance(block, TextBlock):
+                            if turn.ttft_ms is None:
+                                turn.ttft_ms = (time.monotonic() - start) * 1000
+                            turn.content_parts.append(block.text)
+                            yield {
+                                "type": "text",
+                                "content": block.text,
+                                "session_id": session_id
+                            }
+                        elif isinstance(block, ToolUseBlock):
+                            # Track and yield tool usage for visibility
+                            turn.tool_uses.append(block.name)
+                            yield {
+                                "type": "tool_use",
+                                "tool": block.name,
+                                "session_id": session_id
+                            }
+
+                elif isinstance(msg, ResultMessage):
+                    # Capture Claude SDK session ID for future resume
+                    turn.claude_session_id = getattr(msg, 'session_id', None)
+                    turn.usage = msg.usage
+                    turn.result = {
+                        "type": "result",
+                        "session_id": session_id,
+                        "is_error": msg.is_error,
+                        "cost_usd": msg.total_cost_usd or 0,
+                        "duration_ms": msg.duration_ms or 0,
+                        "num_turns": msg.num_turns,
+                        "tools_used": turn.tool_uses
+                    }
+
     async def chat_sync(
         self,
         message: str,
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        on_chunk: Optional[Callable[[dict], Awaitable[None]]] = None,
+        caller: Optional[str] = None
     ) -> dict:
         """
         Send a message and get complete response (non-streaming).
 
+        Identical messages sent to the same session while one is still
+        running share that run and its result.
+
         Args:
             message: User message
             session_id: Optional session ID to resume
+            on_chunk: Optional async callback invoked with every streamed chunk
+            caller: Who is asking, for admission control. None runs without
+                taking a slot, for callers that already hold one
 
         Returns:
             Dict with full response and metadata
+
+        Raises:
+            AdmissionRejectedError: If the server is too busy to admit the run
         """
+        # Only duplicates within one existing session are merged; two new
+        # conversations with the same opening line belong to different users
+        if self.coalescer and session_id and not on_chunk:
+            key = hashlib.sha256(f"{session_id}\n{normalize_prompt(message)}".encode()).hexdigest()
+            result, joined = await self.coalescer.run(key, lambda: self._admitted_chat(message, session_id, caller))
+            if joined:
+                result = {**result, "metadata": {**result["metadata"], "coalesced": True}}
+            return result
+        return await self._admitted_chat(message, session_id, caller, on_chunk)
+
+    async def _admitted_chat(
+        self,
+        message: str,
+        session_id: Optional[str],
+        caller: Optional[str],
+        on_chunk: Optional[Callable[[dict], Awaitable[None]]] = None
+    ) -> dict:
+        if not self.admission or caller is None:
+            return await self._chat_sync(message, session_id, on_chunk)
+        async with self.admission.slot(caller):
+            return await self._chat_sync(message, session_id, on_chunk)
+
+    async def _chat_sync(
+        self,
+        message: str,
+        session_id: Optional[str] = None,
+        on_chunk: Optional[Callable[[dict], Awaitable[None]]] = None
+    ) -> dict:
         content_parts = []
         tools_used = []
         result_data = {}
@@ -230,6 +407,8 @@ class AgentClient:
 
         async for chunk in self.chat(message, session_id):
             received_any = True
+            if on_chunk:
+                await on_chunk(chunk)
             if chunk["type"] == "text":
                 content_parts.append(chunk["content"])
                 final_session_id = chunk.get("session_id") or final_session_id
@@ -248,7 +427,7 @@ class AgentClient:
 
         # If no chunks received, create a session for tracking
         if not final_session_id:
-            final_session_id = self.memory.create_session(metadata={"type": "chat", "note": "fallback"})
+            final_session_id = await self.memory.create_session(metadata={"type": "chat", "note": "fallback"})
 
         content = "".join(content_parts)
 
@@ -263,7 +442,10 @@ class AgentClient:
                 "is_error": result_data.get("is_error", False),
                 "cost_usd": result_data.get("cost_usd", 0),
                 "duration_ms": result_data.get("duration_ms", 0),
-                "tools_used": tools_used
+                "num_turns": result_data.get("num_turns"),
+                "tools_used": tools_used,
+                "usage": result_data.get("usage"),
+                "ttft_ms": result_data.get("ttft_ms")
             }
         }
 
@@ -271,6 +453,7 @@ class AgentClient:
         self,
         goal: str,
         task_id: Optional[str] = None,
+        session_id: Optional[str] = None,
         webhook_url: Optional[str] = None
     ) -> dict:
         """
@@ -279,49 +462,64 @@ class AgentClient:
         Args:
             goal: The goal for the agent to achieve
             task_id: Optional existing task ID
+            session_id: Optional existing session ID for the task
             webhook_url: Optional URL to call when complete
 
         Returns:
             Dict with task result
         """
         # Create session for this task
-        session_id = self.memory.create_session(metadata={
-            "type": "task",
-            "goal": goal
-        })
+        if not session_id:
+            session_id = await self.memory.create_session(metadata={
+                "type": "task",
+                "goal": goal
+            })
 
         # Create or update task record
         if not task_id:
-            task_id = self.memory.create_task(
+            task_id = await self.memory.create_task(
                 goal=goal,
                 session_id=session_id,
                 webhook_url=webhook_url
             )
         else:
-            self.memory.update_task(task_id, status="in_progress")
+            await self.memory.update_task(task_id, status="in_progress", progress="Started")
+
+        # Build prompt with goal context (fixed instructions first, goal last)
+        prompt = f"""You are an autonomous marketing agent.
 
-        # Build prompt with goal context
-        prompt = f"""You are an autonomous marketing agent. Your goal is:
+Work toward your goal step by step. Use the available skills (brand-voice, linkedin-viral, direct-response-copy, seo-content, geo-content) as appropriate.
 
-{goal}
+When you have completed the goal or made significant progress, summarize what you accomplished.
 
-Work toward this goal step by step. Use the available skills (brand-voice, linkedin-viral, direct-response-copy, seo-content, geo-content) as appropriate.
+Your goal is:
 
-When you have completed the goal or made significant progress, summarize what you accomplished."""
+{goal}"""
+
+        tools_used = []
+
+        async def report_progress(chunk: dict) -> None:
+            """Record tool usage as task progress."""
+            if chunk["type"] == "tool_use":
+                tools_used.append(chunk["tool"])
+                await self.memory.update_task(
+                    task_id,
+                    progress=f"Using {chunk['tool']} ({len(tools_used)} tool calls so far)"
+                )
 
         # Run the task
-        result = await self.chat_sync(prompt, session_id)
+        result = await self.chat_sync(prompt, session_id, on_chunk=report_progress)
 
         # Update task with result
         if result.get("error"):
-            self.memory.update_task(
+            await self.memory.update_task(
                 task_id,
                 status="failed",
                 error=result["error"],
                 cost_usd=result.get("metadata", {}).get("cost_usd", 0)
             )
         else:
-            self.memory.update_task(
+            await self.memory.update_task(
                 task_id,
                 status="completed",
                 progress="Goal completed",
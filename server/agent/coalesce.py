@@ -0,0 +1,89 @@
+"""Single-flight coalescing of identical concurrent requests."""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One in-flight run and the callers waiting on it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs one coroutine per key, sharing its result with concurrent callers.
+
+    The first caller for a key starts the run as a background task; callers
+    with the same key that arrive before it finishes wait on that task and
+    receive the same result or exception. The run is only cancelled once
+    every waiter has gone, so one client disconnecting never fails the
+    others. At most `max_inflight` keys are tracked; past that, new keys
+    run uncoalesced rather than waiting for room.
+    """
+
+    def __init__(self, max_inflight: int = 256):
+        self.max_inflight = max_inflight
+        self._flights: dict[str, _Flight] = {}
+
+        # Metrics
+        self._leaders = 0
+        self._joins = 0
+        self._overflows = 0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        Run `factory()` for `key`, or join a run already in flight.
+
+        Args:
+            key: Normalized request key
+            factory: Called to start the run when none is in flight
+
+        Returns:
+            Tuple of (result, whether this caller joined an existing run)
+        """
+        flight = self._flights.get(key)
+        joined = flight is not None
+        if joined:
+            self._joins += 1
+        elif len(self._flights) >= self.max_inflight:
+            self._overflows += 1
+            return await factory(), False
+        else:
+            self._leaders += 1
+            flight = _Flight(asyncio.create_task(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), joined
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                logger.info(f"All callers for {key[:12]} left, cancelling the run")
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def stats(self) -> dict:
+        """Get coalescing metrics."""
+        return {
+            "in_flight": len(self._flights),
+            "max_inflight": self.max_inflight,
+            "leaders": self._leaders,
+            "joins": self._joins,
+            "overflows": self._overflows,
+        }
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Nobody may be left to see the error; retrieve it so asyncio doesn't warn
+        if not flight.task.cancelled():
+            flight.task.exception()
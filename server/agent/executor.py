@@ -0,0 +1,195 @@
+"""Background executor for autonomous agent tasks."""
+
+import asyncio
+import logging
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Optional
+
+from .admission import AdmissionController
+from .async_memory import AsyncAgentMemory
+from .client import AgentClient
+from .metrics import NO_CONTENT_TYPE, observe_agent_result, observe_agent_run
+
+logger = logging.getLogger(__name__)
+
+
+class TaskQueueFullError(RuntimeError):
+    """Raised when the task queue has no free slots."""
+
+
+@dataclass
+class QueuedTask:
+    """A task waiting for a worker."""
+
+    task_id: str
+    session_id: str
+    goal: str
+    webhook_url: Optional[str] = None
+    # Who submitted the task, for admission control fairness
+    caller: str = "tasks"
+
+
+class TaskExecutor:
+    """
+    Runs autonomous tasks on a pool of background workers.
+
+    Tasks are put on a bounded in-process queue and drained by
+    `num_workers` asyncio workers. Progress and results are reported
+    through AgentMemory.update_task, so callers poll /agent/status.
+    With an AdmissionController, each run also waits for a global agent
+    slot; queued tasks were already accepted, so they are never shed.
+    """
+
+    def __init__(
+        self,
+        agent_client: AgentClient,
+        memory: AsyncAgentMemory,
+        num_workers: int = 2,
+        max_queue_size: int = 50,
+        admission: Optional[AdmissionController] = None
+    ):
+        self.agent_client = agent_client
+        self.memory = memory
+        self.admission = admission
+        self.num_workers = max(1, num_workers)
+        self.queue: asyncio.Queue[QueuedTask] = asyncio.Queue(maxsize=max_queue_size)
+        self._workers: list[asyncio.Task] = []
+        self._running: dict[int, str] = {}
+        # Queue slots promised to callers that are still creating their task
+        self._reserved = 0
+        self._completed = 0
+        self._failed = 0
+
+    async def start(self) -> None:
+        """Start the worker pool."""
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"task-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+        logger.info(f"Task executor started with {self.num_workers} workers")
+
+    async def stop(self) -> None:
+        """Stop all workers and fail tasks that did not finish."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        # Anything still queued will never run
+        while not self.queue.empty():
+            task = self.queue.get_nowait()
+            await self._mark_failed(task.task_id, "Server shut down before task started")
+
+    def reserve(self) -> None:
+        """
+        Hold a queue slot for a task that is about to be submitted.
+
+        Lets callers refuse a task before writing any records for it. Pass
+        reserved=True to submit(), or call release() if the task is abandoned.
+
+        Raises:
+            TaskQueueFullError: If the queue is at capacity
+        """
+        self._check_capacity()
+        self._reserved += 1
+
+    def release(self) -> None:
+        """Give back a reservation that will not be submitted."""
+        self._reserved -= 1
+
+    def submit(self, task: QueuedTask, reserved: bool = False) -> int:
+        """
+        Queue a task for execution.
+
+        Args:
+            task: The task to run
+            reserved: Whether the caller already holds a slot from reserve()
+
+        Returns:
+            Position of the task in the queue (1 = next to run)
+
+        Raises:
+            TaskQueueFullError: If the queue is at capacity
+        """
+        if reserved:
+            self._reserved -= 1
+        else:
+            self._check_capacity()
+        self.queue.put_nowait(task)
+        return self.queue.qsize()
+
+    def _check_capacity(self) -> None:
+        if self.queue.maxsize and self.queue.qsize() + self._reserved >= self.queue.maxsize:
+            raise TaskQueueFullError(
+                f"Task queue is full ({self.queue.maxsize} tasks waiting)"
+            )
+
+    def stats(self) -> dict:
+        """Get executor state for monitoring."""
+        return {
+            "workers": self.num_workers,
+            "busy_workers": len(self._running),
+            "queued": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "completed": self._completed,
+            "failed": self._failed,
+        }
+
+    async def _worker(self, worker_id: int) -> None:
+        """Drain the queue, running one task at a time."""
+        while True:
+            task = await self.queue.get()
+            self._running[worker_id] = task.task_id
+            try:
+                await self._run(task)
+            except asyncio.CancelledError:
+                await self._mark_failed(task.task_id, "Server shut down while task was running")
+                raise
+            finally:
+                self._running.pop(worker_id, None)
+                self.queue.task_done()
+
+    async def _run(self, task: QueuedTask) -> None:
+        """Run a single task and record the outcome."""
+        logger.info(f"Starting task {task.task_id}")
+        slot = self.admission.slot(task.caller, shed=False) if self.admission else nullcontext()
+        start = time.monotonic()
+        try:
+            async with slot:
+                result = await self.agent_client.run_task(
+                    goal=task.goal,
+                    task_id=task.task_id,
+                    session_id=task.session_id,
+                    webhook_url=task.webhook_url
+                )
+        except Exception as e:
+            logger.error(f"Task {task.task_id} crashed: {e}")
+            observe_agent_run("/agent/task", NO_CONTENT_TYPE, time.monotonic() - start, status="error")
+            await self._mark_failed(task.task_id, str(e))
+            return
+
+        observe_agent_result(
+            "/agent/task",
+            NO_CONTENT_TYPE,
+            time.monotonic() - start,
+            result.get("metadata", {}),
+            error=result["status"] != "completed"
+        )
+
+        if result["status"] == "completed":
+            self._completed += 1
+        else:
+            self._failed += 1
+        logger.info(f"Task {task.task_id} {result['status']}")
+
+    async def _mark_failed(self, task_id: str, error: str) -> None:
+        """Record a task failure, tolerating database errors."""
+        self._failed += 1
+        try:
+            await self.memory.update_task(task_id, status="failed", error=error)
+        except Exception as e:
+            logger.error(f"Failed to mark task {task_id} as failed: {e}")
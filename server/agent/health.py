@@ -0,0 +1,113 @@
+"""Background-refreshed health snapshot for liveness and readiness probes."""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """
+    Keeps a health snapshot up to date in the background.
+
+    The skill inventory, database reachability and component state are
+    collected every `refresh_interval` seconds, so probes only read the
+    last snapshot and never touch the filesystem or Supabase themselves.
+    """
+
+    def __init__(
+        self,
+        skills_path: str,
+        db_probe: Optional[Callable[[], Awaitable[None]]] = None,
+        components: Optional[dict[str, Callable[[], Optional[dict]]]] = None,
+        refresh_interval: float = 15.0,
+        db_timeout: float = 5.0
+    ):
+        self.skills_path = skills_path
+        self.db_probe = db_probe
+        self.components = components or {}
+        self.refresh_interval = refresh_interval
+        self.db_timeout = db_timeout
+        self.snapshot: Optional[dict] = None
+        self.draining = False
+        self._refreshed_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Take the first snapshot and start refreshing in the background."""
+        self.draining = False
+        await self.refresh()
+        if not self._refresh_task:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Stop refreshing and report not ready from now on."""
+        self.draining = True
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    async def refresh(self) -> None:
+        """Collect a new snapshot."""
+        skills = await asyncio.to_thread(self._list_skills)
+        database = await self._probe_database()
+
+        components = {}
+        for name, get_stats in self.components.items():
+            try:
+                components[name] = get_stats()
+            except Exception as e:
+                logger.error(f"Failed to collect {name} state: {e}")
+                components[name] = None
+
+        self.snapshot = {
+            "skills_loaded": skills,
+            "skills_directory": self.skills_path,
+            "database": database,
+            **components,
+            "checked_at": time.time(),
+        }
+        self._refreshed_at = time.monotonic()
+
+    def is_ready(self) -> bool:
+        """Whether a recent snapshot exists and the server is not shutting down."""
+        if self.draining or self.snapshot is None:
+            return False
+        # A snapshot this old means the refresh loop has died
+        return time.monotonic() - self._refreshed_at < self.refresh_interval * 3
+
+    def _list_skills(self) -> list[str]:
+        if not os.path.isdir(self.skills_path):
+            return []
+        return sorted(
+            d for d in os.listdir(self.skills_path)
+            if os.path.isdir(os.path.join(self.skills_path, d))
+        )
+
+    async def _probe_database(self) -> dict:
+        if not self.db_probe:
+            return {"connected": False, "latency_ms": None, "error": "not configured"}
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.db_probe(), timeout=self.db_timeout)
+        except asyncio.TimeoutError:
+            return {"connected": False, "latency_ms": None, "error": f"timed out after {self.db_timeout}s"}
+        except Exception as e:
+            return {"connected": False, "latency_ms": None, "error": str(e)}
+        return {
+            "connected": True,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "error": None,
+        }
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Health snapshot refresh failed: {e}")
@@ -202,12 +202,21 @@ class AgentMemory:
             logger.error(f"Failed to get content by type {content_type}: {e}")
             raise RuntimeError(f"Database error: {e}")
 
-    def search_content(self, query: str, limit: int = 20) -> list:
-        """Search content by text (basic ILIKE search)."""
+    def search_content(
+        self,
+        query: str,
+        content_type: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> list:
+        """Ranked full-text search over content title, platform and body."""
         try:
-            result = self.client.table("content_log").select("*").ilike(
-                "content", f"%{query}%"
-            ).order("created_at", desc=True).limit(limit).execute()
+            result = self.client.rpc("search_content_log", {
+                "search_query": query,
+                "filter_content_type": content_type,
+                "result_limit": limit,
+                "result_offset": offset
+            }).execute()
             return result.data
         except Exception as e:
             logger.error(f"Failed to search content: {e}")
@@ -0,0 +1,109 @@
+"""Prometheus metrics for agent runs and CLI sessions."""
+
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+# Label used for requests that have no content type (chat, tasks)
+NO_CONTENT_TYPE = "none"
+
+REQUESTS = Counter(
+    "agent_requests_total",
+    "Agent requests by outcome (ok, error, cached, coalesced, rejected)",
+    ["endpoint", "content_type", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "agent_request_duration_seconds",
+    "End-to-end latency of requests that ran the agent",
+    ["endpoint", "content_type"],
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600),
+)
+TIME_TO_FIRST_TEXT = Histogram(
+    "agent_time_to_first_text_seconds",
+    "Time from starting the agent run to its first text block",
+    ["endpoint", "content_type"],
+    buckets=(0.25, 0.5, 1, 2, 3, 5, 8, 13, 21, 34, 60),
+)
+TURNS = Histogram(
+    "agent_turns",
+    "Agent turns per request",
+    ["endpoint", "content_type"],
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 20, 30),
+)
+TOOL_CALLS = Histogram(
+    "agent_tool_calls",
+    "Tool calls per request",
+    ["endpoint", "content_type"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34),
+)
+COST = Histogram(
+    "agent_cost_usd",
+    "Reported cost per request in USD",
+    ["endpoint", "content_type"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+CLI_SPAWN = Histogram(
+    "agent_cli_spawn_seconds",
+    "Time to spawn and connect a Claude CLI session",
+    ["outcome"],
+    buckets=(0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60),
+)
+
+
+def observe_agent_run(
+    endpoint: str,
+    content_type: str,
+    duration_s: float,
+    status: str = "ok",
+    ttft_ms: Optional[float] = None,
+    turns: Optional[int] = None,
+    tool_calls: Optional[int] = None,
+    cost_usd: Optional[float] = None
+) -> None:
+    """
+    Record one agent run.
+
+    Args:
+        endpoint: Route that ran the agent, e.g. "/agent/chat"
+        content_type: Content type, or NO_CONTENT_TYPE
+        duration_s: End-to-end latency
+        status: "ok" or "error"
+        ttft_ms: Milliseconds until the first text block, if any arrived
+        turns: Agent turns reported by the CLI
+        tool_calls: Number of tool calls
+        cost_usd: Cost reported by the CLI
+    """
+    labels = (endpoint, content_type)
+    REQUESTS.labels(endpoint, content_type, status).inc()
+    REQUEST_LATENCY.labels(*labels).observe(duration_s)
+    if ttft_ms is not None:
+        TIME_TO_FIRST_TEXT.labels(*labels).observe(ttft_ms / 1000)
+    if turns is not None:
+        TURNS.labels(*labels).observe(turns)
+    if tool_calls is not None:
+        TOOL_CALLS.labels(*labels).observe(tool_calls)
+    if cost_usd is not None:
+        COST.labels(*labels).observe(cost_usd)
+
+
+def observe_agent_result(endpoint: str, content_type: str, duration_s: float, metadata: dict, error: bool) -> None:
+    """Record an agent run from AgentClient result metadata."""
+    if metadata.get("coalesced"):
+        # The run was recorded by the request that started it
+        REQUESTS.labels(endpoint, content_type, "coalesced").inc()
+        return
+    observe_agent_run(
+        endpoint,
+        content_type,
+        duration_s,
+        status="error" if error or metadata.get("is_error") else "ok",
+        ttft_ms=metadata.get("ttft_ms"),
+        turns=metadata.get("num_turns"),
+        tool_calls=len(metadata["tools_used"]) if "tools_used" in metadata else None,
+        cost_usd=metadata.get("cost_usd"),
+    )
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Get the Prometheus exposition body and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
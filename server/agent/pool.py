@@ -0,0 +1,416 @@
+"""Pool of pre-warmed Claude CLI sessions."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Optional
+
+from claude_agent_sdk import ClaudeSDKClient, ClaudeAgentOptions, CLIConnectionError, Message
+
+from .metrics import CLI_SPAWN
+
+logger = logging.getLogger(__name__)
+
+# Sentinels passed between a WarmSession owner task and its callers
+_STOP = object()
+_DONE = object()
+
+
+class SessionPoolTimeoutError(RuntimeError):
+    """Raised when no CLI session became available within the acquire timeout."""
+
+
+def profile_key(options: ClaudeAgentOptions) -> tuple:
+    """Key identifying which warm sessions can serve a set of options."""
+    system_prompt = options.system_prompt
+    if isinstance(system_prompt, dict):
+        # A preset such as {"type": "preset", "preset": "claude_code", "append": ...}
+        system_prompt = tuple(sorted(system_prompt.items()))
+    return (
+        tuple(sorted(options.allowed_tools or [])),
+        str(options.cwd),
+        options.max_turns,
+        options.max_budget_usd,
+        options.permission_mode,
+        options.model,
+        tuple(options.setting_sources) if options.setting_sources is not None else None,
+        system_prompt,
+    )
+
+
+class WarmSession:
+    """
+    A connected ClaudeSDKClient owned by a dedicated asyncio task.
+
+    The SDK requires a client to be used from the task that connected it,
+    so prompts are handed to the owner task and messages come back through
+    a bounded queue.
+    """
+
+    def __init__(self, options: ClaudeAgentOptions):
+        self.options = options
+        self.key = profile_key(options)
+        self.uses = 0
+        self.broken = False
+        self.created_at = time.monotonic()
+        self._client: Optional[ClaudeSDKClient] = None
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._owner: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Spawn the CLI process and wait until it is connected."""
+        ready = asyncio.get_running_loop().create_future()
+        self._owner = asyncio.create_task(self._run(ready), name="claude-cli-session")
+        await ready
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the session can take another prompt."""
+        # Only our own state: the SDK has no public readiness check. A CLI that
+        # died while idle shows up as a failed prompt, which marks it broken
+        return not self.broken and self._owner is not None and not self._owner.done()
+
+    async def run(self, prompt: str) -> AsyncIterator[Message]:
+        """
+        Send a prompt and yield messages until the ResultMessage.
+
+        Abandoning the iterator before the result interrupts the session
+        by tearing down its CLI process.
+        """
+        if self._owner is None or self._owner.done():
+            raise CLIConnectionError("CLI session is no longer running")
+
+        out: asyncio.Queue = asyncio.Queue(maxsize=64)
+        self.uses += 1
+        await self._inbox.put((prompt, out))
+
+        finished = False
+        try:
+            while True:
+                item = await out.get()
+                if item is _DONE:
+                    finished = True
+                    return
+                if isinstance(item, BaseException):
+                    finished = True
+                    raise item
+                yield item
+        finally:
+            if not finished:
+                self.broken = True
+                self._owner.cancel()
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Disconnect the client and stop the owner task."""
+        if self._owner is None or self._owner.done():
+            return
+        await self._inbox.put(_STOP)
+        try:
+            await asyncio.wait_for(self._owner, timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            logger.warning(f"Error closing CLI session: {e}")
+
+    async def _run(self, ready: asyncio.Future) -> None:
+        """Owner task: connect, then serve prompts until stopped."""
+        self._client = ClaudeSDKClient(options=self.options)
+        try:
+            await self._client.connect()
+        except Exception as e:
+            ready.set_exception(e)
+            return
+        ready.set_result(None)
+
+        try:
+            while True:
+                item = await self._inbox.get()
+                if item is _STOP:
+                    break
+                prompt, out = item
+                try:
+                    await self._client.query(prompt)
+                    async for msg in self._client.receive_response():
+                        await out.put(msg)
+                    await out.put(_DONE)
+                except Exception as e:
+                    self.broken = True
+                    await out.put(e)
+        finally:
+            try:
+                await self._client.disconnect()
+            except Exception as e:
+                logger.warning(f"Error disconnecting CLI session: {e}")
+
+
+class _Profile:
+    """Warm sessions sharing one option profile."""
+
+    def __init__(self, options: ClaudeAgentOptions):
+        self.options = options
+        self.idle: deque[WarmSession] = deque()
+        self.in_use = 0
+        self.spawning = 0
+        self.cond = asyncio.Condition()
+
+    @property
+    def total(self) -> int:
+        return len(self.idle) + self.in_use + self.spawning
+
+
+class SessionPool:
+    """
+    Keeps Claude CLI sessions spawned ahead of time, keyed by option profile.
+
+    Spawning the CLI (Node start-up, project settings, skills scan) costs
+    seconds, so sessions are started in the background and handed out
+    already connected. A session is recycled after `max_uses` prompts or
+    on any error. CLI sessions keep conversation context between prompts,
+    so the default of one use per session keeps requests isolated.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 1,
+        max_size: int = 4,
+        max_uses: int = 1,
+        acquire_timeout: float = 60.0,
+        health_check_interval: float = 30.0
+    ):
+        self.min_size = min_size
+        self.max_size = max(1, max_size)
+        self.max_uses = max(1, max_uses)
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self._profiles: dict[tuple, _Profile] = {}
+        self._background: set[asyncio.Task] = set()
+        self._health_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        # Metrics
+        self._acquires = 0
+        self._acquire_wait_total = 0.0
+        self._acquire_wait_max = 0.0
+        self._acquire_timeouts = 0
+        self._spawned = 0
+        self._spawn_errors = 0
+        self._spawn_time_total = 0.0
+        self._recycled = 0
+
+    # ==================== Lifecycle ====================
+
+    async def start(self) -> None:
+        """Start the background health check loop."""
+        if not self._health_task:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        """Stop health checks and shut down all idle sessions."""
+        self._closed = True
+        if self._health_task:
+            self._health_task.cancel()
+        for task in list(self._background):
+            task.cancel()
+
+        sessions = []
+        for profile in self._profiles.values():
+            sessions.extend(profile.idle)
+            profile.idle.clear()
+        await asyncio.gather(*(s.close() for s in sessions), return_exceptions=True)
+
+    def warm(self, options: ClaudeAgentOptions) -> None:
+        """Register an option profile and start filling it to min_size."""
+        self._fill(self._get_profile(options))
+
+    # ==================== Acquire / Release ====================
+
+    @asynccontextmanager
+    async def session(self, options: ClaudeAgentOptions) -> AsyncGenerator[WarmSession, None]:
+        """
+        Borrow a warm session for the given options.
+
+        Sessions that resume a previous conversation cannot be shared, so
+        they are spawned on demand and closed afterwards.
+        """
+        if options.resume:
+            start = time.monotonic()
+            session = WarmSession(options)
+            try:
+                await session.start()
+            except Exception:
+                CLI_SPAWN.labels("error").observe(time.monotonic() - start)
+                raise
+            CLI_SPAWN.labels("ok").observe(time.monotonic() - start)
+            try:
+                yield session
+            finally:
+                await session.close()
+            return
+
+        session = await self.acquire(options)
+        error = False
+        try:
+            yield session
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.release(session, error=error)
+
+    async def acquire(self, options: ClaudeAgentOptions) -> WarmSession:
+        """Take an idle session, spawning one if the profile has room."""
+        profile = self._get_profile(options)
+        start = time.monotonic()
+        deadline = start + self.acquire_timeout
+
+        async with profile.cond:
+            while True:
+                while profile.idle:
+                    session = profile.idle.popleft()
+                    if session.healthy:
+                        profile.in_use += 1
+                        self._record_wait(start)
+                        self._fill(profile)
+                        return session
+                    self._discard(session)
+
+                if profile.total < self.max_size:
+                    profile.spawning += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._acquire_timeouts += 1
+                    raise SessionPoolTimeoutError(
+                        f"No CLI session available after {self.acquire_timeout:.0f}s"
+                    )
+                try:
+                    await asyncio.wait_for(profile.cond.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+        # Nothing idle and room to grow: spawn on the caller's path
+        try:
+            session = await self._spawn(profile)
+        except BaseException:
+            self._notify(profile)
+            raise
+        finally:
+            profile.spawning -= 1
+        profile.in_use += 1
+        self._record_wait(start)
+        return session
+
+    def release(self, session: WarmSession, error: bool = False) -> None:
+        """Return a session to its profile, recycling it if worn out or broken."""
+        profile = self._profiles[session.key]
+        profile.in_use -= 1
+
+        if self._closed or error or session.uses >= self.max_uses or not session.healthy:
+            self._discard(session)
+        else:
+            profile.idle.append(session)
+
+        self._fill(profile)
+        self._notify(profile)
+
+    # ==================== Metrics ====================
+
+    def stats(self) -> dict:
+        """Get pool state and acquire latency metrics."""
+        return {
+            "profiles": len(self._profiles),
+            "idle": sum(len(p.idle) for p in self._profiles.values()),
+            "in_use": sum(p.in_use for p in self._profiles.values()),
+            "spawning": sum(p.spawning for p in self._profiles.values()),
+            "spawned": self._spawned,
+            "spawn_errors": self._spawn_errors,
+            "avg_spawn_ms": round(self._spawn_time_total / self._spawned * 1000, 1) if self._spawned else None,
+            "recycled": self._recycled,
+            "acquires": self._acquires,
+            "acquire_timeouts": self._acquire_timeouts,
+            "avg_acquire_wait_ms": round(self._acquire_wait_total / self._acquires * 1000, 1) if self._acquires else None,
+            "max_acquire_wait_ms": round(self._acquire_wait_max * 1000, 1),
+        }
+
+    # ==================== Internals ====================
+
+    def _get_profile(self, options: ClaudeAgentOptions) -> _Profile:
+        key = profile_key(options)
+        if key not in self._profiles:
+            self._profiles[key] = _Profile(options)
+        return self._profiles[key]
+
+    def _record_wait(self, start: float) -> None:
+        waited = time.monotonic() - start
+        self._acquires += 1
+        self._acquire_wait_total += waited
+        self._acquire_wait_max = max(self._acquire_wait_max, waited)
+
+    async def _spawn(self, profile: _Profile) -> WarmSession:
+        start = time.monotonic()
+        session = WarmSession(profile.options)
+        try:
+            await session.start()
+        except Exception as e:
+            self._spawn_errors += 1
+            CLI_SPAWN.labels("error").observe(time.monotonic() - start)
+            logger.error(f"Failed to spawn CLI session: {e}")
+            raise
+        self._spawned += 1
+        self._spawn_time_total += time.monotonic() - start
+        CLI_SPAWN.labels("ok").observe(time.monotonic() - start)
+        return session
+
+    def _fill(self, profile: _Profile) -> None:
+        """Spawn sessions in the background until min_size are idle."""
+        while (
+            not self._closed
+            and len(profile.idle) + profile.spawning < self.min_size
+            and profile.total < self.max_size
+        ):
+            profile.spawning += 1
+            self._run_background(self._spawn_idle(profile))
+
+    async def _spawn_idle(self, profile: _Profile) -> None:
+        try:
+            session = await self._spawn(profile)
+        except Exception:
+            self._notify(profile)
+            return
+        finally:
+            profile.spawning -= 1
+
+        if self._closed:
+            await session.close()
+            return
+        profile.idle.append(session)
+        async with profile.cond:
+            profile.cond.notify()
+
+    def _discard(self, session: WarmSession) -> None:
+        self._recycled += 1
+        self._run_background(session.close())
+
+    def _notify(self, profile: _Profile) -> None:
+        async def notify():
+            async with profile.cond:
+                profile.cond.notify()
+        self._run_background(notify())
+
+    def _run_background(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _health_loop(self) -> None:
+        """Drop dead idle sessions and refill profiles."""
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            for profile in self._profiles.values():
+                for session in [s for s in profile.idle if not s.healthy]:
+                    profile.idle.remove(session)
+                    self._discard(session)
+                self._fill(profile)
@@ -0,0 +1,201 @@
+"""In-process full-text index over logged content."""
+
+import math
+import re
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Field weights, mirroring the setweight() labels in migration 004
+FIELD_WEIGHTS = {"title": 3.0, "platform": 2.0, "content": 1.0}
+
+STOP_WORDS = frozenset("""
+a an and are as at be but by for from has have how i in into is it its me my
+of on or our so that the their them they this to was we were what when which
+who will with you your
+""".split())
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    """Split text into lowercase search terms, dropping stop words."""
+    if not text:
+        return []
+    return [t for t in re.findall(r"\w+", text.casefold()) if t not in STOP_WORDS]
+
+
+@dataclass
+class QueryClause:
+    """One "or" branch of a search query."""
+
+    required: list[list[str]] = field(default_factory=list)
+    excluded: list[list[str]] = field(default_factory=list)
+
+
+def parse_query(query: str) -> list[QueryClause]:
+    """
+    Parse websearch_to_tsquery syntax into "or" clauses.
+
+    Each entry in a clause's `required` and `excluded` lists is a term
+    sequence: one term for a word, several for a quoted phrase (or a word
+    like "e-mail" that tokenizes into more than one term).
+    """
+    clauses = [QueryClause()]
+    for match in re.finditer(r'(-?)"([^"]*)"?|(-?)(\S+)', query):
+        if match.group(4) is not None and match.group(4).casefold() == "or" and not match.group(3):
+            clauses.append(QueryClause())
+            continue
+        negated = bool(match.group(1) or match.group(3))
+        terms = tokenize(match.group(2) if match.group(4) is None else match.group(4))
+        if terms:
+            (clauses[-1].excluded if negated else clauses[-1].required).append(terms)
+    # A clause with only exclusions matches nothing, as in Postgres
+    return [c for c in clauses if c.required]
+
+
+def contains_phrase(tokens: list[str], phrase: list[str]) -> bool:
+    """Whether `phrase` appears as consecutive terms in `tokens`."""
+    n = len(phrase)
+    return any(tokens[i:i + n] == phrase for i in range(len(tokens) - n + 1))
+
+
+class ContentIndex:
+    """
+    Ranked inverted index over content_log rows.
+
+    Fallback for search_content when the database search function is not
+    available. Holds the `max_documents` most recently added rows. Queries
+    use websearch_to_tsquery syntax: every term must match, "quoted
+    phrases" must appear as consecutive terms (ignoring stop words),
+    "-term" excludes and "or" separates alternatives. Results are ranked
+    by a BM25 score with title and platform hits weighted above body hits.
+    """
+
+    def __init__(self, max_documents: int = 5000, k1: float = 1.2, b: float = 0.75):
+        self.max_documents = max_documents
+        self.k1 = k1
+        self.b = b
+        self._documents: OrderedDict[str, dict] = OrderedDict()
+        # term -> {doc id -> weighted term frequency}
+        self._postings: dict[str, dict[str, float]] = {}
+        self._lengths: dict[str, float] = {}
+        self._total_length = 0.0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._documents
+
+    def add(self, row: dict) -> None:
+        """Index a content_log row, replacing any row with the same id."""
+        doc_id = row["id"]
+        if doc_id in self._documents:
+            self.remove(doc_id)
+
+        frequencies: Counter = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(row.get(field)):
+                frequencies[term] += weight
+
+        for term, frequency in frequencies.items():
+            self._postings.setdefault(term, {})[doc_id] = frequency
+        length = sum(frequencies.values())
+        self._lengths[doc_id] = length
+        self._total_length += length
+        self._documents[doc_id] = row
+
+        while len(self._documents) > self.max_documents:
+            self.remove(next(iter(self._documents)))
+            self._evictions += 1
+
+    def remove(self, doc_id: str) -> None:
+        """Drop a row from the index."""
+        row = self._documents.pop(doc_id, None)
+        if row is None:
+            return
+        for field in FIELD_WEIGHTS:
+            for term in tokenize(row.get(field)):
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(doc_id)
+
+    def search(
+        self,
+        query: str,
+        content_type: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> list:
+        """
+        Find rows matching the query.
+
+        Returns:
+            Matching rows, best first, each with a `rank` key added
+        """
+        clauses = parse_query(query)
+        if not clauses or not self._documents:
+            return []
+
+        candidates = set()
+        for clause in clauses:
+            candidates |= self._match(clause)
+        if content_type:
+            candidates = {d for d in candidates if self._documents[d].get("content_type") == content_type}
+
+        terms = list(dict.fromkeys(t for c in clauses for seq in c.required for t in seq))
+        postings = [self._postings.get(term, {}) for term in terms]
+        total = len(self._documents)
+        avg_length = self._total_length / total or 1.0
+        scored = []
+        for doc_id in candidates:
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+            score = 0.0
+            for term_postings in postings:
+                # With "or", a row need not contain every term
+                frequency = term_postings.get(doc_id)
+                if not frequency:
+                    continue
+                idf = math.log(1 + (total - len(term_postings) + 0.5) / (len(term_postings) + 0.5))
+                score += idf * frequency * (self.k1 + 1) / (frequency + norm)
+            row = self._documents[doc_id]
+            scored.append((score, row.get("created_at") or "", row))
+
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [
+            {**row, "rank": round(score, 4)}
+            for score, _, row in scored[offset:offset + limit]
+        ]
+
+    def _match(self, clause: QueryClause) -> set[str]:
+        """Ids of rows satisfying every requirement and no exclusion of a clause."""
+        postings = [self._postings.get(t, {}) for seq in clause.required for t in seq]
+        # Intersect starting from the rarest term
+        candidates = set(min(postings, key=len))
+        for term_postings in postings:
+            candidates.intersection_update(term_postings)
+        for phrase in (seq for seq in clause.required if len(seq) > 1):
+            candidates = {d for d in candidates if self._has_phrase(d, phrase)}
+        for seq in clause.excluded:
+            if len(seq) == 1:
+                candidates.difference_update(self._postings.get(seq[0], {}))
+            else:
+                candidates = {d for d in candidates if not self._has_phrase(d, seq)}
+        return candidates
+
+    def _has_phrase(self, doc_id: str, phrase: list[str]) -> bool:
+        row = self._documents[doc_id]
+        return any(contains_phrase(tokenize(row.get(f)), phrase) for f in FIELD_WEIGHTS)
+
+    def stats(self) -> dict:
+        """Get index size for monitoring."""
+        return {
+            "documents": len(self._documents),
+            "terms": len(self._postings),
+            "capacity": self.max_documents,
+            "evictions": self._evictions,
+        }
@@ -0,0 +1,122 @@
+"""Prompt cache usage telemetry."""
+
+import hashlib
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def usage_tokens(usage: Optional[dict]) -> dict:
+    """
+    Normalize a ResultMessage.usage dict to the token counts we track.
+
+    Args:
+        usage: Usage reported by the CLI (Anthropic API field names)
+
+    Returns:
+        Dict of input, output, cache read and cache creation tokens
+    """
+    usage = usage or {}
+    return {
+        "input_tokens": usage.get("input_tokens") or 0,
+        "output_tokens": usage.get("output_tokens") or 0,
+        "cache_read_tokens": usage.get("cache_read_input_tokens") or 0,
+        "cache_creation_tokens": usage.get("cache_creation_input_tokens") or 0,
+    }
+
+
+def prefix_hash(prefix: str) -> str:
+    """Short hash identifying a prompt prefix."""
+    return hashlib.sha256(prefix.encode()).hexdigest()[:12]
+
+
+class _LabelStats:
+    """Running totals for one request type."""
+
+    def __init__(self):
+        self.requests = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_creation_tokens = 0
+        self.ttft_total_ms = 0.0
+        self.ttft_count = 0
+        self.prefixes: set[str] = set()
+        self.last_prefix = ""
+
+
+class PromptCacheStats:
+    """
+    Per request type prompt cache hit rates and time to first token.
+
+    Requests are labelled by type (e.g. "generate:linkedin", "chat"), so
+    repeat requests of one type can be compared against the first. The
+    number of distinct prompt prefixes seen per label shows whether the
+    stable prefix really stayed byte-identical.
+    """
+
+    # Distinct prefix hashes remembered per label
+    MAX_PREFIXES = 32
+
+    def __init__(self):
+        self._labels: dict[str, _LabelStats] = {}
+
+    def record(
+        self,
+        label: str,
+        usage: Optional[dict],
+        ttft_ms: Optional[float] = None,
+        prefix: Optional[str] = None
+    ) -> dict:
+        """
+        Record one request.
+
+        Args:
+            label: Request type
+            usage: ResultMessage.usage
+            ttft_ms: Milliseconds until the first text arrived
+            prefix: Stable prompt prefix sent with the request
+
+        Returns:
+            The normalized token counts for the request
+        """
+        tokens = usage_tokens(usage)
+        stats = self._labels.setdefault(label, _LabelStats())
+        stats.requests += 1
+        stats.input_tokens += tokens["input_tokens"]
+        stats.output_tokens += tokens["output_tokens"]
+        stats.cache_read_tokens += tokens["cache_read_tokens"]
+        stats.cache_creation_tokens += tokens["cache_creation_tokens"]
+        if ttft_ms is not None:
+            stats.ttft_total_ms += ttft_ms
+            stats.ttft_count += 1
+        if prefix is not None:
+            stats.last_prefix = prefix_hash(prefix)
+            if len(stats.prefixes) < self.MAX_PREFIXES:
+                stats.prefixes.add(stats.last_prefix)
+
+        logger.info(
+            f"Prompt usage [{label}]: input={tokens['input_tokens']} "
+            f"cache_read={tokens['cache_read_tokens']} cache_write={tokens['cache_creation_tokens']} "
+            f"output={tokens['output_tokens']} ttft_ms={round(ttft_ms) if ttft_ms is not None else None}"
+        )
+        return tokens
+
+    def stats(self) -> dict:
+        """Get totals, cache hit ratio and average time to first token per label."""
+        result = {}
+        for label, s in sorted(self._labels.items()):
+            prompt_tokens = s.input_tokens + s.cache_read_tokens + s.cache_creation_tokens
+            result[label] = {
+                "requests": s.requests,
+                "input_tokens": s.input_tokens,
+                "output_tokens": s.output_tokens,
+                "cache_read_tokens": s.cache_read_tokens,
+                "cache_creation_tokens": s.cache_creation_tokens,
+                "cache_hit_ratio": round(s.cache_read_tokens / prompt_tokens, 3) if prompt_tokens else None,
+                "avg_ttft_ms": round(s.ttft_total_ms / s.ttft_count, 1) if s.ttft_count else None,
+                "distinct_prefixes": len(s.prefixes),
+                "prefix_hash": s.last_prefix or None,
+            }
+        return result
@@ -0,0 +1,269 @@
+"""Write-behind buffer for message and session writes."""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from postgrest.exceptions import APIError
+from supabase import AsyncClient
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE classes and PostgREST codes that retrying cannot fix: bad data
+# (22), constraint violations such as a deleted session (23), undefined
+# columns or missing privileges (42), and malformed requests (PGRST1/2)
+PERMANENT_ERROR_PREFIXES = ("22", "23", "42", "PGRST1", "PGRST2")
+
+
+def is_permanent(error: BaseException) -> bool:
+    """Whether a failed write would fail the same way on every retry."""
+    code = getattr(error, "code", None) if isinstance(error, APIError) else None
+    return bool(code) and str(code).startswith(PERMANENT_ERROR_PREFIXES)
+
+
+class WriteBehindBuffer:
+    """
+    Buffers conversation writes and flushes them to Supabase in batches.
+
+    Message inserts are batched into a single multi-row insert and session
+    updates are coalesced so only the latest fields per session are
+    written. A flush runs when `max_batch` writes are pending or every
+    `flush_interval` seconds, and on close().
+
+    Writes that fail for a reason retrying cannot fix are dropped at once;
+    others are retried on later flushes for up to `retry_window` seconds
+    after their first failure, which rides out short database outages.
+    """
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        max_batch: int = 50,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        retry_window: float = 300.0
+    ):
+        self.client = client
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.retry_window = retry_window
+        self._messages: list[dict] = []
+        self._session_updates: dict[str, dict] = {}
+        # Writes taken by a flush that is still in progress
+        self._flushing_messages: list[dict] = []
+        self._flushing_updates: dict[str, dict] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        # When a write first failed, by message id and by session id
+        self._message_failed_at: dict[str, float] = {}
+        self._update_failed_at: dict[str, float] = {}
+        self._timer_task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self._flushes = 0
+        self._messages_written = 0
+        self._session_updates_written = 0
+        self._updates_coalesced = 0
+        self._dropped = 0
+        self._errors = 0
+
+    # ==================== Lifecycle ====================
+
+    async def start(self) -> None:
+        """Start the periodic flush loop."""
+        if not self._timer_task:
+            self._timer_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        """Stop the flush loop and write everything still pending."""
+        if self._timer_task:
+            self._timer_task.cancel()
+            self._timer_task = None
+        await self.flush()
+
+    # ==================== Buffered Writes ====================
+
+    def add_message(self, row: dict) -> None:
+        """Queue a message row for insertion."""
+        self._messages.append(row)
+        self._trim()
+        self._maybe_flush()
+
+    def update_session(self, session_id: str, fields: dict) -> None:
+        """Queue a session update, merging it with any pending update."""
+        pending = self._session_updates.get(session_id)
+        if pending is None:
+            self._session_updates[session_id] = dict(fields)
+        else:
+            pending.update(fields)
+            self._updates_coalesced += 1
+        self._maybe_flush()
+
+    # ==================== Read-Your-Writes ====================
+
+    def pending_messages(self, session_id: str) -> list:
+        """Messages for a session that have not been written yet."""
+        return [
+            m for m in self._flushing_messages + self._messages
+            if m["session_id"] == session_id
+        ]
+
+    def pending_session_fields(self, session_id: str) -> dict:
+        """Session fields that have not been written yet."""
+        return {
+            **self._flushing_updates.get(session_id, {}),
+            **self._session_updates.get(session_id, {})
+        }
+
+    # ==================== Flushing ====================
+
+    async def flush(self) -> None:
+        """Write all pending messages and session updates."""
+        async with self._flush_lock:
+            messages, self._messages = self._messages, []
+            updates, self._session_updates = self._session_updates, {}
+
+            if not messages and not updates:
+                return
+
+            self._flushes += 1
+            self._flushing_messages = messages
+            self._flushing_updates = updates
+            try:
+                await self._write(messages, updates)
+            finally:
+                self._flushing_messages = []
+                self._flushing_updates = {}
+
+    async def _write(self, messages: list, updates: dict) -> None:
+        """Write one batch, re-queueing anything that failed."""
+        if messages:
+            try:
+                await self.client.table("messages").insert(messages).execute()
+                self._messages_written += len(messages)
+            except Exception as e:
+                self._errors += 1
+                logger.error(f"Failed to flush {len(messages)} messages: {e}")
+                if is_permanent(e):
+                    # The database is up but some row is bad; find which
+                    await self._write_messages_individually(messages)
+                else:
+                    # Likely down or overloaded, so don't multiply the load
+                    self._requeue_messages([(row, e) for row in messages])
+            else:
+                for row in messages:
+                    self._message_failed_at.pop(row["id"], None)
+
+        if updates:
+            results = await asyncio.gather(*(
+                self.client.table("sessions").update(fields).eq(
+                    "session_id", session_id
+                ).execute()
+                for session_id, fields in updates.items()
+            ), return_exceptions=True)
+
+            for (session_id, fields), result in zip(updates.items(), results):
+                failed_at = self._update_failed_at.pop(session_id, None)
+                if not isinstance(result, Exception):
+                    self._session_updates_written += 1
+                    continue
+
+                self._errors += 1
+                if self._give_up(result, failed_at):
+                    self._dropped += 1
+                    logger.error(f"Dropped update for session {session_id}: {result}")
+                    continue
+                logger.error(f"Failed to flush update for session {session_id}: {result}")
+                self._update_failed_at[session_id] = failed_at or time.monotonic()
+                # Newer pending fields win over the failed ones
+                self._session_updates[session_id] = {
+                    **fields, **self._session_updates.get(session_id, {})
+                }
+
+    async def _write_messages_individually(self, messages: list) -> None:
+        """
+        Retry a batch that failed permanently, row by row.
+
+        Only the rows that fail on their own are handled as failures, so
+        one bad row does not take the rest of the batch down with it.
+        """
+        results = await asyncio.gather(*(
+            self.client.table("messages").insert(row).execute() for row in messages
+        ), return_exceptions=True)
+
+        failed = []
+        for row, result in zip(messages, results):
+            if isinstance(result, Exception):
+                failed.append((row, result))
+            else:
+                self._message_failed_at.pop(row["id"], None)
+                self._messages_written += 1
+        self._requeue_messages(failed)
+
+    def _requeue_messages(self, failed: list[tuple[dict, Exception]]) -> None:
+        """
+        Put failed rows back for the next flush, or drop them.
+
+        Rows that fail for a permanent reason (a constraint violation, bad
+        data) are dropped so they cannot block the buffer, as are rows that
+        have been failing for `retry_window` seconds.
+        """
+        retry = []
+        for row, error in failed:
+            failed_at = self._message_failed_at.pop(row["id"], None)
+            if self._give_up(error, failed_at):
+                self._dropped += 1
+                logger.error(f"Dropped message for session {row.get('session_id')}: {error}")
+            else:
+                self._message_failed_at[row["id"]] = failed_at or time.monotonic()
+                retry.append(row)
+
+        if retry:
+            # Put them back ahead of newer writes and retry next flush
+            self._messages = retry + self._messages
+            self._trim()
+
+    def stats(self) -> dict:
+        """Get buffer state for monitoring."""
+        return {
+            "pending_messages": len(self._messages),
+            "pending_session_updates": len(self._session_updates),
+            "flushes": self._flushes,
+            "messages_written": self._messages_written,
+            "session_updates_written": self._session_updates_written,
+            "updates_coalesced": self._updates_coalesced,
+            "dropped": self._dropped,
+            "errors": self._errors,
+        }
+
+    def _give_up(self, error: BaseException, failed_at: Optional[float]) -> bool:
+        """Whether a failed write should be dropped instead of retried."""
+        if is_permanent(error):
+            return True
+        return failed_at is not None and time.monotonic() - failed_at >= self.retry_window
+
+    def _maybe_flush(self) -> None:
+        """Start a background flush once the size threshold is reached."""
+        pending = len(self._messages) + len(self._session_updates)
+        if pending >= self.max_batch and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    def _trim(self) -> None:
+        """Drop the oldest messages if the database has been down too long."""
+        overflow = len(self._messages) - self.max_pending
+        if overflow > 0:
+            for row in self._messages[:overflow]:
+                self._message_failed_at.pop(row["id"], None)
+            self._messages = self._messages[overflow:]
+            self._dropped += overflow
+            logger.error(f"Write-behind buffer full, dropped {overflow} messages")
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}")
@@ -0,0 +1,30 @@
+"""Support modules for the Slack bot."""
+
+from .jobs import Job, JobPool, JobQueueFullError, JobRunner
+from .profiles import ProfileCache
+from .render import RenderPool, default_render_workers
+from .render_cache import AssetFingerprint, RenderCache
+from .router import DEFAULT_ROUTES, IntentRouter, RouteMatch
+from .sessions import SessionStore
+from .streaming import LiveMessage, iter_sse
+from .upload import UploadError, VideoUploader
+
+__all__ = [
+    "Job",
+    "JobPool",
+    "JobQueueFullError",
+    "JobRunner",
+    "ProfileCache",
+    "RenderPool",
+    "default_render_workers",
+    "AssetFingerprint",
+    "RenderCache",
+    "DEFAULT_ROUTES",
+    "IntentRouter",
+    "RouteMatch",
+    "SessionStore",
+    "LiveMessage",
+    "iter_sse",
+    "UploadError",
+    "VideoUploader",
+]
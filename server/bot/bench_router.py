@@ -0,0 +1,83 @@
+"""Check routing accuracy on the labelled corpus and time the router.
+
+Run from the server directory:
+    python -m bot.bench_router [--routes routes.json] [--iterations 2000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from .router import IntentRouter
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "routing_corpus.jsonl")
+
+
+def load_corpus(path: str = CORPUS_PATH) -> list[dict]:
+    """Load labelled messages, one JSON object per line."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def check_accuracy(router: IntentRouter, corpus: list[dict]) -> list[str]:
+    """Route every corpus message and describe each mismatch."""
+    errors = []
+    for case in corpus:
+        match = router.route(case["message"], exclude=("video",))
+        content_type = match.route if match else None
+        video = router.matches(case["message"], "video")
+        if content_type != case["content_type"] or video != case["video"]:
+            errors.append(
+                f"{case['message']!r}: got ({content_type}, video={video}), "
+                f"expected ({case['content_type']}, video={case['video']})"
+            )
+    return errors
+
+
+def benchmark(router: IntentRouter, messages: list[str], iterations: int) -> dict:
+    """Time routing of the given messages, returning microseconds per message."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for message in messages:
+            router.route(message, exclude=("video",))
+    short = (time.perf_counter() - start) / (iterations * len(messages)) * 1e6
+
+    # A long message shows cost grows with length, not with the route table
+    long_message = " ".join(messages) * 20
+    start = time.perf_counter()
+    for _ in range(max(1, iterations // 100)):
+        router.route(long_message, exclude=("video",))
+    long = (time.perf_counter() - start) / max(1, iterations // 100) * 1e6
+
+    return {
+        "us_per_message": round(short, 2),
+        "long_message_chars": len(long_message),
+        "us_per_long_message": round(long, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--routes", help="JSON route table (default: built-in routes)")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    router = IntentRouter.from_file(args.routes) if args.routes else IntentRouter()
+    corpus = load_corpus()
+
+    errors = check_accuracy(router, corpus)
+    print(f"Accuracy: {len(corpus) - len(errors)}/{len(corpus)}")
+    for error in errors:
+        print(f"  {error}")
+
+    timings = benchmark(router, [case["message"] for case in corpus], args.iterations)
+    print(f"Routing: {timings['us_per_message']} us/message")
+    print(f"Long message ({timings['long_message_chars']} chars): {timings['us_per_long_message']} us")
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Bounded background job pools for the Slack bot."""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when a job pool has no free queue slots."""
+
+
+@dataclass
+class Job:
+    """A unit of bot work waiting for a worker."""
+
+    job_class: str
+    user_id: str
+    description: str
+    run: Callable[[], Awaitable[None]]
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+class JobPool:
+    """
+    Runs one class of jobs with a fixed number of workers.
+
+    Jobs wait on a bounded FIFO queue, so a burst of slow work queues up
+    behind `concurrency` workers instead of starving everything else.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=max_queue)
+        self._workers: list[asyncio.Task] = []
+        self._busy = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    async def start(self) -> None:
+        """Start the workers."""
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"{self.name}-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the workers, dropping anything still queued."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, job: Job) -> int:
+        """
+        Queue a job.
+
+        Returns:
+            Position in the queue (0 = a worker is free and it starts now)
+
+        Raises:
+            JobQueueFullError: If the queue is at capacity
+        """
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._rejected += 1
+            raise JobQueueFullError(
+                f"{self.name} queue is full ({self.queue.maxsize} jobs waiting)"
+            )
+        idle = self.concurrency - self._busy
+        return max(0, self.queue.qsize() - idle)
+
+    def stats(self) -> dict:
+        """Get queue depth and wait metrics."""
+        started = self._completed + self._failed + self._busy
+        return {
+            "workers": self.concurrency,
+            "busy": self._busy,
+            "queued": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "avg_wait_s": round(self._wait_total / started, 1) if started else None,
+            "max_wait_s": round(self._wait_max, 1),
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.queue.get()
+            self._busy += 1
+            wait = time.monotonic() - job.queued_at
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            try:
+                await job.run()
+                self._completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed += 1
+                logger.error(f"{self.name} job for {job.user_id} failed ({job.description}): {e}")
+            finally:
+                self._busy -= 1
+                self.queue.task_done()
+
+
+class JobRunner:
+    """
+    Separate job pools per class of work.
+
+    Video renders, slow content and chat each get their own workers and
+    queue, so a backlog in one class never delays the others.
+    """
+
+    def __init__(self, pools: dict[str, JobPool]):
+        self.pools = pools
+
+    async def start(self) -> None:
+        """Start every pool."""
+        for pool in self.pools.values():
+            await pool.start()
+        logger.info("Job pools started: " + ", ".join(
+            f"{name}={pool.concurrency}" for name, pool in self.pools.items()
+        ))
+
+    async def stop(self) -> None:
+        """Stop every pool."""
+        for pool in self.pools.values():
+            await pool.stop()
+
+    def submit(self, job: Job) -> int:
+        """
+        Queue a job on the pool for its class.
+
+        Returns:
+            Queue position (0 = starts now)
+
+        Raises:
+            JobQueueFullError: If that pool's queue is at capacity
+        """
+        position = self.pools[job.job_class].submit(job)
+        logger.info(f"Queued {job.job_class} job for {job.user_id} at position {position} ({self.depth()})")
+        return position
+
+    def depth(self) -> str:
+        """One-line summary of queue depths for logs and status messages."""
+        return ", ".join(
+            f"{name}: {stats['busy']} running, {stats['queued']} queued"
+            for name, stats in self.stats().items()
+        )
+
+    def stats(self) -> dict:
+        """Get metrics for every pool."""
+        return {name: pool.stats() for name, pool in self.pools.items()}
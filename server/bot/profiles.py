@@ -0,0 +1,129 @@
+"""In-memory Slack user profile cache."""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from slack_sdk.errors import SlackApiError
+
+logger = logging.getLogger(__name__)
+
+
+def display_name(user: dict) -> Optional[str]:
+    """Name to show for a Slack user object."""
+    return user.get("real_name") or user.get("profile", {}).get("real_name") or user.get("name")
+
+
+class ProfileCache:
+    """
+    Slack user display names kept in memory.
+
+    The cache is filled at startup from a paginated users.list, kept fresh
+    by user_change events, and entries expire after `ttl_seconds`. get()
+    never calls Slack: a missing or expired profile returns what is
+    cached (possibly None) and is fetched with users.info in the
+    background, with at most one fetch in flight per user.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 50000, retry_seconds: float = 60):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.retry_seconds = retry_seconds
+        # user_id -> (expires_at, display name)
+        self._entries: OrderedDict[str, tuple[float, Optional[str]]] = OrderedDict()
+        self._fetching: dict[str, asyncio.Task] = {}
+
+        # Metrics
+        self._hits = 0
+        self._misses = 0
+        self._fetches = 0
+        self._fetch_errors = 0
+        self._events = 0
+        self._warmed = 0
+
+    def get(self, client, user_id: str) -> Optional[str]:
+        """Get a user's display name from memory, refreshing it in the background if needed."""
+        entry = self._entries.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(user_id)
+            self._hits += 1
+            return entry[1]
+
+        self._misses += 1
+        if user_id not in self._fetching:
+            task = asyncio.create_task(self._fetch(client, user_id))
+            self._fetching[user_id] = task
+            task.add_done_callback(lambda _: self._fetching.pop(user_id, None))
+        return entry[1] if entry else None
+
+    def update(self, user: dict) -> None:
+        """Store a Slack user object (from users.list, users.info or an event)."""
+        user_id = user.get("id")
+        if not user_id:
+            return
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, display_name(user))
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def handle_event(self, user: dict) -> None:
+        """Apply a user_change or team_join event."""
+        self._events += 1
+        self.update(user)
+
+    async def warm(self, client, page_size: int = 200) -> None:
+        """Load every workspace member with paginated users.list calls."""
+        cursor = None
+        while True:
+            try:
+                response = await client.users_list(limit=page_size, cursor=cursor)
+            except SlackApiError as e:
+                if e.response.status_code == 429:
+                    # users.list is Tier 2, wait as long as Slack asks
+                    retry_after = int(e.response.headers.get("Retry-After", "30"))
+                    logger.info(f"users.list rate limited, retrying in {retry_after}s")
+                    await asyncio.sleep(retry_after)
+                    continue
+                logger.error(f"Profile warm-up stopped after {self._warmed} users: {e}")
+                return
+            except Exception as e:
+                logger.error(f"Profile warm-up stopped after {self._warmed} users: {e}")
+                return
+
+            for user in response.get("members", []):
+                self.update(user)
+                self._warmed += 1
+
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                break
+        logger.info(f"Profile cache warmed with {self._warmed} users")
+
+    def stats(self) -> dict:
+        """Get cache metrics."""
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+            "fetches": self._fetches,
+            "fetch_errors": self._fetch_errors,
+            "events": self._events,
+            "warmed": self._warmed,
+        }
+
+    async def _fetch(self, client, user_id: str) -> None:
+        self._fetches += 1
+        try:
+            result = await client.users_info(user=user_id)
+            if result["ok"]:
+                self.update(result["user"])
+        except Exception as e:
+            self._fetch_errors += 1
+            logger.warning(f"Failed to fetch profile for {user_id}: {e}")
+            # Keep what we had and back off instead of retrying on every message
+            entry = self._entries.get(user_id)
+            self._entries[user_id] = (time.monotonic() + self.retry_seconds, entry[1] if entry else None)
@@ -0,0 +1,233 @@
+"""Isolated, concurrent Remotion renders for the Slack bot."""
+
+import asyncio
+import logging
+import os
+import shutil
+import signal
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from .render_cache import RenderCache
+
+logger = logging.getLogger(__name__)
+
+# Composition settings for generated videos (30 seconds at 30fps)
+COMPOSITION_SETTINGS = {
+    "durationInFrames": 900,
+    "fps": 30,
+    "width": 1920,
+    "height": 1080,
+}
+
+# Prefix for per-job workspace directories and output files
+JOB_PREFIX = "render-"
+
+ROOT_TEMPLATE = '''import {{ Composition }} from "remotion";
+import {{ GeneratedVideo }} from "./GeneratedVideo";
+
+export const TempRoot = () => {{
+  return (
+    <Composition
+      id="{composition_id}"
+      component={{GeneratedVideo}}
+      durationInFrames={{{durationInFrames}}}
+      fps={{{fps}}}
+      width={{{width}}}
+      height={{{height}}}
+    />
+  );
+}};
+'''
+
+INDEX_TEMPLATE = '''
+import { registerRoot } from "remotion";
+import { TempRoot } from "./TempRoot";
+
+registerRoot(TempRoot);
+'''
+
+
+def available_memory_mb() -> Optional[int]:
+    """Memory available to this container, from the cgroup limit or physical RAM."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            value = Path(path).read_text().strip()
+        except OSError:
+            continue
+        # cgroup v1 reports "no limit" as a huge number
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value) // (1024 * 1024)
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_render_workers(cpus_per_render: int, memory_per_render_mb: int) -> int:
+    """How many renders fit on this machine's cores and memory."""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    workers = max(1, cores // max(1, cpus_per_render))
+    memory = available_memory_mb()
+    if memory:
+        workers = min(workers, max(1, memory // max(1, memory_per_render_mb)))
+    return workers
+
+
+class RenderPool:
+    """
+    Renders Remotion compositions in isolated per-job workspaces.
+
+    Each render gets its own source directory under src/temp and its own
+    output file, so renders can run side by side. At most `max_workers`
+    renders run at once; others wait their turn. Workspaces and outputs
+    are always deleted once the caller is done with the video. With a
+    cache, a render whose inputs were rendered before is served from it.
+    """
+
+    def __init__(
+        self,
+        project_path: Path,
+        max_workers: int = 1,
+        render_flags: Optional[list[str]] = None,
+        shell_prefix: str = "",
+        timeout: float = 300,
+        cache: Optional[RenderCache] = None
+    ):
+        self.project_path = project_path
+        self.max_workers = max(1, max_workers)
+        self.render_flags = render_flags or []
+        self.shell_prefix = shell_prefix
+        self.timeout = timeout
+        self.cache = cache
+        self._semaphore = asyncio.Semaphore(self.max_workers)
+        self._running = 0
+        self._waiting = 0
+        self._completed = 0
+        self._failed = 0
+
+    def cleanup_stale(self) -> None:
+        """Remove workspaces and outputs left behind by a crashed process."""
+        for workspace in (self.project_path / "src" / "temp").glob(f"{JOB_PREFIX}*"):
+            shutil.rmtree(workspace, ignore_errors=True)
+        for output in (self.project_path / "out").glob(f"{JOB_PREFIX}*.mp4"):
+            output.unlink(missing_ok=True)
+
+    @asynccontextmanager
+    async def render(self, code: str) -> AsyncIterator[Optional[str]]:
+        """
+        Render a GeneratedVideo component.
+
+        Yields:
+            Path to the rendered MP4, or None if rendering failed. The file
+            is deleted when the context exits.
+        """
+        job_id = f"{JOB_PREFIX}{uuid.uuid4().hex[:12]}"
+        workspace = self.project_path / "src" / "temp" / job_id
+        output_path = self.project_path / "out" / f"{job_id}.mp4"
+        cache_key = None
+        if self.cache:
+            # Hashing the assets walks and reads the project; keep it off the event loop
+            cache_key = await asyncio.to_thread(self.cache.make_key, code, COMPOSITION_SETTINGS, self.render_flags)
+        try:
+            if cache_key:
+                output_path.parent.mkdir(exist_ok=True)
+                if self.cache.fetch(cache_key, output_path):
+                    logger.info(f"Render cache hit {cache_key[:12]}, skipping render")
+                    yield str(output_path)
+                    return
+
+            self._waiting += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self._waiting -= 1
+            self._running += 1
+            try:
+                ok = await self._render(job_id, code, workspace, output_path)
+            finally:
+                self._running -= 1
+                self._semaphore.release()
+
+            if ok:
+                self._completed += 1
+                if cache_key:
+                    self.cache.store(cache_key, output_path)
+            else:
+                self._failed += 1
+            yield str(output_path) if ok else None
+        finally:
+            shutil.rmtree(workspace, ignore_errors=True)
+            output_path.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        """Get render pool state."""
+        return {
+            "workers": self.max_workers,
+            "running": self._running,
+            "waiting": self._waiting,
+            "completed": self._completed,
+            "failed": self._failed,
+            "cache": self.cache.stats() if self.cache else None,
+        }
+
+    async def _render(self, job_id: str, code: str, workspace: Path, output_path: Path) -> bool:
+        if not self.project_path.exists():
+            logger.error(f"Video project not found at {self.project_path}")
+            return False
+
+        workspace.mkdir(parents=True, exist_ok=True)
+        (workspace / "GeneratedVideo.tsx").write_text(code)
+        (workspace / "TempRoot.tsx").write_text(
+            ROOT_TEMPLATE.format(composition_id=job_id, **COMPOSITION_SETTINGS)
+        )
+        (workspace / "index.ts").write_text(INDEX_TEMPLATE)
+        output_path.parent.mkdir(exist_ok=True)
+
+        entry = workspace.relative_to(self.project_path) / "index.ts"
+        cmd = f'npx remotion render {entry} {job_id} "{output_path}" {" ".join(self.render_flags)}'.strip()
+        if self.shell_prefix:
+            cmd = f"{self.shell_prefix} && {cmd}"
+        logger.info(f"Rendering {job_id}: {cmd}")
+
+        process = await asyncio.create_subprocess_shell(
+            cmd,
+            cwd=str(self.project_path),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            executable="/bin/bash",
+            # Own process group, so a timeout kills npx and Chromium too
+            start_new_session=True
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Render {job_id} timed out after {self.timeout}s")
+            self._kill(process)
+            await process.wait()
+            return False
+        except asyncio.CancelledError:
+            self._kill(process)
+            raise
+
+        if process.returncode != 0:
+            logger.error(f"Remotion render {job_id} failed (exit code {process.returncode})")
+            logger.error(f"STDOUT: {stdout.decode(errors='replace')[:2000] or 'empty'}")
+            logger.error(f"STDERR: {stderr.decode(errors='replace')[:2000] or 'empty'}")
+            return False
+
+        if not output_path.exists():
+            logger.error(f"Video file not created at {output_path}")
+            return False
+
+        logger.info(f"Video rendered successfully: {output_path}")
+        return True
+
+    @staticmethod
+    def _kill(process: asyncio.subprocess.Process) -> None:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
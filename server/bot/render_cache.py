@@ -0,0 +1,180 @@
+"""Content-addressed on-disk cache of rendered videos."""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    """Hard-link a file, copying if the filesystem does not support links."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class AssetFingerprint:
+    """
+    Content hash of the files a render depends on besides its code.
+
+    File contents are only re-hashed when a file's size or mtime changed.
+    current() still lists and stats every file, so call it (and
+    RenderCache.make_key) from a worker thread.
+    """
+
+    def __init__(self, paths: list[Path]):
+        self.paths = paths
+        self._signature: Optional[tuple] = None
+        self._hash = ""
+
+    def current(self) -> str:
+        files = []
+        for path in self.paths:
+            candidates = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+            for file in candidates:
+                try:
+                    stat = file.stat()
+                except OSError:
+                    continue
+                files.append((str(file), stat.st_size, stat.st_mtime_ns))
+
+        signature = tuple(files)
+        if signature != self._signature:
+            digest = hashlib.sha256()
+            for file, _, _ in files:
+                digest.update(file.encode())
+                with open(file, "rb") as f:
+                    for block in iter(lambda: f.read(65536), b""):
+                        digest.update(block)
+            self._signature = signature
+            self._hash = digest.hexdigest()
+        return self._hash
+
+
+class RenderCache:
+    """
+    Rendered MP4s stored on disk under a hash of everything that affects them.
+
+    The key covers the composition code, composition settings, render
+    flags and the hashed static assets, so identical regenerated code
+    skips the render entirely. Total size is bounded by `max_bytes`, with
+    the least recently used videos evicted first. Files are handed out as
+    hard links, so evicting an entry never breaks an upload in progress.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, assets: Optional[AssetFingerprint] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.assets = assets
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # key -> size in bytes, least recently used first
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        self._load()
+
+        # Metrics
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+
+    def make_key(self, code: str, settings: dict, flags: list[str]) -> str:
+        """Hash the inputs of a render. Blocks on file I/O when assets are set."""
+        raw = json.dumps({
+            "code": code,
+            "settings": settings,
+            "flags": flags,
+            "assets": self.assets.current() if self.assets else "",
+        }, sort_keys=True)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def fetch(self, key: str, dst: Path) -> bool:
+        """Link a cached video to `dst`, returning False on a miss."""
+        if key not in self._entries:
+            self._misses += 1
+            return False
+        try:
+            link_or_copy(self._path(key), dst)
+        except OSError as e:
+            logger.warning(f"Render cache entry {key[:12]} unreadable, dropping it: {e}")
+            self._remove(key)
+            self._misses += 1
+            return False
+
+        self._entries.move_to_end(key)
+        # mtime records recency so LRU order survives a restart
+        os.utime(self._path(key))
+        self._hits += 1
+        return True
+
+    def store(self, key: str, src: Path) -> None:
+        """Add a rendered video and evict old entries past the size limit."""
+        size = src.stat().st_size
+        if size > self.max_bytes or key in self._entries:
+            return
+
+        tmp = self.directory / f".{uuid.uuid4().hex}.tmp"
+        try:
+            link_or_copy(src, tmp)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            tmp.unlink(missing_ok=True)
+            logger.warning(f"Failed to cache render {key[:12]}: {e}")
+            return
+
+        self._entries[key] = size
+        self._total_bytes += size
+        self._stores += 1
+        while self._total_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._evictions += 1
+
+    def stats(self) -> dict:
+        """Get hit/miss and size metrics."""
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+            "stores": self._stores,
+            "evictions": self._evictions,
+        }
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.mp4"
+
+    def _remove(self, key: str) -> None:
+        self._total_bytes -= self._entries.pop(key, 0)
+        self._path(key).unlink(missing_ok=True)
+
+    def _load(self) -> None:
+        """Index videos already on disk, oldest use first."""
+        for tmp in self.directory.glob(".*.tmp"):
+            tmp.unlink(missing_ok=True)
+        files = []
+        for path in self.directory.glob("*.mp4"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        # The limit may have been lowered since the last run
+        while self._total_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+        if files:
+            logger.info(f"Render cache loaded {len(files)} videos ({self._total_bytes} bytes)")
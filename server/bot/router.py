@@ -0,0 +1,138 @@
+"""Keyword router that maps Slack messages to content types."""
+
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Route -> trigger phrases, in priority order for equally specific matches.
+# Words in a phrase match across spaces or hyphens ("landing page" also
+# matches "landing-page"). "video" is checked separately by the bot.
+DEFAULT_ROUTES: dict[str, list[str]] = {
+    "video": ["video", "remotion", "animate", "animation", "mp4", "render", "clip"],
+    # Existing content types
+    "linkedin": ["linkedin", "linked in"],
+    "email": ["email", "e mail", "newsletter"],
+    "seo": ["seo", "search engine", "blog post", "article"],
+    "geo": ["geo", "ai citation", "llm discovery"],
+    "landing-page": ["landing page", "sales page"],
+    "direct-response": ["direct response", "sales copy", "ad copy"],
+    # New skills
+    "linkedin-post": ["linkedin post", "linkedin content"],
+    "x-post": ["tweet", "twitter", "x post", "x thread"],
+    "slides": ["slide", "slides", "presentation", "pptx", "powerpoint", "deck"],
+    "diagram": ["diagram", "flowchart", "architecture diagram", "excalidraw"],
+    "image": ["generate image", "create image", "mockup", "visual", "imagen"],
+    "brand-setup": ["brand system", "brand setup", "tone of voice", "brand identity"],
+    "sop": ["runbook", "playbook", "sop", "documentation", "procedure"],
+    "skill": ["create skill", "new skill", "skill creator"],
+}
+
+# Routes the bot relies on beyond picking a content type
+REQUIRED_ROUTES = ("video",)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens; spaces, hyphens and punctuation all separate."""
+    return _TOKEN.findall(text.lower())
+
+
+@dataclass
+class RouteMatch:
+    """Best route for a message and why it won."""
+
+    route: str
+    phrase: str
+    specificity: int  # Words in the matched phrase
+    hits: int  # Phrases matched for this route
+
+
+class IntentRouter:
+    """
+    Routes messages with a token trie built once from a route table.
+
+    A message is scanned in a single pass: each token starts a walk down
+    the trie, which is at most as deep as the longest phrase, so cost is
+    linear in message length. Every phrase that matches is scored and the
+    route with the most specific match (most words) wins, then the one
+    with the most matches, then the one listed first in the table.
+    """
+
+    def __init__(self, routes: Optional[dict[str, list[str]]] = None):
+        self.routes = routes or DEFAULT_ROUTES
+        self._priority = {route: i for i, route in enumerate(self.routes)}
+        # Nested dicts keyed by token; the None key marks a phrase end
+        self._trie: dict = {}
+        for route, phrases in self.routes.items():
+            for phrase in phrases:
+                tokens = tokenize(phrase)
+                if not tokens:
+                    continue
+                node = self._trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                node.setdefault(None, []).append((route, phrase))
+
+    @classmethod
+    def from_file(cls, path: str) -> "IntentRouter":
+        """
+        Load a route table from a JSON object of route -> phrases.
+
+        The file replaces the default table, except that any of
+        REQUIRED_ROUTES it leaves out keep their default phrases, with a
+        warning, so a custom table cannot silently turn off video requests.
+
+        Raises:
+            ValueError: If the file is not an object of route -> list of phrases
+        """
+        with open(path, encoding="utf-8") as f:
+            routes = json.load(f)
+        if not isinstance(routes, dict) or not all(
+            isinstance(phrases, list) and all(isinstance(p, str) for p in phrases)
+            for phrases in routes.values()
+        ):
+            raise ValueError(f"{path} must be a JSON object of route -> list of phrases")
+
+        for route in REQUIRED_ROUTES:
+            if not routes.get(route):
+                logger.warning(f"{path} has no '{route}' route; using the default phrases for it")
+                routes[route] = DEFAULT_ROUTES[route]
+        return cls(routes)
+
+    def scan(self, message: str) -> dict[str, RouteMatch]:
+        """Find every route with at least one matching phrase."""
+        tokens = tokenize(message)
+        matches: dict[str, RouteMatch] = {}
+
+        for start in range(len(tokens)):
+            node = self._trie
+            for depth, token in enumerate(tokens[start:], 1):
+                node = node.get(token)
+                if node is None:
+                    break
+                for route, phrase in node.get(None, ()):
+                    match = matches.get(route)
+                    if match is None:
+                        matches[route] = RouteMatch(route, phrase, depth, 1)
+                        continue
+                    match.hits += 1
+                    if depth > match.specificity:
+                        match.phrase = phrase
+                        match.specificity = depth
+        return matches
+
+    def route(self, message: str, exclude: tuple = ()) -> Optional[RouteMatch]:
+        """Pick the best matching route, ignoring routes in `exclude`."""
+        candidates = [m for r, m in self.scan(message).items() if r not in exclude]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda m: (m.specificity, m.hits, -self._priority[m.route]))
+
+    def matches(self, message: str, route: str) -> bool:
+        """Whether any phrase for a route appears in the message."""
+        return route in self.scan(message)
@@ -0,0 +1,147 @@
+"""Cached Slack user -> agent session mapping."""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from supabase import AsyncClient
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """
+    Bounded LRU+TTL cache in front of the Supabase `slack_users` table.
+
+    Lookups are served from memory until the entry expires, users with no
+    session are cached negatively for a shorter time, and saves only write
+    through when the session or the user's name actually changed. Without Supabase the cache
+    is the only copy, so entries never expire and are only evicted when
+    the cache is full.
+    """
+
+    def __init__(
+        self,
+        client: Optional[AsyncClient] = None,
+        max_entries: int = 10000,
+        ttl_seconds: float = 600,
+        negative_ttl_seconds: float = 60
+    ):
+        self.client = client
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        # slack_user_id -> (expires_at, session_id or None, slack_username)
+        self._entries: OrderedDict[str, tuple[float, Optional[str], Optional[str]]] = OrderedDict()
+
+        # Metrics
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._writes = 0
+        self._writes_skipped = 0
+        self._errors = 0
+
+    async def get(self, slack_user_id: str) -> Optional[str]:
+        """Get the session ID for a Slack user, or None if they have none."""
+        entry = self._entries.get(slack_user_id)
+        if entry:
+            expires_at, session_id, _ = entry
+            if self.client is None or expires_at > time.monotonic():
+                self._entries.move_to_end(slack_user_id)
+                if session_id is None:
+                    self._negative_hits += 1
+                else:
+                    self._hits += 1
+                return session_id
+            self._expirations += 1
+
+        self._misses += 1
+        if self.client is None:
+            return None
+
+        try:
+            result = await self.client.table("slack_users").select("session_id, slack_username").eq(
+                "slack_user_id", slack_user_id
+            ).execute()
+        except Exception as e:
+            self._errors += 1
+            logger.error(f"Failed to get user session: {e}")
+            # Serve the stale entry rather than starting a new conversation
+            return entry[1] if entry else None
+
+        row = result.data[0] if result.data else {}
+        session_id = row.get("session_id")
+        self._store(slack_user_id, session_id, row.get("slack_username"))
+        return session_id
+
+    async def save(self, slack_user_id: str, session_id: str, username: str = None) -> None:
+        """Save a user's session ID, writing through only if it or the username changed."""
+        entry = self._entries.get(slack_user_id)
+        # The name may not be known yet on a user's first message; fill it in once it is
+        if entry and entry[1] == session_id and (username is None or entry[2] == username):
+            self._writes_skipped += 1
+            self._entries.move_to_end(slack_user_id)
+            return
+
+        username = username or (entry[2] if entry else None)
+        self._store(slack_user_id, session_id, username)
+        if self.client is None:
+            return
+
+        try:
+            await self.client.table("slack_users").upsert({
+                "slack_user_id": slack_user_id,
+                "session_id": session_id,
+                "slack_username": username,
+                "updated_at": "now()"
+            }, on_conflict="slack_user_id").execute()
+            self._writes += 1
+        except Exception as e:
+            self._errors += 1
+            logger.error(f"Failed to save user session: {e}")
+
+    async def clear(self, slack_user_id: str) -> None:
+        """Forget a user's session."""
+        entry = self._entries.get(slack_user_id)
+        self._store(slack_user_id, None, entry[2] if entry else None)
+        if self.client is None:
+            return
+
+        try:
+            await self.client.table("slack_users").update({
+                "session_id": None,
+                "updated_at": "now()"
+            }).eq("slack_user_id", slack_user_id).execute()
+            self._writes += 1
+        except Exception as e:
+            self._errors += 1
+            logger.error(f"Failed to clear user session: {e}")
+
+    def stats(self) -> dict:
+        """Get hit/miss and eviction metrics."""
+        lookups = self._hits + self._negative_hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "hits": self._hits,
+            "negative_hits": self._negative_hits,
+            "misses": self._misses,
+            "hit_rate": round((self._hits + self._negative_hits) / lookups, 3) if lookups else None,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "writes": self._writes,
+            "writes_skipped": self._writes_skipped,
+            "errors": self._errors,
+            "persistent": self.client is not None,
+        }
+
+    def _store(self, slack_user_id: str, session_id: Optional[str], username: Optional[str] = None) -> None:
+        ttl = self.ttl_seconds if session_id else self.negative_ttl_seconds
+        self._entries[slack_user_id] = (time.monotonic() + ttl, session_id, username)
+        self._entries.move_to_end(slack_user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
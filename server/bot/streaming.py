@@ -0,0 +1,123 @@
+"""Slack messages edited in place as a streamed agent reply arrives."""
+
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Slack truncates message text past 40,000 characters
+MAX_MESSAGE_CHARS = 39000
+
+
+async def iter_sse(lines: AsyncIterator[str]) -> AsyncIterator[dict]:
+    """
+    Parse a Server-Sent Events stream into its JSON payloads.
+
+    Args:
+        lines: Decoded lines of the response body
+
+    Yields:
+        The `data` of each event, with `type` defaulting to the event name
+    """
+    event = "message"
+    data: list[str] = []
+    async for line in lines:
+        if not line:
+            if data:
+                try:
+                    payload = json.loads("\n".join(data))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed {event} event")
+                else:
+                    payload.setdefault("type", event)
+                    yield payload
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip())
+
+
+class LiveMessage:
+    """
+    One Slack message that shows a reply as it is generated.
+
+    set() only records the latest text; edits go out from a background
+    task at most once every `min_interval` seconds, so a fast stream
+    never waits on Slack or runs into chat.update rate limits.
+    """
+
+    def __init__(self, client, channel: str, thread_ts: Optional[str] = None, min_interval: float = 1.0):
+        self.client = client
+        self.channel = channel
+        self.thread_ts = thread_ts
+        self.min_interval = min_interval
+        self.ts: Optional[str] = None
+        self._text = ""
+        self._shown = ""
+        self._last_edit = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._sending = False
+        self._finished = False
+
+    async def post(self, text: str) -> None:
+        """Post the message, e.g. a placeholder, if it is not posted yet."""
+        if self.ts:
+            return
+        response = await self.client.chat_postMessage(channel=self.channel, thread_ts=self.thread_ts, text=text)
+        self.ts = response["ts"]
+        self._shown = text
+        self._last_edit = time.monotonic()
+
+    def set(self, text: str) -> None:
+        """Show `text` on the next throttled edit."""
+        self._text = text[:MAX_MESSAGE_CHARS]
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def finish(self, text: str) -> None:
+        """Replace the message with the final text, posting any overflow as follow-ups."""
+        self._finished = True
+        if self._flush_task:
+            # Let an edit already on its way land, so its message is not posted twice
+            if not self._sending:
+                self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+
+        parts = [text[i:i + MAX_MESSAGE_CHARS] for i in range(0, len(text), MAX_MESSAGE_CHARS)] or [text]
+        if not self.ts:
+            await self.post(parts[0])
+        elif parts[0] != self._shown:
+            await self.client.chat_update(channel=self.channel, ts=self.ts, text=parts[0])
+        for part in parts[1:]:
+            await self.client.chat_postMessage(channel=self.channel, thread_ts=self.thread_ts, text=part)
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(max(0.0, self._last_edit + self.min_interval - time.monotonic()))
+        text = self._text
+        if self._finished or text == self._shown:
+            return
+        self._sending = True
+        try:
+            if self.ts:
+                await self.client.chat_update(channel=self.channel, ts=self.ts, text=text)
+            else:
+                await self.post(text)
+        except Exception as e:
+            # Progress edits are best effort; _shown is left as is, so finish() still sends the final text
+            logger.warning(f"Failed to update streaming message: {e}")
+            self._last_edit = time.monotonic()
+            return
+        finally:
+            self._sending = False
+        self._shown = text
+        self._last_edit = time.monotonic()
+        # More text may have arrived while Slack was answering
+        if not self._finished and self._text != self._shown:
+            self._flush_task = asyncio.create_task(self._flush_later())
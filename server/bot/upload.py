@@ -0,0 +1,293 @@
+"""Streaming, retrying Slack uploads for rendered videos."""
+
+import asyncio
+import logging
+import random
+import shlex
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+import httpx
+from slack_sdk.errors import SlackApiError
+
+logger = logging.getLogger(__name__)
+
+# Slack error codes worth retrying; anything else (bad channel, no scope) is permanent
+TRANSIENT_SLACK_ERRORS = {"ratelimited", "internal_error", "fatal_error", "service_unavailable", "request_timeout"}
+
+# Audio bitrate used when a video is re-encoded to fit the size budget
+TRANSCODE_AUDIO_KBPS = 96
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+class UploadError(Exception):
+    """A video could not be uploaded after all retries."""
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether an upload step that raised `error` is worth retrying."""
+    if isinstance(error, SlackApiError):
+        return (
+            error.response.status_code == 429
+            or error.response.status_code >= 500
+            or error.response.get("error") in TRANSIENT_SLACK_ERRORS
+        )
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    # Network errors from httpx or the Slack client's aiohttp session
+    return isinstance(error, (httpx.TransportError, aiohttp.ClientError, asyncio.TimeoutError, ConnectionError))
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait, if it said."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class VideoUploader:
+    """
+    Uploads videos with Slack's external upload flow.
+
+    The file is streamed from disk in `chunk_size` pieces, so it is never
+    held in memory, and progress is reported as chunks are sent. Each step
+    (getting an upload URL, sending the bytes, completing the upload) is
+    retried with jittered exponential backoff on transient errors. Videos
+    over `max_bytes` are re-encoded with ffmpeg to fit before uploading.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 100 * 1024 * 1024,
+        chunk_size: int = 1024 * 1024,
+        max_attempts: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        progress_interval: float = 2.0,
+        ffmpeg: str = "ffmpeg",
+        ffprobe: str = "ffprobe",
+        tool_cwd: Optional[Path] = None,
+        shell_prefix: str = "",
+        transcode_timeout: float = 300
+    ):
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.progress_interval = progress_interval
+        self.ffmpeg = ffmpeg
+        self.ffprobe = ffprobe
+        self.tool_cwd = tool_cwd
+        self.shell_prefix = shell_prefix
+        self.transcode_timeout = transcode_timeout
+
+        # Metrics
+        self._uploads = 0
+        self._failures = 0
+        self._retries = 0
+        self._transcodes = 0
+        self._bytes_sent = 0
+
+    async def upload(
+        self,
+        client,
+        http: httpx.AsyncClient,
+        channel: str,
+        file_path: str,
+        title: str,
+        initial_comment: Optional[str] = None,
+        thread_ts: Optional[str] = None,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> str:
+        """
+        Upload a video file and share it in a channel.
+
+        Args:
+            client: Slack AsyncWebClient
+            http: HTTP client used to send the file bytes
+            channel: Channel or DM ID to share the file in
+            file_path: Path to the video
+            title: File title shown in Slack
+            initial_comment: Message posted with the file
+            thread_ts: Thread to post in, if any
+            on_progress: Awaited with (bytes_sent, total_bytes) as the upload proceeds
+
+        Returns:
+            Slack file ID
+
+        Raises:
+            UploadError: If any step still fails after retries
+        """
+        path = Path(file_path)
+        upload_path = await self._fit_to_budget(path)
+        try:
+            size = upload_path.stat().st_size
+
+            async def send_file() -> str:
+                response = await client.files_getUploadURLExternal(filename=path.name, length=size)
+                await self._send(http, response["upload_url"], upload_path, size, on_progress)
+                return response["file_id"]
+
+            # A fresh upload URL per attempt; Slack's URLs are not resumable
+            file_id = await self._with_retries("upload file", send_file)
+
+            complete = {"files": [{"id": file_id, "title": title}], "channel_id": channel}
+            if initial_comment:
+                complete["initial_comment"] = initial_comment
+            if thread_ts:
+                complete["thread_ts"] = thread_ts
+            await self._with_retries("complete upload", lambda: client.files_completeUploadExternal(**complete))
+        except Exception as e:
+            self._failures += 1
+            raise UploadError(f"Failed to upload {path.name}: {e}") from e
+        finally:
+            if upload_path != path:
+                upload_path.unlink(missing_ok=True)
+
+        self._uploads += 1
+        logger.info(f"Uploaded {path.name} to Slack as {file_id} ({size} bytes)")
+        return file_id
+
+    def stats(self) -> dict:
+        """Get upload metrics."""
+        return {
+            "uploads": self._uploads,
+            "failures": self._failures,
+            "retries": self._retries,
+            "transcodes": self._transcodes,
+            "bytes_sent": self._bytes_sent,
+        }
+
+    async def _with_retries(self, step: str, operation: Callable[[], Awaitable]):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return await operation()
+            except Exception as e:
+                if attempt == self.max_attempts or not is_transient(e):
+                    raise
+                delay = retry_after(e) or min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+                # Jitter so parallel uploads don't retry in lockstep
+                delay *= random.uniform(1.0, 1.5)
+                self._retries += 1
+                logger.warning(f"{step} failed (attempt {attempt}/{self.max_attempts}), retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+
+    async def _send(
+        self,
+        http: httpx.AsyncClient,
+        url: str,
+        path: Path,
+        size: int,
+        on_progress: Optional[ProgressCallback]
+    ) -> None:
+        async def chunks():
+            sent = 0
+            last_report = time.monotonic()
+            with open(path, "rb") as f:
+                while True:
+                    chunk = await asyncio.to_thread(f.read, self.chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+                    sent += len(chunk)
+                    self._bytes_sent += len(chunk)
+                    # The final 100% is reported once Slack has accepted the bytes
+                    if on_progress and sent < size and time.monotonic() - last_report >= self.progress_interval:
+                        last_report = time.monotonic()
+                        await on_progress(sent, size)
+
+        response = await http.post(
+            url,
+            content=chunks(),
+            headers={"Content-Type": "application/octet-stream", "Content-Length": str(size)},
+            timeout=httpx.Timeout(60.0)
+        )
+        response.raise_for_status()
+        if on_progress:
+            await on_progress(size, size)
+
+    async def _fit_to_budget(self, path: Path) -> Path:
+        """Return `path`, or a smaller re-encoded copy if it is over the size budget."""
+        size = path.stat().st_size
+        if size <= self.max_bytes:
+            return path
+
+        duration = await self._duration(path)
+        output = path.with_name(f"{path.stem}.upload.mp4")
+        if duration:
+            # Leave 10% headroom for container overhead and rate control overshoot
+            total_kbps = self.max_bytes * 8 * 0.9 / duration / 1000
+            video_kbps = max(200, int(total_kbps - TRANSCODE_AUDIO_KBPS))
+            video_args = ["-b:v", f"{video_kbps}k", "-maxrate", f"{video_kbps}k", "-bufsize", f"{video_kbps * 2}k"]
+        else:
+            video_args = ["-crf", "28", "-vf", "scale=-2:720"]
+
+        args = [
+            "-y", "-v", "error", "-i", str(path),
+            "-c:v", "libx264", "-preset", "veryfast", *video_args,
+            "-c:a", "aac", "-b:a", f"{TRANSCODE_AUDIO_KBPS}k",
+            "-movflags", "+faststart", str(output),
+        ]
+        logger.info(f"{path.name} is {size} bytes, over the {self.max_bytes} byte budget; transcoding")
+        ok, _ = await self._run_tool(self.ffmpeg, args, self.transcode_timeout)
+        if not ok or not output.exists():
+            output.unlink(missing_ok=True)
+            logger.warning(f"Transcoding {path.name} failed, uploading the original")
+            return path
+
+        self._transcodes += 1
+        new_size = output.stat().st_size
+        logger.info(f"Transcoded {path.name}: {size} -> {new_size} bytes")
+        if new_size >= size:
+            output.unlink(missing_ok=True)
+            return path
+        return output
+
+    async def _duration(self, path: Path) -> Optional[float]:
+        ok, stdout = await self._run_tool(
+            self.ffprobe,
+            ["-v", "error", "-show_entries", "format=duration", "-of", "default=nw=1:nk=1", str(path)],
+            timeout=30
+        )
+        try:
+            return float(stdout.strip()) if ok else None
+        except ValueError:
+            return None
+
+    async def _run_tool(self, tool: str, args: list[str], timeout: float) -> tuple[bool, str]:
+        cmd = f"{tool} {shlex.join(args)}"
+        if self.shell_prefix:
+            cmd = f"{self.shell_prefix} && {cmd}"
+        try:
+            process = await asyncio.create_subprocess_shell(
+                cmd,
+                cwd=str(self.tool_cwd) if self.tool_cwd else None,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                executable="/bin/bash"
+            )
+        except OSError as e:
+            logger.error(f"Could not run {tool}: {e}")
+            return False, ""
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            logger.error(f"{tool} timed out after {timeout}s")
+            return False, ""
+        except asyncio.CancelledError:
+            process.kill()
+            raise
+        if process.returncode != 0:
+            logger.error(f"{tool} failed (exit code {process.returncode}): {stderr.decode(errors='replace')[:1000]}")
+            return False, ""
+        return True, stdout.decode(errors="replace")
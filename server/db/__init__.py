@@ -1,5 +1,15 @@
 """Database module for Supabase integration."""
 
-from .supabase import get_supabase_client, supabase
+from .supabase import (
+    get_supabase_client,
+    get_async_supabase_client,
+    close_async_supabase_client,
+    supabase,
+)
 
-__all__ = ["get_supabase_client", "supabase"]
+__all__ = [
+    "get_supabase_client",
+    "get_async_supabase_client",
+    "close_async_supabase_client",
+    "supabase",
+]
@@ -0,0 +1,14 @@
+-- Migration: 003_create_response_cache
+-- Description: Shared tier of the /generate-content response cache
+
+CREATE TABLE IF NOT EXISTS response_cache (
+  cache_key TEXT PRIMARY KEY,
+  value JSONB NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_response_cache_expires_at ON response_cache(expires_at);
+
+-- Expired entries are ignored on read; run periodically to reclaim space:
+-- DELETE FROM response_cache WHERE expires_at < NOW();
@@ -0,0 +1,47 @@
+-- Migration: 004_content_log_full_text_search
+-- Description: Ranked full-text search over content_log (title, platform, content)
+
+-- Weighted search document, maintained by Postgres on every insert/update.
+-- Adding a stored generated column rewrites content_log once.
+ALTER TABLE content_log
+ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+  setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+  setweight(to_tsvector('english', coalesce(platform, '')), 'B') ||
+  setweight(to_tsvector('english', coalesce(content, '')), 'C')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_content_log_search_vector ON content_log USING GIN(search_vector);
+
+-- Ranked search with optional content_type filter and pagination.
+-- Called from the API as supabase.rpc('search_content_log', {...}).
+CREATE OR REPLACE FUNCTION search_content_log(
+  search_query TEXT,
+  filter_content_type TEXT DEFAULT NULL,
+  result_limit INT DEFAULT 20,
+  result_offset INT DEFAULT 0
+)
+RETURNS TABLE (
+  id UUID,
+  session_id TEXT,
+  created_at TIMESTAMPTZ,
+  content_type TEXT,
+  platform TEXT,
+  title TEXT,
+  content TEXT,
+  metadata JSONB,
+  performance JSONB,
+  rank REAL
+)
+LANGUAGE sql STABLE AS $$
+  SELECT
+    c.id, c.session_id, c.created_at, c.content_type, c.platform,
+    c.title, c.content, c.metadata, c.performance,
+    ts_rank_cd(c.search_vector, q) AS rank
+  FROM content_log c, websearch_to_tsquery('english', search_query) q
+  WHERE c.search_vector @@ q
+    AND (filter_content_type IS NULL OR c.content_type = filter_content_type)
+  ORDER BY rank DESC, c.created_at DESC
+  LIMIT result_limit OFFSET result_offset;
+$$;
+
+COMMENT ON COLUMN content_log.search_vector IS 'Weighted tsvector of title (A), platform (B) and content (C) for search_content_log()';
@@ -1,26 +1,124 @@
-"""Supabase client singleton."""
+"""Supabase client singletons."""
 
+import asyncio
 import os
+import re
+import time
 from functools import lru_cache
+from typing import Optional
 
+import httpx
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from prometheus_client import Counter, Histogram
+from supabase import create_client, acreate_client, Client, AsyncClient, AsyncClientOptions
 
 # Load environment variables (override=True to use .env over shell vars)
 load_dotenv(override=True)
 
+# Connection pool for the async client
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+SUPABASE_MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "10"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
 
-@lru_cache()
-def get_supabase_client() -> Client:
-    """Get or create Supabase client singleton."""
+_async_client: Optional[AsyncClient] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_async_client_lock = asyncio.Lock()
+
+# Latency of every call made through the async client, served on /metrics
+SUPABASE_LATENCY = Histogram(
+    "supabase_request_duration_seconds",
+    "Supabase REST call latency until response headers",
+    ["method", "table"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+SUPABASE_ERRORS = Counter(
+    "supabase_request_errors_total",
+    "Supabase REST calls that returned an error status",
+    ["method", "table"],
+)
+
+# /rest/v1/<table> or /rest/v1/rpc/<function>
+_REST_PATH = re.compile(r"/rest/v1/(rpc/)?([A-Za-z0-9_]+)")
+
+
+def _table_label(path: str) -> str:
+    match = _REST_PATH.search(path)
+    if not match:
+        return "other"
+    return f"rpc:{match.group(2)}" if match.group(1) else match.group(2)
+
+
+async def _start_timer(request: httpx.Request) -> None:
+    request.extensions["metrics_start"] = time.perf_counter()
+
+
+async def _observe_response(response: httpx.Response) -> None:
+    start = response.request.extensions.get("metrics_start")
+    if start is None:
+        return
+    labels = (response.request.method, _table_label(response.request.url.path))
+    SUPABASE_LATENCY.labels(*labels).observe(time.perf_counter() - start)
+    if response.status_code >= 400:
+        SUPABASE_ERRORS.labels(*labels).inc()
+
+
+def _get_credentials() -> tuple[str, str]:
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
 
     if not url or not key:
         raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
 
+    return url, key
+
+
+@lru_cache()
+def get_supabase_client() -> Client:
+    """Get or create Supabase client singleton."""
+    url, key = _get_credentials()
     return create_client(url, key)
 
 
+async def get_async_supabase_client() -> AsyncClient:
+    """
+    Get or create the async Supabase client singleton.
+
+    All requests share one HTTP/2 keep-alive connection pool, so database
+    calls never block the event loop and reuse open connections.
+    """
+    global _async_client, _async_http_client
+
+    async with _async_client_lock:
+        if _async_client is None:
+            url, key = _get_credentials()
+            _async_http_client = httpx.AsyncClient(
+                http2=True,
+                timeout=httpx.Timeout(SUPABASE_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=SUPABASE_MAX_CONNECTIONS,
+                    max_keepalive_connections=SUPABASE_MAX_KEEPALIVE,
+                ),
+                follow_redirects=True,
+                event_hooks={"request": [_start_timer], "response": [_observe_response]},
+            )
+            _async_client = await acreate_client(
+                url,
+                key,
+                options=AsyncClientOptions(httpx_client=_async_http_client)
+            )
+
+    return _async_client
+
+
+async def close_async_supabase_client() -> None:
+    """Close the async client's connection pool."""
+    global _async_client, _async_http_client
+
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+    _async_client = None
+    _async_http_client = None
+
+
 # Convenience export
 supabase = get_supabase_client
@@ -7,28 +7,34 @@ This server provides both:
 
 Endpoints:
 - POST /generate-content: Stateless content generation
+- POST /generate-content/batch: Many content requests at once, streamed as NDJSON
 - POST /agent/chat: Stateful conversation with agent
-- POST /agent/task: Assign autonomous task
+- POST /agent/chat/stream: Stateful conversation streamed as Server-Sent Events
+- POST /agent/task: Queue autonomous task for a background worker
 - GET /agent/status/{task_id}: Check task status
 - GET /agent/history: List sessions and content
 - GET /health: Health check for Railway
 """
 
+import asyncio
+import json
 import os
 import sys
-from contextlib import asynccontextmanager
+import time
+from contextlib import aclosing, asynccontextmanager
 from typing import Optional
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
 from claude_agent_sdk import (
-    query,
     ClaudeAgentOptions,
     AssistantMessage,
     TextBlock,
+    ToolUseBlock,
     ResultMessage,
     ClaudeSDKError,
     CLINotFoundError,
@@ -43,7 +49,31 @@ load_dotenv(override=True)
 # Add server directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from agent import AgentClient, AgentMemory
+from agent import (
+    AdmissionController,
+    AdmissionRejectedError,
+    AgentClient,
+    BrandContext,
+    DirectoryFingerprint,
+    HealthMonitor,
+    PromptCacheStats,
+    ResponseCache,
+    AsyncAgentMemory,
+    TaskExecutor,
+    QueuedTask,
+    TaskQueueFullError,
+    SessionPool,
+    SessionPoolTimeoutError,
+    SingleFlight,
+)
+from agent.metrics import (
+    NO_CONTENT_TYPE,
+    REQUESTS,
+    observe_agent_result,
+    observe_agent_run,
+    render_metrics,
+)
+from db import close_async_supabase_client, get_async_supabase_client
 from models import (
     ChatRequest,
     TaskRequest,
@@ -54,26 +84,71 @@ from models import (
     ContentResponse,
     HealthResponse,
     ContentRequest,
+    BatchContentRequest,
     ChatMetadata,
     ContentMetadata,
     SessionSummary,
     ContentSummary,
+    ContentSearchResult,
+    ContentSearchResponse,
 )
 
 # Configuration
 SKILLS_DIR = os.getenv("SKILLS_DIR", "/app")
+BRAND_DIR = os.getenv("BRAND_DIR", os.path.join(SKILLS_DIR, "brands", "base44"))
 MAX_TURNS = int(os.getenv("MAX_TURNS", "20"))
 MAX_BUDGET_USD = float(os.getenv("MAX_BUDGET_USD", "5.0"))
+CHAT_RESUME_ENABLED = os.getenv("CHAT_RESUME_ENABLED", "true").lower() == "true"
+CHAT_HISTORY_MAX_TOKENS = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "4000"))
+TASK_WORKERS = int(os.getenv("TASK_WORKERS", "2"))
+TASK_QUEUE_SIZE = int(os.getenv("TASK_QUEUE_SIZE", "50"))
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "true").lower() == "true"
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "50"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "1.0"))
+STATS_RECONCILE_INTERVAL = float(os.getenv("STATS_RECONCILE_INTERVAL", "300"))
+CONTENT_SEARCH_INDEX_SIZE = int(os.getenv("CONTENT_SEARCH_INDEX_SIZE", "5000"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SHARED = os.getenv("RESPONSE_CACHE_SHARED", "false").lower() == "true"
+CLI_POOL_MIN_SIZE = int(os.getenv("CLI_POOL_MIN_SIZE", "1"))
+CLI_POOL_MAX_SIZE = int(os.getenv("CLI_POOL_MAX_SIZE", "4"))
+CLI_POOL_MAX_USES = int(os.getenv("CLI_POOL_MAX_USES", "1"))
+CLI_POOL_ACQUIRE_TIMEOUT = float(os.getenv("CLI_POOL_ACQUIRE_TIMEOUT", "60"))
+HEALTH_REFRESH_INTERVAL = float(os.getenv("HEALTH_REFRESH_INTERVAL", "15"))
+COALESCE_MAX_INFLIGHT = int(os.getenv("COALESCE_MAX_INFLIGHT", "256"))
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "4"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "60"))
+ADMISSION_MAX_PER_CALLER = int(os.getenv("ADMISSION_MAX_PER_CALLER", "4"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+BATCH_MAX_PARALLEL = int(os.getenv("BATCH_MAX_PARALLEL", "4"))
 
 # Global instances
+brand_context: Optional[BrandContext] = None
+session_pool: Optional[SessionPool] = None
+response_cache: Optional[ResponseCache] = None
+prompt_stats = PromptCacheStats()
+# Identical concurrent requests share one agent run
+content_flight = SingleFlight(max_inflight=COALESCE_MAX_INFLIGHT)
+chat_flight = SingleFlight(max_inflight=COALESCE_MAX_INFLIGHT)
+# Global ceiling on concurrent agent runs (each holds a CLI subprocess)
+admission = AdmissionController(
+    max_concurrent=ADMISSION_MAX_CONCURRENT,
+    max_queue=ADMISSION_MAX_QUEUE,
+    max_queue_wait=ADMISSION_QUEUE_TIMEOUT,
+    max_per_caller=ADMISSION_MAX_PER_CALLER
+)
 agent_client: Optional[AgentClient] = None
-agent_memory: Optional[AgentMemory] = None
+agent_memory: Optional[AsyncAgentMemory] = None
+task_executor: Optional[TaskExecutor] = None
+health_monitor: Optional[HealthMonitor] = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events."""
-    global agent_client, agent_memory
+    global agent_client, agent_memory, task_executor, session_pool, response_cache, brand_context
+    global health_monitor
 
     # Verify skills directory exists
     skills_path = os.path.join(SKILLS_DIR, ".claude", "skills")
@@ -83,24 +158,112 @@ async def lifespan(app: FastAPI):
     else:
         print(f"Warning: Skills directory not found at {skills_path}")
 
+    # Compile brand files into a prompt bundle, rebuilt when they change
+    brand_context = BrandContext(BRAND_DIR)
+    if os.path.isdir(BRAND_DIR):
+        await brand_context.start()
+    else:
+        print(f"Warning: Brand directory not found at {BRAND_DIR}")
+
+    # Pre-warm CLI sessions for stateless generation
+    session_pool = SessionPool(
+        min_size=CLI_POOL_MIN_SIZE,
+        max_size=CLI_POOL_MAX_SIZE,
+        max_uses=CLI_POOL_MAX_USES,
+        acquire_timeout=CLI_POOL_ACQUIRE_TIMEOUT
+    )
+    await session_pool.start()
+    session_pool.warm(build_content_options())
+
+    # Response cache, invalidated whenever brand or skill files change
+    shared_cache_client = None
+    if RESPONSE_CACHE_SHARED:
+        try:
+            shared_cache_client = await get_async_supabase_client()
+        except Exception as e:
+            print(f"Warning: Shared response cache disabled: {e}")
+    # Rescanned in a worker thread, so requests never wait on the filesystem
+    cache_fingerprint = DirectoryFingerprint([
+        os.path.join(SKILLS_DIR, "brands"),
+        skills_path,
+    ])
+    await cache_fingerprint.start()
+    response_cache = ResponseCache(
+        max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds=RESPONSE_CACHE_TTL,
+        fingerprint=cache_fingerprint,
+        shared_client=shared_cache_client
+    )
+
     # Initialize agent client and memory
     try:
+        agent_memory = await AsyncAgentMemory.create(
+            write_behind=WRITE_BEHIND_ENABLED,
+            flush_batch_size=WRITE_BEHIND_BATCH_SIZE,
+            flush_interval=WRITE_BEHIND_FLUSH_INTERVAL,
+            stats_reconcile_interval=STATS_RECONCILE_INTERVAL,
+            search_index_size=CONTENT_SEARCH_INDEX_SIZE
+        )
+        await agent_memory.start()
         agent_client = AgentClient(
+            memory=agent_memory,
             skills_dir=SKILLS_DIR,
             max_turns=MAX_TURNS,
-            max_budget_usd=MAX_BUDGET_USD
+            max_budget_usd=MAX_BUDGET_USD,
+            session_pool=session_pool,
+            brand_context=brand_context,
+            resume_sessions=CHAT_RESUME_ENABLED,
+            history_max_tokens=CHAT_HISTORY_MAX_TOKENS,
+            prompt_stats=prompt_stats,
+            coalescer=chat_flight,
+            admission=admission
+        )
+        agent_client.warm_up()
+        task_executor = TaskExecutor(
+            agent_client,
+            agent_memory,
+            num_workers=TASK_WORKERS,
+            max_queue_size=TASK_QUEUE_SIZE,
+            admission=admission
         )
-        agent_memory = AgentMemory()
+        await task_executor.start()
         print("Agent client and memory initialized")
     except Exception as e:
         print(f"Warning: Could not initialize agent: {e}")
         print("Stateless endpoints will still work")
 
+    # Probes read this snapshot instead of doing I/O themselves
+    health_monitor = HealthMonitor(
+        skills_path,
+        db_probe=probe_database,
+        components={
+            "task_queue": lambda: task_executor.stats() if task_executor else None,
+            "cli_pool": lambda: session_pool.stats() if session_pool else None,
+        },
+        refresh_interval=HEALTH_REFRESH_INTERVAL
+    )
+    await health_monitor.start()
+
     yield
 
     # Cleanup
+    await health_monitor.stop()
+    if task_executor:
+        await task_executor.stop()
+    await session_pool.close()
+    await brand_context.stop()
+    await cache_fingerprint.stop()
+    if agent_memory:
+        # Write out buffered messages and session updates
+        await agent_memory.close()
+    await close_async_supabase_client()
     agent_client = None
     agent_memory = None
+    task_executor = None
+    session_pool = None
+    response_cache = None
+    brand_context = None
+    health_monitor = None
 
 
 app = FastAPI(
@@ -122,44 +285,213 @@ app.add_middleware(
 
 # ==================== Helper Functions ====================
 
-def build_prompt(request: ContentRequest) -> str:
-    """Build the full prompt with content type hints for skill activation."""
-    content_type_hints = {
-        # Original skills
-        "linkedin": "Use the linkedin-viral skill to format this content for LinkedIn with hooks and engagement patterns.",
-        "email": "Use the direct-response-copy skill with THE SLIDE framework for this email content.",
-        "seo": "Use the seo-content skill to optimize this content for search engines.",
-        "geo": "Use the geo-content skill to optimize this content for AI citation and LLM discovery.",
-        "direct-response": "Use the direct-response-copy skill with THE SLIDE framework.",
-        "landing-page": "Use the landing-page-architecture skill with the 8-Section Framework: HERO, SUCCESS, PROBLEM-AGITATE, VALUE STACK, SOCIAL PROOF, TRANSFORMATION, SECONDARY CTA, FOOTER. Each section has ONE job.",
-        "general": "Apply the brand-voice skill to ensure consistent tone and messaging.",
-        # New skills from marketing-skills suite
-        "linkedin-post": "Use the linkedin-post skill for authentic LinkedIn content with anti-template philosophy.",
-        "x-post": "Use the x-post skill for Twitter/X content.",
-        "video": "Use the base44-video skill for Remotion video generation.",
-        "diagram": "Use the excalidraw-diagram skill for visual diagrams.",
-        "slides": "Use the pptx-generator skill for presentations.",
-        "image": "Use the nano-banana skill for AI image generation with Gemini.",
-        "brand-setup": "Use the brand-voice-generator skill to create brand systems.",
-        "sop": "Use the sop-creator skill for runbooks and documentation.",
-        "skill": "Use the skill-creator skill to create new Claude Code skills.",
-    }
+def build_content_options() -> ClaudeAgentOptions:
+    """Build the ClaudeAgentOptions used for stateless content generation."""
+    return ClaudeAgentOptions(
+        cwd=SKILLS_DIR,
+        setting_sources=["project"],
+        permission_mode="bypassPermissions",
+        max_turns=MAX_TURNS,
+        max_budget_usd=MAX_BUDGET_USD,
+        allowed_tools=["Read", "Glob", "Grep"],
+    )
 
-    hint = content_type_hints.get(request.content_type, content_type_hints["general"])
 
-    prompt_parts = [
-        f"Content Type: {request.content_type}",
+async def probe_database() -> None:
+    """Check database reachability for the health snapshot."""
+    if not agent_memory:
+        raise RuntimeError("Agent memory not initialized")
+    await agent_memory.ping()
+
+
+def resolve_cache_mode(request: ContentRequest, http_request: Request) -> str:
+    """Combine the request's cache flag with standard Cache-Control directives."""
+    if request.cache != "default":
+        return request.cache
+
+    cache_control = http_request.headers.get("cache-control", "").lower()
+    if "no-store" in cache_control:
+        return "bypass"
+    if "no-cache" in cache_control:
+        return "refresh"
+    return "default"
+
+
+def caller_id(http_request: Request) -> str:
+    """Identify who is asking, for per-caller admission fairness."""
+    # The Slack bot sends its users' IDs; anything else is told apart by address
+    caller = http_request.headers.get("x-caller-id")
+    if caller:
+        return caller[:128]
+    return http_request.client.host if http_request.client else "unknown"
+
+
+def busy_error(e: AdmissionRejectedError) -> HTTPException:
+    """429 telling the client when to retry a shed request."""
+    return HTTPException(429, str(e), headers={"Retry-After": e.retry_after_header})
+
+
+# Skill activation hints per content type
+CONTENT_TYPE_HINTS = {
+    # Original skills
+    "linkedin": "Use the linkedin-viral skill to format this content for LinkedIn with hooks and engagement patterns.",
+    "email": "Use the direct-response-copy skill with THE SLIDE framework for this email content.",
+    "seo": "Use the seo-content skill to optimize this content for search engines.",
+    "geo": "Use the geo-content skill to optimize this content for AI citation and LLM discovery.",
+    "direct-response": "Use the direct-response-copy skill with THE SLIDE framework.",
+    "landing-page": "Use the landing-page-architecture skill with the 8-Section Framework: HERO, SUCCESS, PROBLEM-AGITATE, VALUE STACK, SOCIAL PROOF, TRANSFORMATION, SECONDARY CTA, FOOTER. Each section has ONE job.",
+    "general": "Apply the brand-voice skill to ensure consistent tone and messaging.",
+    # New skills from marketing-skills suite
+    "linkedin-post": "Use the linkedin-post skill for authentic LinkedIn content with anti-template philosophy.",
+    "x-post": "Use the x-post skill for Twitter/X content.",
+    "video": "Use the base44-video skill for Remotion video generation.",
+    "diagram": "Use the excalidraw-diagram skill for visual diagrams.",
+    "slides": "Use the pptx-generator skill for presentations.",
+    "image": "Use the nano-banana skill for AI image generation with Gemini.",
+    "brand-setup": "Use the brand-voice-generator skill to create brand systems.",
+    "sop": "Use the sop-creator skill for runbooks and documentation.",
+    "skill": "Use the skill-creator skill to create new Claude Code skills.",
+}
+
+
+def build_prompt_prefix(content_type: str) -> str:
+    """
+    Build the fixed start of a prompt for a content type.
+
+    It only depends on the brand bundle and the content type, so repeat
+    requests of a type send a byte-identical prefix the prompt cache can reuse.
+    """
+    hint = CONTENT_TYPE_HINTS.get(content_type, CONTENT_TYPE_HINTS["general"])
+
+    prompt_parts = []
+
+    # Inline the brand files so the agent doesn't spend turns reading them
+    if brand_context and brand_context.bundle:
+        prompt_parts += [
+            "Brand Context (already loaded - do not Read these files again):",
+            brand_context.bundle,
+            "",
+        ]
+
+    prompt_parts += [
+        f"Content Type: {content_type}",
         f"Skill Hint: {hint}",
-        "",
-        f"Request: {request.prompt}",
     ]
 
+    return "\n".join(prompt_parts)
+
+
+def build_prompt(request: ContentRequest) -> str:
+    """Build the full prompt: the stable prefix, then the request-specific lines."""
+    prompt_parts = [build_prompt_prefix(request.content_type)]
+
     if request.additional_context:
-        prompt_parts.insert(3, f"Additional Context: {request.additional_context}")
+        prompt_parts.append(f"Additional Context: {request.additional_context}")
+
+    prompt_parts += ["", f"Request: {request.prompt}"]
 
     return "\n".join(prompt_parts)
 
 
+def format_sse(event: str, data: dict) -> str:
+    """Format a dict as a Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream_chat_events(message: str, session_id: Optional[str], caller: str, http_request: Request):
+    """
+    Forward AgentClient.chat() chunks as SSE events as soon as they arrive.
+
+    The agent stream is only advanced after the previous event has been
+    written to the socket, so a slow reader pauses the SDK client instead
+    of buffering the reply in memory. Closing the agent stream on
+    disconnect shuts down the SDK client and its CLI process.
+
+    The run waits for an admission slot first; if it is shed while
+    queued, an `error` event carries `retry_after` in seconds.
+    """
+    stream = agent_client.chat(message, session_id)
+    start = time.monotonic()
+    result = None
+    rejected = False
+    try:
+        async with admission.slot(caller):
+            async for chunk in stream:
+                if await http_request.is_disconnected():
+                    print(f"Client disconnected, stopping chat for {chunk.get('session_id')}")
+                    break
+                if chunk["type"] == "result":
+                    result = chunk
+                yield format_sse(chunk["type"], chunk)
+    except AdmissionRejectedError as e:
+        rejected = True
+        yield format_sse("error", {
+            "type": "error",
+            "session_id": session_id,
+            "error": str(e),
+            "retry_after": int(e.retry_after_header)
+        })
+    except Exception as e:
+        yield format_sse("error", {"type": "error", "session_id": session_id, "error": str(e)})
+    finally:
+        await stream.aclose()
+        if rejected:
+            REQUESTS.labels("/agent/chat/stream", NO_CONTENT_TYPE, "rejected").inc()
+        else:
+            observe_agent_result(
+                "/agent/chat/stream", NO_CONTENT_TYPE, time.monotonic() - start, result or {}, error=result is None
+            )
+
+
+async def stream_batch_results(items: list[ContentRequest], parallelism: int, http_request: Request):
+    """
+    Generate batch items concurrently, yielding an NDJSON line per item as it finishes.
+
+    Each item goes through generate_content, so it gets the response cache,
+    coalescing and admission control like a single request. A failed item
+    becomes an `error` line and never affects the others. Disconnecting
+    cancels the items still running.
+    """
+    semaphore = asyncio.Semaphore(parallelism)
+    start = time.monotonic()
+
+    async def run_item(index: int, item: ContentRequest) -> dict:
+        async with semaphore:
+            try:
+                response = await generate_content(item, http_request)
+            except HTTPException as e:
+                line = {"type": "error", "index": index, "status_code": e.status_code, "error": e.detail}
+                retry_after = (e.headers or {}).get("Retry-After")
+                if retry_after:
+                    line["retry_after"] = int(retry_after)
+                return line
+            except Exception as e:
+                return {"type": "error", "index": index, "status_code": 500, "error": str(e)}
+            return {"type": "result", "index": index, **response.model_dump()}
+
+    tasks = [asyncio.create_task(run_item(i, item)) for i, item in enumerate(items)]
+    succeeded = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            if await http_request.is_disconnected():
+                print(f"Client disconnected, cancelling batch of {len(items)}")
+                return
+            succeeded += line["type"] == "result"
+            yield json.dumps(line, default=str) + "\n"
+        yield json.dumps({
+            "type": "done",
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded,
+            "duration_ms": round((time.monotonic() - start) * 1000)
+        }) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
 # ==================== Health & Info Endpoints ====================
 
 @app.get("/")
@@ -171,80 +503,177 @@ async def root():
         "endpoints": {
             "stateless": {
                 "health": "GET /health",
-                "generate": "POST /generate-content"
+                "liveness": "GET /livez",
+                "readiness": "GET /readyz",
+                "metrics": "GET /metrics",
+                "generate": "POST /generate-content",
+                "generate_batch": "POST /generate-content/batch"
             },
             "stateful": {
                 "chat": "POST /agent/chat",
+                "chat_stream": "POST /agent/chat/stream",
                 "task": "POST /agent/task",
                 "status": "GET /agent/status/{task_id}",
-                "history": "GET /agent/history"
+                "history": "GET /agent/history",
+                "content_search": "GET /agent/content/search"
             }
         }
     }
 
 
+@app.get("/livez")
+async def liveness():
+    """Liveness probe. Does no I/O, so it only fails if the event loop is stuck."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readiness():
+    """Readiness probe served from the background health snapshot."""
+    if not health_monitor or not health_monitor.is_ready():
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unavailable", "snapshot": health_monitor.snapshot if health_monitor else None}
+        )
+
+    snapshot = health_monitor.snapshot
+    degraded = not snapshot["skills_loaded"] or not snapshot["database"]["connected"]
+    return {
+        "status": "degraded" if degraded else "ok",
+        "agent_ready": agent_client is not None,
+        **snapshot
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: agent latency, turns, tools and cost, CLI spawns and Supabase calls."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint for Railway and monitoring."""
-    skills_path = os.path.join(SKILLS_DIR, ".claude", "skills")
-    skills = []
-    db_connected = False
-
-    if os.path.exists(skills_path):
-        skills = [d for d in os.listdir(skills_path)
-                  if os.path.isdir(os.path.join(skills_path, d))]
-
-    # Check database connection
-    if agent_memory:
-        try:
-            agent_memory.get_stats()
-            db_connected = True
-        except Exception:
-            db_connected = False
+    snapshot = health_monitor.snapshot if health_monitor else None
 
     return {
         "status": "ok",
-        "skills_loaded": skills,
-        "skills_directory": skills_path,
-        "database_connected": db_connected,
-        "agent_ready": agent_client is not None
+        "skills_loaded": snapshot["skills_loaded"] if snapshot else [],
+        "skills_directory": os.path.join(SKILLS_DIR, ".claude", "skills"),
+        "database_connected": snapshot["database"]["connected"] if snapshot else False,
+        "agent_ready": agent_client is not None,
+        "conversations": agent_client.stats() if agent_client else None,
+        "task_queue": task_executor.stats() if task_executor else None,
+        "cli_pool": session_pool.stats() if session_pool else None,
+        "response_cache": response_cache.stats() if response_cache else None,
+        "brand_context": brand_context.stats() if brand_context else None,
+        "content_search_index": agent_memory.search_stats() if agent_memory else None,
+        "prompt_cache": prompt_stats.stats(),
+        "coalescing": {"content": content_flight.stats(), "chat": chat_flight.stats()},
+        "admission": admission.stats()
     }
 
 
 # ==================== Stateless Endpoints ====================
 
 @app.post("/generate-content")
-async def generate_content(request: ContentRequest):
+async def generate_content(request: ContentRequest, http_request: Request):
     """
     Generate marketing content (stateless).
 
     This is the original webhook endpoint - no memory, no session.
     Good for simple integrations that don't need state.
+
+    Identical requests are served from the response cache. Set `cache` to
+    "refresh" or "bypass" (or send Cache-Control: no-cache / no-store)
+    to regenerate. Identical requests that arrive while one is still
+    generating wait for it and share its result.
+
+    Returns 429 with Retry-After when the server is at its agent run
+    ceiling and the wait queue is full or too slow.
     """
+    if not session_pool or not response_cache:
+        raise HTTPException(503, "Server is starting up")
+
     full_prompt = build_prompt(request)
+    options = build_content_options()
+    # Unknown content types share one label to keep metric cardinality bounded
+    metrics_content_type = request.content_type if request.content_type in CONTENT_TYPE_HINTS else "other"
+
+    cache_mode = resolve_cache_mode(request, http_request)
+    cache_key = response_cache.make_key(full_prompt, options)
+    if cache_mode == "default":
+        cached = await response_cache.get(cache_key)
+        if cached:
+            REQUESTS.labels("/generate-content", metrics_content_type, "cached").inc()
+            return ContentResponse(
+                content=cached["content"],
+                metadata=ContentMetadata(**cached["metadata"], cached=True)
+            )
+    elif cache_mode == "refresh":
+        response_cache.record_refresh()
+    else:
+        response_cache.record_bypass()
 
-    options = ClaudeAgentOptions(
-        cwd=SKILLS_DIR,
-        setting_sources=["project"],
-        permission_mode="bypassPermissions",
-        max_turns=MAX_TURNS,
-        max_budget_usd=MAX_BUDGET_USD,
-        allowed_tools=["Read", "Glob", "Grep"],
-    )
+    caller = caller_id(http_request)
 
+    async def admitted_generation() -> ContentResponse:
+        async with admission.slot(caller):
+            return await run_generation(request, full_prompt, options, cache_key, cache_mode, metrics_content_type)
+
+    try:
+        result, joined = await content_flight.run(cache_key, admitted_generation)
+    except AdmissionRejectedError as e:
+        REQUESTS.labels("/generate-content", metrics_content_type, "rejected").inc()
+        raise busy_error(e)
+    if joined:
+        REQUESTS.labels("/generate-content", metrics_content_type, "coalesced").inc()
+        return result.model_copy(update={"metadata": result.metadata.model_copy(update={"coalesced": True})})
+    return result
+
+
+async def run_generation(
+    request: ContentRequest,
+    full_prompt: str,
+    options: ClaudeAgentOptions,
+    cache_key: str,
+    cache_mode: str,
+    metrics_content_type: str
+) -> ContentResponse:
+    """Run the agent for a /generate-content request and cache the result."""
     content_parts = []
     metadata = ContentMetadata(content_type=request.content_type)
+    start = time.monotonic()
+    ttft_ms = None
+    tool_calls = 0
+    turns = None
+    status = "error"
 
     try:
-        async for message in query(prompt=full_prompt, options=options):
-            if isinstance(message, AssistantMessage):
-                for block in message.content:
-                    if isinstance(block, TextBlock):
-                        content_parts.append(block.text)
-            elif isinstance(message, ResultMessage):
-                metadata.is_error = message.is_error
-                metadata.cost_usd = message.total_cost_usd
-                metadata.duration_ms = message.duration_ms
+        async with session_pool.session(options) as session, \
+                aclosing(session.run(full_prompt)) as messages:
+            async for message in messages:
+                if isinstance(message, AssistantMessage):
+                    for block in message.content:
+                        if isinstance(block, TextBlock):
+                            if ttft_ms is None:
+                                ttft_ms = (time.monotonic() - start) * 1000
+                            content_parts.append(block.text)
+                        elif isinstance(block, ToolUseBlock):
+                            tool_calls += 1
+                elif isinstance(message, ResultMessage):
+                    turns = message.num_turns
+                    metadata.is_error = message.is_error
+                    metadata.cost_usd = message.total_cost_usd
+                    metadata.duration_ms = message.duration_ms
+                    metadata.usage = prompt_stats.record(
+                        f"generate:{request.content_type}",
+                        message.usage,
+                        ttft_ms,
+                        prefix=build_prompt_prefix(request.content_type)
+                    )
+                    metadata.ttft_ms = round(ttft_ms) if ttft_ms is not None else None
 
         content = "".join(content_parts)
 
@@ -253,9 +682,18 @@ async def generate_content(request: ContentRequest):
                 status_code=500,
                 detail="No content generated. Check that skills are properly loaded."
             )
+        status = "error" if metadata.is_error else "ok"
+
+        if cache_mode != "bypass" and not metadata.is_error:
+            await response_cache.set(cache_key, {
+                "content": content,
+                "metadata": metadata.model_dump(exclude={"cached"})
+            })
 
         return ContentResponse(content=content, metadata=metadata)
 
+    except SessionPoolTimeoutError as e:
+        raise HTTPException(503, f"Server busy: {e}", headers={"Retry-After": "10"})
     except CLINotFoundError:
         raise HTTPException(500, "Claude Code CLI not installed")
     except CLIConnectionError as e:
@@ -266,12 +704,50 @@ async def generate_content(request: ContentRequest):
         raise HTTPException(500, f"Parse error: {e}")
     except ClaudeSDKError as e:
         raise HTTPException(500, f"SDK error: {e}")
+    finally:
+        observe_agent_run(
+            "/generate-content",
+            metrics_content_type,
+            time.monotonic() - start,
+            status=status,
+            ttft_ms=ttft_ms,
+            turns=turns,
+            tool_calls=tool_calls,
+            cost_usd=metadata.cost_usd
+        )
+
+
+@app.post("/generate-content/batch")
+async def generate_content_batch(request: BatchContentRequest, http_request: Request):
+    """
+    Generate many pieces of content at once (stateless).
+
+    Items run concurrently, at most `parallelism` at a time (capped by
+    BATCH_MAX_PARALLEL and ADMISSION_MAX_PER_CALLER), and results stream back as NDJSON in the order
+    they finish. Each line is a `result` or `error` with the item's
+    `index`, and a final `done` line summarizes the batch.
+    """
+    if not session_pool or not response_cache:
+        raise HTTPException(503, "Server is starting up")
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(400, f"Batch has {len(request.items)} items; the limit is {BATCH_MAX_ITEMS}")
+
+    # Items share one caller id, so more than its admission share would shed each other
+    parallelism = min(request.parallelism or BATCH_MAX_PARALLEL, BATCH_MAX_PARALLEL, ADMISSION_MAX_PER_CALLER)
+    return StreamingResponse(
+        stream_batch_results(request.items, parallelism, http_request),
+        media_type="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
 
 
 # ==================== Stateful Agent Endpoints ====================
 
 @app.post("/agent/chat")
-async def agent_chat(request: ChatRequest):
+async def agent_chat(request: ChatRequest, http_request: Request):
     """
     Stateful conversation with the agent.
 
@@ -281,10 +757,14 @@ async def agent_chat(request: ChatRequest):
     if not agent_client:
         raise HTTPException(503, "Agent not initialized. Check database connection.")
 
+    start = time.monotonic()
+    result = None
+    rejected = False
     try:
         result = await agent_client.chat_sync(
             message=request.message,
-            session_id=request.session_id
+            session_id=request.session_id,
+            caller=caller_id(http_request)
         )
 
         if result.get("error"):
@@ -296,62 +776,130 @@ async def agent_chat(request: ChatRequest):
             metadata=ChatMetadata(
                 is_error=result["metadata"].get("is_error", False),
                 cost_usd=result["metadata"].get("cost_usd"),
-                duration_ms=result["metadata"].get("duration_ms")
+                duration_ms=result["metadata"].get("duration_ms"),
+                usage=result["metadata"].get("usage"),
+                ttft_ms=result["metadata"].get("ttft_ms"),
+                coalesced=result["metadata"].get("coalesced", False)
             )
         )
 
     except HTTPException:
         raise
+    except AdmissionRejectedError as e:
+        rejected = True
+        raise busy_error(e)
     except Exception as e:
         raise HTTPException(500, f"Chat failed: {e}")
+    finally:
+        if rejected:
+            REQUESTS.labels("/agent/chat", NO_CONTENT_TYPE, "rejected").inc()
+        else:
+            observe_agent_result(
+                "/agent/chat",
+                NO_CONTENT_TYPE,
+                time.monotonic() - start,
+                result["metadata"] if result else {},
+                error=not result or bool(result.get("error"))
+            )
+
+
+@app.post("/agent/chat/stream")
+async def agent_chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Stateful conversation with the agent, streamed as Server-Sent Events.
+
+    Emits `text`, `tool_use`, `result` and `error` events as the agent
+    produces them. Disconnecting stops the agent. Returns 429 with
+    Retry-After if the server is too busy to queue the run.
+    """
+    if not agent_client:
+        raise HTTPException(503, "Agent not initialized. Check database connection.")
+
+    caller = caller_id(http_request)
+    try:
+        admission.check(caller)
+    except AdmissionRejectedError as e:
+        REQUESTS.labels("/agent/chat/stream", NO_CONTENT_TYPE, "rejected").inc()
+        raise busy_error(e)
+
+    return StreamingResponse(
+        stream_chat_events(request.message, request.session_id, caller, http_request),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
 
 
 @app.post("/agent/task")
-async def agent_task(request: TaskRequest):
+async def agent_task(request: TaskRequest, http_request: Request):
     """
     Assign an autonomous task to the agent.
 
-    The agent will work toward the goal and track progress.
-    Poll /agent/status/{task_id} to check progress.
+    The task is queued and run by a background worker; this returns
+    immediately. Poll /agent/status/{task_id} to check progress.
     """
-    if not agent_client:
+    if not agent_client or not task_executor:
         raise HTTPException(503, "Agent not initialized. Check database connection.")
 
     if not agent_memory:
         raise HTTPException(503, "Memory not initialized. Check database connection.")
 
+    # Refuse before writing anything, so a rejected task leaves no records
     try:
-        # Create task record first
-        session_id = agent_memory.create_session(metadata={
-            "type": "task",
-            "goal": request.goal
-        })
-
-        task_id = agent_memory.create_task(
-            goal=request.goal,
-            session_id=session_id,
-            webhook_url=request.webhook_url
-        )
-
-        agent_memory.update_task(task_id, status="in_progress")
+        task_executor.reserve()
+    except TaskQueueFullError as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "30"})
 
-        # For MVP, run task synchronously (blocking)
-        # TODO: Run in background for true async
-        result = await agent_client.run_task(
-            goal=request.goal,
-            task_id=task_id,
-            webhook_url=request.webhook_url
-        )
+    submitted = False
+    try:
+        try:
+            # Create task record first
+            session_id = await agent_memory.create_session(metadata={
+                "type": "task",
+                "goal": request.goal
+            })
+
+            webhook_url = str(request.webhook_url) if request.webhook_url else None
+            task_id = await agent_memory.create_task(
+                goal=request.goal,
+                session_id=session_id,
+                webhook_url=webhook_url
+            )
+        except Exception as e:
+            raise HTTPException(500, f"Task creation failed: {e}")
 
-        return TaskResponse(
+        # Record queue position before a worker can pick the task up
+        position = task_executor.queue.qsize() + 1
+        try:
+            await agent_memory.update_task(task_id, progress=f"Queued (position {position})")
+        except Exception as e:
+            # Don't leave a record that stays pending with no worker coming for it
+            try:
+                await agent_memory.update_task(task_id, status="failed", error=f"Task creation failed: {e}")
+            except Exception as mark_error:
+                print(f"Warning: Failed to mark task {task_id} failed: {mark_error}")
+            raise HTTPException(500, f"Task creation failed: {e}")
+
+        task_executor.submit(QueuedTask(
             task_id=task_id,
             session_id=session_id,
-            status=result["status"],
-            message=f"Task {result['status']}"
-        )
-
-    except Exception as e:
-        raise HTTPException(500, f"Task creation failed: {e}")
+            goal=request.goal,
+            webhook_url=webhook_url,
+            caller=caller_id(http_request)
+        ), reserved=True)
+        submitted = True
+    finally:
+        if not submitted:
+            task_executor.release()
+
+    return TaskResponse(
+        task_id=task_id,
+        session_id=session_id,
+        status="pending",
+        message=f"Task queued (position {position})"
+    )
 
 
 @app.get("/agent/status/{task_id}")
@@ -360,7 +908,7 @@ async def agent_status(task_id: str):
     if not agent_memory:
         raise HTTPException(503, "Memory not initialized")
 
-    task = agent_memory.get_task(task_id)
+    task = await agent_memory.get_task(task_id)
 
     if not task:
         raise HTTPException(404, f"Task {task_id} not found")
@@ -377,6 +925,50 @@ async def agent_status(task_id: str):
     )
 
 
+@app.get("/agent/content/search")
+async def search_content(
+    q: str,
+    content_type: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """
+    Ranked full-text search over previously created content.
+
+    Matches title, platform and body. Use this to find past content
+    to reuse or build on.
+    """
+    if not agent_memory:
+        raise HTTPException(503, "Memory not initialized")
+
+    try:
+        results = await agent_memory.search_content(
+            q, content_type=content_type, limit=limit, offset=offset
+        )
+    except Exception as e:
+        raise HTTPException(500, f"Failed to search content: {e}")
+
+    return ContentSearchResponse(
+        query=q,
+        content_type=content_type,
+        results=[
+            ContentSearchResult(
+                id=str(c["id"]),
+                created_at=c["created_at"],
+                content_type=c["content_type"],
+                platform=c.get("platform"),
+                title=c.get("title"),
+                preview=c["content"][:100] + "..." if len(c["content"]) > 100 else c["content"],
+                content=c["content"],
+                rank=c["rank"]
+            )
+            for c in results
+        ],
+        limit=limit,
+        offset=offset
+    )
+
+
 @app.get("/agent/history")
 async def agent_history(limit: int = 20):
     """
@@ -388,9 +980,9 @@ async def agent_history(limit: int = 20):
         raise HTTPException(503, "Memory not initialized")
 
     try:
-        sessions = agent_memory.list_sessions(limit=limit)
-        content = agent_memory.get_recent_content(days=90, limit=limit)
-        stats = agent_memory.get_stats()
+        sessions = await agent_memory.list_sessions(limit=limit)
+        content = await agent_memory.get_recent_content(days=90, limit=limit)
+        stats = await agent_memory.get_stats()
 
         return HistoryResponse(
             sessions=[
@@ -1,6 +1,6 @@
 """Pydantic models for API requests and responses."""
 
-from .requests import ChatRequest, TaskRequest, ContentRequest
+from .requests import ChatRequest, TaskRequest, ContentRequest, BatchContentRequest
 from .responses import (
     ChatResponse,
     ChatMetadata,
@@ -12,12 +12,15 @@ from .responses import (
     HealthResponse,
     SessionSummary,
     ContentSummary,
+    ContentSearchResult,
+    ContentSearchResponse,
 )
 
 __all__ = [
     "ChatRequest",
     "TaskRequest",
     "ContentRequest",
+    "BatchContentRequest",
     "ChatResponse",
     "ChatMetadata",
     "TaskResponse",
@@ -28,4 +31,6 @@ __all__ = [
     "HealthResponse",
     "SessionSummary",
     "ContentSummary",
+    "ContentSearchResult",
+    "ContentSearchResponse",
 ]
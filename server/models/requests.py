@@ -1,6 +1,6 @@
 """Pydantic request models."""
 
-from typing import Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field, HttpUrl
 
 
@@ -57,3 +57,25 @@ class ContentRequest(BaseModel):
         default=None,
         description="Optional additional context or requirements"
     )
+    cache: Literal["default", "refresh", "bypass"] = Field(
+        default="default",
+        description=(
+            "Response cache mode: 'default' serves cached content, 'refresh' "
+            "regenerates and updates the cache, 'bypass' skips the cache entirely"
+        )
+    )
+
+
+class BatchContentRequest(BaseModel):
+    """Request model for /generate-content/batch endpoint."""
+
+    items: List[ContentRequest] = Field(
+        ...,
+        min_length=1,
+        description="Content requests to generate concurrently"
+    )
+    parallelism: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Optional limit on items generated at once (capped by the server)"
+    )
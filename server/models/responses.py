@@ -10,6 +10,9 @@ class ChatMetadata(BaseModel):
     is_error: bool = False
     cost_usd: Optional[float] = None
     duration_ms: Optional[int] = None
+    usage: Optional[dict] = None
+    ttft_ms: Optional[int] = None
+    coalesced: bool = False
 
 
 class ChatResponse(BaseModel):
@@ -62,6 +65,23 @@ class ContentSummary(BaseModel):
     preview: str  # First 100 chars
 
 
+class ContentSearchResult(ContentSummary):
+    """A content search hit."""
+
+    content: str
+    rank: float
+
+
+class ContentSearchResponse(BaseModel):
+    """Response model for /agent/content/search endpoint."""
+
+    query: str
+    content_type: Optional[str] = None
+    results: List[ContentSearchResult]
+    limit: int
+    offset: int
+
+
 class HistoryResponse(BaseModel):
     """Response model for /agent/history endpoint."""
 
@@ -77,6 +97,10 @@ class ContentMetadata(BaseModel):
     cost_usd: Optional[float] = None
     duration_ms: Optional[int] = None
     content_type: str = "general"
+    cached: bool = False
+    coalesced: bool = False
+    usage: Optional[dict] = None
+    ttft_ms: Optional[int] = None
 
 
 class ContentResponse(BaseModel):
@@ -2,21 +2,40 @@
 
 Simple Slack integration that connects to the existing agent API.
 Uses Socket Mode for easy setup (no public URL needed).
+Runs on asyncio, so one replica can have many agent calls in flight.
 Persists user sessions in Supabase.
 Supports video generation with Remotion.
 """
 
+import asyncio
 import os
 import re
 import logging
-import subprocess
-import tempfile
+import shutil
 import httpx
 from pathlib import Path
-from slack_bolt import App
-from slack_bolt.adapter.socket_mode import SocketModeHandler
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from supabase import acreate_client, AsyncClient
+
+from bot import (
+    IntentRouter,
+    Job,
+    JobPool,
+    JobQueueFullError,
+    JobRunner,
+    AssetFingerprint,
+    LiveMessage,
+    ProfileCache,
+    RenderCache,
+    RenderPool,
+    SessionStore,
+    UploadError,
+    VideoUploader,
+    default_render_workers,
+    iter_sse,
+)
 
 load_dotenv()
 
@@ -28,7 +47,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Slack app setup
-app = App(token=os.environ.get("SLACK_BOT_TOKEN"))
+app = AsyncApp(token=os.environ.get("SLACK_BOT_TOKEN"))
 
 # Agent API URL (Railway deployment or local)
 AGENT_API_URL = os.environ.get(
@@ -36,128 +55,203 @@ AGENT_API_URL = os.environ.get(
     "https://ai-marketing-agent-production-60c7.up.railway.app"
 )
 
-# Supabase client for persisting user sessions
-supabase: Client = None
-try:
-    supabase_url = os.environ.get("SUPABASE_URL")
-    supabase_key = os.environ.get("SUPABASE_KEY")
-    if supabase_url and supabase_key:
-        supabase = create_client(supabase_url, supabase_key)
-        logger.info("Supabase connected for session persistence")
-    else:
-        logger.warning("Supabase not configured - sessions won't persist across restarts")
-except Exception as e:
-    logger.error(f"Failed to connect to Supabase: {e}")
+# Shared keep-alive connection pool to the agent API
+AGENT_API_MAX_CONNECTIONS = int(os.environ.get("AGENT_API_MAX_CONNECTIONS", "200"))
+AGENT_API_MAX_KEEPALIVE = int(os.environ.get("AGENT_API_MAX_KEEPALIVE", "20"))
+AGENT_API_KEEPALIVE_EXPIRY = float(os.environ.get("AGENT_API_KEEPALIVE_EXPIRY", "60"))
+
+http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP/2 client for agent API calls."""
+    global http_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=AGENT_API_MAX_CONNECTIONS,
+                max_keepalive_connections=AGENT_API_MAX_KEEPALIVE,
+                keepalive_expiry=AGENT_API_KEEPALIVE_EXPIRY
+            ),
+            timeout=120.0
+        )
+    return http_client
+
+
+# Supabase client for persisting user sessions (created in main)
+supabase: AsyncClient | None = None
+
+# Cached slack_users lookups; in-memory only until Supabase connects
+session_store = SessionStore(
+    max_entries=int(os.environ.get("BOT_SESSION_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.environ.get("BOT_SESSION_CACHE_TTL", "600")),
+    negative_ttl_seconds=float(os.environ.get("BOT_SESSION_CACHE_NEGATIVE_TTL", "60"))
+)
+
 
-# Fallback in-memory storage if Supabase not available
-memory_sessions: dict[str, str] = {}
+async def init_supabase():
+    """Connect to Supabase if configured."""
+    global supabase
+    try:
+        supabase_url = os.environ.get("SUPABASE_URL")
+        supabase_key = os.environ.get("SUPABASE_KEY")
+        if supabase_url and supabase_key:
+            supabase = await acreate_client(supabase_url, supabase_key)
+            session_store.client = supabase
+            logger.info("Supabase connected for session persistence")
+        else:
+            logger.warning("Supabase not configured - sessions won't persist across restarts")
+    except Exception as e:
+        logger.error(f"Failed to connect to Supabase: {e}")
 
 
-def get_user_session(slack_user_id: str) -> str | None:
+async def get_user_session(slack_user_id: str) -> str | None:
     """Get session ID for a Slack user."""
-    if supabase:
-        try:
-            result = supabase.table("slack_users").select("session_id").eq(
-                "slack_user_id", slack_user_id
-            ).execute()
-            if result.data and result.data[0].get("session_id"):
-                return result.data[0]["session_id"]
-        except Exception as e:
-            logger.error(f"Failed to get user session: {e}")
-    return memory_sessions.get(slack_user_id)
+    return await session_store.get(slack_user_id)
 
 
-def save_user_session(slack_user_id: str, session_id: str, username: str = None):
+async def save_user_session(slack_user_id: str, session_id: str, username: str = None):
     """Save session ID for a Slack user."""
-    memory_sessions[slack_user_id] = session_id
-
-    if supabase:
-        try:
-            supabase.table("slack_users").upsert({
-                "slack_user_id": slack_user_id,
-                "session_id": session_id,
-                "slack_username": username,
-                "updated_at": "now()"
-            }, on_conflict="slack_user_id").execute()
-        except Exception as e:
-            logger.error(f"Failed to save user session: {e}")
+    await session_store.save(slack_user_id, session_id, username)
 
 
-def clear_user_session(slack_user_id: str):
+async def clear_user_session(slack_user_id: str):
     """Clear session for a Slack user."""
-    if slack_user_id in memory_sessions:
-        del memory_sessions[slack_user_id]
+    await session_store.clear(slack_user_id)
 
-    if supabase:
-        try:
-            supabase.table("slack_users").update({
-                "session_id": None,
-                "updated_at": "now()"
-            }).eq("slack_user_id", slack_user_id).execute()
-        except Exception as e:
-            logger.error(f"Failed to clear user session: {e}")
 
+def caller_headers(user_id: str) -> dict:
+    """Identify the Slack user to the agent API, which shares its capacity fairly between callers."""
+    return {"X-Caller-ID": f"slack:{user_id}"}
 
-def call_agent(user_id: str, message: str, username: str = None) -> str:
-    """Call the marketing agent API (synchronous to avoid event loop conflicts)."""
-    session_id = get_user_session(user_id)
+
+def busy_message(error: Exception) -> str | None:
+    """A friendly reply when the agent API shed the request, else None."""
+    if isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 429:
+        retry_after = error.response.headers.get("Retry-After", "30")
+        return f"⏳ I'm handling a lot of requests right now. Please try again in about {retry_after} seconds."
+    return None
+
+
+async def call_agent(user_id: str, message: str, username: str = None) -> str:
+    """Call the marketing agent API."""
+    session_id = await get_user_session(user_id)
 
     payload = {"message": message}
     if session_id:
         payload["session_id"] = session_id
 
-    with httpx.Client(timeout=120.0) as client:
-        response = client.post(
-            f"{AGENT_API_URL}/agent/chat",
-            json=payload
-        )
+    response = await get_http_client().post(
+        f"{AGENT_API_URL}/agent/chat",
+        json=payload,
+        headers=caller_headers(user_id),
+        timeout=120.0
+    )
+    response.raise_for_status()
+    data = response.json()
+
+    # Save session for continuity
+    if "session_id" in data:
+        await save_user_session(user_id, data["session_id"], username)
+
+    return data.get("content", "Sorry, I couldn't generate a response.")
+
+
+# Minimum seconds between edits of a streaming reply (chat.update is rate limited)
+BOT_STREAM_UPDATE_INTERVAL = float(os.environ.get("BOT_STREAM_UPDATE_INTERVAL", "1.0"))
+
+# What to show while the agent is using a tool
+TOOL_STATUS = {
+    "Skill": "Loading a skill",
+    "WebSearch": "Searching the web",
+    "WebFetch": "Reading a web page",
+    "Read": "Reading files",
+    "Glob": "Looking through files",
+    "Grep": "Searching files",
+    "Write": "Writing a file",
+    "Bash": "Running a command",
+}
+
+
+async def stream_agent(user_id: str, message: str, username: str = None):
+    """Call the streaming agent API, yielding its events as they arrive."""
+    session_id = await get_user_session(user_id)
+
+    payload = {"message": message}
+    if session_id:
+        payload["session_id"] = session_id
+
+    saved = False
+    async with get_http_client().stream(
+        "POST",
+        f"{AGENT_API_URL}/agent/chat/stream",
+        json=payload,
+        headers=caller_headers(user_id),
+        timeout=120.0
+    ) as response:
         response.raise_for_status()
-        data = response.json()
+        async for event in iter_sse(response.aiter_lines()):
+            # Save session for continuity
+            if not saved and event.get("session_id"):
+                await save_user_session(user_id, event["session_id"], username)
+                saved = True
+            yield event
+
+
+async def reply_with_stream(
+    client,
+    channel: str,
+    user_id: str,
+    message: str,
+    username: str = None,
+    thread_ts: str = None,
+    placeholder: str = None
+):
+    """Answer in one Slack message that fills in as the agent writes."""
+    live = LiveMessage(client, channel, thread_ts, min_interval=BOT_STREAM_UPDATE_INTERVAL)
+    if placeholder:
+        await live.post(placeholder)
+
+    parts = []
+    try:
+        async for event in stream_agent(user_id, message, username):
+            if event["type"] == "text":
+                parts.append(event["content"])
+                live.set("".join(parts))
+            elif event["type"] == "tool_use":
+                status = f"_🔧 {TOOL_STATUS.get(event['tool'], 'Using ' + event['tool'])}..._"
+                live.set("".join(parts) + "\n\n" + status if parts else status)
+            elif event["type"] == "error":
+                if event.get("retry_after"):
+                    await live.finish(
+                        f"⏳ I'm handling a lot of requests right now. "
+                        f"Please try again in about {event['retry_after']} seconds."
+                    )
+                    return
+                raise RuntimeError(event.get("error"))
+    except Exception as e:
+        logger.error(f"Agent stream error: {e}")
+        await live.finish(busy_message(e) or "Sorry, something went wrong. Please try again.")
+        return
+
+    await live.finish("".join(parts) or "Sorry, I couldn't generate a response.")
 
-        # Save session for continuity
-        if "session_id" in data:
-            save_user_session(user_id, data["session_id"], username)
 
-        return data.get("content", "Sorry, I couldn't generate a response.")
+# Keyword routing table, optionally replaced by a JSON file of route -> phrases
+BOT_ROUTES_FILE = os.environ.get("BOT_ROUTES_FILE")
+router = IntentRouter.from_file(BOT_ROUTES_FILE) if BOT_ROUTES_FILE else IntentRouter()
 
 
 def is_video_request(message: str) -> bool:
     """Check if the message is requesting a video."""
-    video_keywords = [
-        r'\bvideo\b', r'\bremotio?n\b', r'\banimate\b', r'\banimation\b',
-        r'\bmp4\b', r'\brender\b', r'\bclip\b'
-    ]
-    message_lower = message.lower()
-    return any(re.search(kw, message_lower) for kw in video_keywords)
+    return router.matches(message, "video")
 
 
 def detect_content_type(message: str) -> str | None:
     """Detect content type from message keywords for skill routing."""
-    message_lower = message.lower()
-
-    patterns = {
-        # Existing content types
-        "linkedin": [r'\blinkedin\b', r'\blinked-in\b'],
-        "email": [r'\bemail\b', r'\be-mail\b', r'\bnewsletter\b'],
-        "seo": [r'\bseo\b', r'\bsearch engine\b', r'\bblog post\b', r'\barticle\b'],
-        "geo": [r'\bgeo\b', r'\bai citation\b', r'\bllm discovery\b'],
-        "landing-page": [r'\blanding page\b', r'\blanding-page\b', r'\bsales page\b'],
-        "direct-response": [r'\bdirect response\b', r'\bsales copy\b', r'\bad copy\b'],
-        # New skills
-        "linkedin-post": [r'\blinkedin post\b', r'\blinkedin content\b'],
-        "x-post": [r'\btweet\b', r'\btwitter\b', r'\bx post\b', r'\bx thread\b'],
-        "slides": [r'\bslides?\b', r'\bpresentation\b', r'\bpptx\b', r'\bpowerpoint\b', r'\bdeck\b'],
-        "diagram": [r'\bdiagram\b', r'\bflowchart\b', r'\barchitecture diagram\b', r'\bexcalidraw\b'],
-        "image": [r'\bgenerate image\b', r'\bcreate image\b', r'\bmockup\b', r'\bvisual\b', r'\bimagen\b'],
-        "brand-setup": [r'\bbrand system\b', r'\bbrand setup\b', r'\btone of voice\b', r'\bbrand identity\b'],
-        "sop": [r'\brunbook\b', r'\bplaybook\b', r'\bsop\b', r'\bdocumentation\b', r'\bprocedure\b'],
-        "skill": [r'\bcreate skill\b', r'\bnew skill\b', r'\bskill creator\b'],
-    }
-
-    for content_type, keywords in patterns.items():
-        if any(re.search(kw, message_lower) for kw in keywords):
-            return content_type
-    return None
+    match = router.route(message, exclude=("video",))
+    return match.route if match else None
 
 
 # Content types that need longer processing time
@@ -178,28 +272,29 @@ def is_slow_content_type(content_type: str) -> bool:
     return content_type in SLOW_CONTENT_TYPES
 
 
-def call_content_api(content_type: str, prompt: str, timeout: float = 120.0) -> str:
+async def call_content_api(content_type: str, prompt: str, timeout: float = 120.0, user_id: str = None) -> str:
     """Call /generate-content with specific content type for skill routing."""
     try:
-        with httpx.Client(timeout=timeout) as client:
-            response = client.post(
-                f"{AGENT_API_URL}/generate-content",
-                json={"content_type": content_type, "prompt": prompt}
-            )
-            response.raise_for_status()
-            return response.json().get("content", "Sorry, couldn't generate content.")
+        response = await get_http_client().post(
+            f"{AGENT_API_URL}/generate-content",
+            json={"content_type": content_type, "prompt": prompt},
+            headers=caller_headers(user_id) if user_id else None,
+            timeout=timeout
+        )
+        response.raise_for_status()
+        return response.json().get("content", "Sorry, couldn't generate content.")
     except Exception as e:
         logger.error(f"Content API error: {e}")
         raise
 
 
-def generate_slow_content(client, channel: str, user_id: str, content_type: str, message: str, username: str = None, thread_ts: str = None):
+async def generate_slow_content(client, channel: str, user_id: str, content_type: str, message: str, username: str = None, thread_ts: str = None):
     """Generate slow content types (slides, images, SEO) with longer timeout."""
     emoji, name, time_msg = CONTENT_TYPE_INFO.get(content_type, ("✍️", content_type, "This may take a moment."))
 
     try:
         # Use 300 second timeout for slow content
-        response = call_content_api(content_type, message, timeout=300.0)
+        response = await call_content_api(content_type, message, timeout=300.0, user_id=user_id)
 
         # Check if response contains a file path (for slides/images)
         if content_type == "slides" and ".pptx" in response:
@@ -209,7 +304,7 @@ def generate_slow_content(client, channel: str, user_id: str, content_type: str,
             if pptx_match:
                 file_path = pptx_match.group(1)
                 try:
-                    client.files_upload_v2(
+                    await client.files_upload_v2(
                         channel=channel,
                         thread_ts=thread_ts,
                         file=file_path,
@@ -227,7 +322,7 @@ def generate_slow_content(client, channel: str, user_id: str, content_type: str,
             if img_match:
                 file_path = img_match.group(1)
                 try:
-                    client.files_upload_v2(
+                    await client.files_upload_v2(
                         channel=channel,
                         thread_ts=thread_ts,
                         file=file_path,
@@ -240,17 +335,17 @@ def generate_slow_content(client, channel: str, user_id: str, content_type: str,
 
         # Default: just send the text response
         if thread_ts:
-            client.chat_postMessage(channel=channel, thread_ts=thread_ts, text=response)
+            await client.chat_postMessage(channel=channel, thread_ts=thread_ts, text=response)
         else:
-            client.chat_postMessage(channel=channel, text=response)
+            await client.chat_postMessage(channel=channel, text=response)
 
     except Exception as e:
         logger.error(f"Slow content generation error: {e}")
         error_msg = f"❌ Failed to generate {name}: {str(e)[:100]}"
         if thread_ts:
-            client.chat_postMessage(channel=channel, thread_ts=thread_ts, text=error_msg)
+            await client.chat_postMessage(channel=channel, thread_ts=thread_ts, text=error_msg)
         else:
-            client.chat_postMessage(channel=channel, text=error_msg)
+            await client.chat_postMessage(channel=channel, text=error_msg)
 
 
 def extract_typescript_code(content: str) -> str | None:
@@ -264,120 +359,106 @@ def extract_typescript_code(content: str) -> str | None:
     return None
 
 
-def render_video(code: str, composition_id: str = "GeneratedVideo") -> str | None:
-    """Render video from Remotion code. Returns path to rendered video."""
-    if not VIDEO_PROJECT_PATH.exists():
-        logger.error(f"Video project not found at {VIDEO_PROJECT_PATH}")
-        return None
-
+# Remotion renders, each in its own workspace, as many at once as cores and memory allow
+BOT_RENDER_MEMORY_MB = int(os.environ.get("BOT_RENDER_MEMORY_MB", "1024"))
+if os.environ.get("DOCKER_ENV"):
+    # Low memory mode for Railway: 720p, single-threaded
+    RENDER_FLAGS = ["--concurrency=1", "--scale=0.67"]
+    RENDER_SHELL_PREFIX = ""
+else:
+    # Locally npx might need nvm
+    RENDER_FLAGS = []
+    RENDER_SHELL_PREFIX = "source ~/.nvm/nvm.sh"
+
+# Finished videos keyed on code, settings, flags and public/ assets, so
+# regenerating identical code skips the render
+render_cache = None
+BOT_RENDER_CACHE_MAX_MB = int(os.environ.get("BOT_RENDER_CACHE_MAX_MB", "2048"))
+if BOT_RENDER_CACHE_MAX_MB > 0 and VIDEO_PROJECT_PATH.exists():
     try:
-        # Create temp file for the composition
-        temp_dir = VIDEO_PROJECT_PATH / "src" / "temp"
-        temp_dir.mkdir(exist_ok=True)
-
-        comp_file = temp_dir / f"{composition_id}.tsx"
-        comp_file.write_text(code)
-        logger.info(f"Wrote composition to {comp_file}")
-
-        # Create a temporary Root.tsx that includes our composition
-        # Using 900 frames (30 seconds at 30fps) to accommodate longer videos
-        temp_root = temp_dir / "TempRoot.tsx"
-        temp_root_content = '''import { Composition } from "remotion";
-import { COMP_NAME } from "./COMP_NAME";
-
-export const TempRoot = () => {
-  return (
-    <Composition
-      id="COMP_NAME"
-      component={COMP_NAME}
-      durationInFrames={900}
-      fps={30}
-      width={1920}
-      height={1080}
-    />
-  );
-};
-'''.replace("COMP_NAME", composition_id)
-        temp_root.write_text(temp_root_content)
-
-        # Create entry point with registerRoot (required by Remotion CLI)
-        temp_index = temp_dir / "index.ts"
-        temp_index.write_text(f'''
-import {{ registerRoot }} from "remotion";
-import {{ TempRoot }} from "./TempRoot";
-
-registerRoot(TempRoot);
-''')
-
-        # Output path
-        output_path = VIDEO_PROJECT_PATH / "out" / f"{composition_id}.mp4"
-        output_path.parent.mkdir(exist_ok=True)
-
-        # Run Remotion render (using temp/index.ts as entry point with registerRoot)
-        logger.info(f"Rendering video to {output_path}...")
-        logger.info(f"Working directory: {VIDEO_PROJECT_PATH}")
-        logger.info(f"VIDEO_PROJECT_PATH exists: {VIDEO_PROJECT_PATH.exists()}")
-
-        # In Docker, npx is in PATH. Locally might need nvm.
-        if os.environ.get("DOCKER_ENV"):
-            # Low memory mode for Railway: 720p, single-threaded
-            cmd = f'npx remotion render src/temp/index.ts {composition_id} "{output_path}" --concurrency=1 --scale=0.67'
-        else:
-            cmd = f'source ~/.nvm/nvm.sh && npx remotion render src/temp/index.ts {composition_id} "{output_path}"'
-        logger.info(f"Running command: {cmd}")
-
-        result = subprocess.run(
-            cmd,
-            cwd=str(VIDEO_PROJECT_PATH),  # Convert Path to string
-            capture_output=True,
-            text=True,
-            timeout=300,  # 5 minute timeout
-            shell=True,
-            executable='/bin/bash'
+        render_cache = RenderCache(
+            Path(os.environ.get("BOT_RENDER_CACHE_DIR", VIDEO_PROJECT_PATH / "out" / "cache")),
+            max_bytes=BOT_RENDER_CACHE_MAX_MB * 1024 * 1024,
+            assets=AssetFingerprint([VIDEO_PROJECT_PATH / "public", VIDEO_PROJECT_PATH / "package-lock.json"])
         )
+    except OSError as e:
+        logger.warning(f"Render cache disabled: {e}")
+
+render_pool = RenderPool(
+    VIDEO_PROJECT_PATH,
+    max_workers=int(os.environ.get("BOT_RENDER_WORKERS", "0")) or default_render_workers(
+        cpus_per_render=1 if RENDER_FLAGS else 2,
+        memory_per_render_mb=BOT_RENDER_MEMORY_MB
+    ),
+    render_flags=RENDER_FLAGS,
+    shell_prefix=RENDER_SHELL_PREFIX,
+    timeout=300,  # 5 minute timeout
+    cache=render_cache
+)
 
-        logger.info(f"Subprocess completed with return code: {result.returncode}")
 
-        if result.returncode != 0:
-            logger.error(f"Remotion render failed (exit code {result.returncode})")
-            logger.error(f"STDOUT: {result.stdout[:2000] if result.stdout else 'empty'}")
-            logger.error(f"STDERR: {result.stderr[:2000] if result.stderr else 'empty'}")
-            return None
+# Streamed uploads with per-step retries; videos over the budget are re-encoded first.
+# Remotion ships its own ffmpeg, used when the system has none.
+SYSTEM_FFMPEG = shutil.which("ffmpeg") and shutil.which("ffprobe")
+video_uploader = VideoUploader(
+    max_bytes=int(os.environ.get("BOT_UPLOAD_MAX_MB", "100")) * 1024 * 1024,
+    chunk_size=int(os.environ.get("BOT_UPLOAD_CHUNK_KB", "1024")) * 1024,
+    max_attempts=int(os.environ.get("BOT_UPLOAD_ATTEMPTS", "5")),
+    ffmpeg="ffmpeg" if SYSTEM_FFMPEG else "npx remotion ffmpeg",
+    ffprobe="ffprobe" if SYSTEM_FFMPEG else "npx remotion ffprobe",
+    tool_cwd=VIDEO_PROJECT_PATH,
+    shell_prefix="" if SYSTEM_FFMPEG else RENDER_SHELL_PREFIX
+)
 
-        if output_path.exists():
-            logger.info(f"Video rendered successfully: {output_path}")
-            return str(output_path)
-        else:
-            logger.error(f"Video file not created at {output_path}")
-            logger.error(f"STDOUT was: {result.stdout[:1000] if result.stdout else 'empty'}")
-            return None
 
-    except subprocess.TimeoutExpired:
-        logger.error("Video rendering timed out")
-        return None
-    except Exception as e:
-        logger.error(f"Error rendering video: {e}")
-        return None
+async def upload_video_to_slack(
+    client,
+    channel: str,
+    file_path: str,
+    title: str = "Base44 Video",
+    thread_ts: str = None
+) -> bool:
+    """Upload video file to Slack channel, showing progress while large files upload."""
+    status_ts = None
 
+    async def on_progress(sent: int, total: int):
+        nonlocal status_ts
+        text = f"📤 Uploading video... {sent * 100 // total}%"
+        try:
+            if status_ts:
+                await client.chat_update(channel=channel, ts=status_ts, text=text)
+            elif sent < total:
+                response = await client.chat_postMessage(channel=channel, thread_ts=thread_ts, text=text)
+                status_ts = response["ts"]
+        except Exception as e:
+            logger.warning(f"Failed to update upload progress: {e}")
 
-def upload_video_to_slack(client, channel: str, file_path: str, title: str = "Base44 Video") -> bool:
-    """Upload video file to Slack channel."""
     try:
-        response = client.files_upload_v2(
-            channel=channel,
-            file=file_path,
-            title=title,
-            initial_comment="🎬 Here's your video!"
+        file_id = await video_uploader.upload(
+            client,
+            get_http_client(),
+            channel,
+            file_path,
+            title,
+            initial_comment="🎬 Here's your video!",
+            thread_ts=thread_ts,
+            on_progress=on_progress
         )
-        logger.info(f"Video uploaded to Slack: {response['file']['id']}")
+        logger.info(f"Video uploaded to Slack: {file_id}")
         return True
-    except Exception as e:
+    except UploadError as e:
         logger.error(f"Failed to upload video to Slack: {e}")
         return False
+    finally:
+        if status_ts:
+            try:
+                await client.chat_delete(channel=channel, ts=status_ts)
+            except Exception as e:
+                logger.warning(f"Failed to remove upload progress message: {e}")
 
 
-def generate_and_send_video(client, channel: str, user_id: str, message: str, username: str = None, thread_ts: str = None):
-    """Generate video and send to Slack (synchronous)."""
+async def generate_and_send_video(client, channel: str, user_id: str, message: str, username: str = None, thread_ts: str = None):
+    """Generate video and send to Slack."""
     try:
         # Step 1: Generate video code
         video_prompt = f"""```typescript
@@ -422,7 +503,7 @@ RULES:
 - NO CSS animations - only useCurrentFrame() driven animations"""
 
         logger.info("Generating video code...")
-        content = call_agent(user_id, video_prompt, username)
+        content = await call_agent(user_id, video_prompt, username)
         logger.info(f"Agent response length: {len(content)} chars")
         logger.info(f"Agent response preview: {content[:500]}...")
 
@@ -431,122 +512,209 @@ RULES:
         logger.info(f"Extracted code: {'Yes, ' + str(len(code)) + ' chars' if code else 'No code found'}")
         if not code:
             if thread_ts:
-                client.chat_postMessage(channel=channel, thread_ts=thread_ts,
+                await client.chat_postMessage(channel=channel, thread_ts=thread_ts,
                     text="❌ Couldn't generate valid video code. Here's what I got:\n\n" + content[:1000])
             else:
-                client.chat_postMessage(channel=channel,
+                await client.chat_postMessage(channel=channel,
                     text="❌ Couldn't generate valid video code. Try a simpler request.")
             return
 
-        # Step 3: Render video
+        # Step 3: Render video (the rendered file is deleted after upload)
         logger.info("Rendering video (this may take a minute)...")
-        video_path = render_video(code, "GeneratedVideo")
-
-        if not video_path:
-            if thread_ts:
-                client.chat_postMessage(channel=channel, thread_ts=thread_ts,
-                    text="❌ Video rendering failed. The code was generated but couldn't be rendered.")
-            else:
-                client.chat_postMessage(channel=channel,
-                    text="❌ Video rendering failed.")
-            return
-
-        # Step 4: Upload to Slack
-        logger.info("Uploading video to Slack...")
-        success = upload_video_to_slack(client, channel, video_path, "Base44 Video")
+        async with render_pool.render(code) as video_path:
+            if not video_path:
+                if thread_ts:
+                    await client.chat_postMessage(channel=channel, thread_ts=thread_ts,
+                        text="❌ Video rendering failed. The code was generated but couldn't be rendered.")
+                else:
+                    await client.chat_postMessage(channel=channel,
+                        text="❌ Video rendering failed.")
+                return
+
+            # Step 4: Upload to Slack
+            logger.info("Uploading video to Slack...")
+            success = await upload_video_to_slack(client, channel, video_path, "Base44 Video", thread_ts)
 
         if not success:
             if thread_ts:
-                client.chat_postMessage(channel=channel, thread_ts=thread_ts,
+                await client.chat_postMessage(channel=channel, thread_ts=thread_ts,
                     text="❌ Video was rendered but upload failed.")
             else:
-                client.chat_postMessage(channel=channel,
+                await client.chat_postMessage(channel=channel,
                     text="❌ Video was rendered but upload failed.")
 
     except Exception as e:
         logger.error(f"Video generation error: {e}")
         if thread_ts:
-            client.chat_postMessage(channel=channel, thread_ts=thread_ts,
+            await client.chat_postMessage(channel=channel, thread_ts=thread_ts,
                 text=f"❌ Error generating video: {str(e)[:200]}")
         else:
-            client.chat_postMessage(channel=channel,
+            await client.chat_postMessage(channel=channel,
                 text=f"❌ Error generating video: {str(e)[:200]}")
 
 
-def get_username(client, user_id: str) -> str:
-    """Get username from Slack user ID."""
-    try:
-        result = client.users_info(user=user_id)
-        if result["ok"]:
-            return result["user"]["real_name"] or result["user"]["name"]
-    except Exception:
-        pass
-    return None
+# Display names for session records, kept in memory
+profile_cache = ProfileCache(ttl_seconds=float(os.environ.get("BOT_PROFILE_CACHE_TTL", "3600")))
 
 
-@app.event("app_mention")
-def handle_mention(event, say, client):
-    """Handle @MarketingBot mentions in channels."""
-    user_id = event["user"]
-    text = event["text"]
-    channel = event["channel"]
-    thread_ts = event.get("thread_ts") or event["ts"]
-    username = get_username(client, user_id)
+def get_username(client, user_id: str) -> str:
+    """Get username from Slack user ID (memory read, refreshed in the background)."""
+    return profile_cache.get(client, user_id)
+
+
+# ==================== Job Dispatch ====================
+
+# Separate bounded pools so renders and long articles never hold up chat
+job_runner = JobRunner({
+    "video": JobPool(
+        "video",
+        # Twice the render slots, so code generation overlaps with renders
+        concurrency=int(os.environ.get("BOT_VIDEO_WORKERS", "0")) or render_pool.max_workers * 2,
+        max_queue=int(os.environ.get("BOT_VIDEO_QUEUE_SIZE", "10"))
+    ),
+    "slow": JobPool(
+        "slow",
+        concurrency=int(os.environ.get("BOT_SLOW_WORKERS", "4")),
+        max_queue=int(os.environ.get("BOT_SLOW_QUEUE_SIZE", "50"))
+    ),
+    "chat": JobPool(
+        "chat",
+        concurrency=int(os.environ.get("BOT_CHAT_WORKERS", "32")),
+        max_queue=int(os.environ.get("BOT_CHAT_QUEUE_SIZE", "500"))
+    ),
+})
+
+JOB_CLASS_LABELS = {
+    "video": "video",
+    "slow": "long-running content",
+    "chat": "chat",
+}
 
-    # Remove the bot mention from the message
-    message = text.split(">", 1)[-1].strip() if ">" in text else text
 
-    if not message:
-        say("Hi! How can I help with your marketing today?", thread_ts=thread_ts)
+async def submit_job(job_class: str, user_id: str, description: str, work, reply) -> None:
+    """
+    Queue work on its job pool and reply right away.
+
+    If the pool is busy the user is told their place in the queue. The
+    work itself posts its own progress and results once it starts.
+    """
+    label = JOB_CLASS_LABELS[job_class]
+    try:
+        position = job_runner.submit(Job(job_class, user_id, description, work))
+    except JobQueueFullError:
+        await reply(f"⏳ The {label} queue is full right now. Please try again in a few minutes.")
         return
 
+    if position > 0:
+        await reply(f"⏳ You're #{position} in the {label} queue. I'll start as soon as a slot frees up.")
+
+
+async def dispatch_request(
+    client,
+    reply,
+    channel: str,
+    user_id: str,
+    message: str,
+    username: str = None,
+    thread_ts: str = None,
+    thinking: bool = True,
+    when_ready: str = "",
+    stream: bool = False
+):
+    """
+    Route a message to the video, slow-content or chat job pool.
+
+    Args:
+        client: Slack web client, for posting results to the channel
+        reply: Coroutine function that sends a text reply to the user
+        channel: Channel to post files and long results to
+        thread_ts: Thread to post results in, if any
+        thinking: Send a "Thinking..." message before chat replies
+        when_ready: Suffix for the start message of long jobs
+        stream: Show chat replies in one message edited as the agent writes,
+            instead of waiting for the full reply (needs chat:write in `channel`)
+    """
     # Check if this is a video request
     if is_video_request(message):
-        say("🎬 Generating video... This may take 1-2 minutes.", thread_ts=thread_ts)
-        try:
-            generate_and_send_video(client, channel, user_id, message, username, thread_ts)
-        except Exception as e:
-            logger.error(f"Video generation error: {e}")
-            say(f"❌ Video generation failed: {str(e)[:100]}", thread_ts=thread_ts)
+        async def run_video():
+            await reply(f"🎬 Generating video... This may take 1-2 minutes.{when_ready}")
+            try:
+                await generate_and_send_video(client, channel, user_id, message, username, thread_ts)
+            except Exception as e:
+                logger.error(f"Video generation error: {e}")
+                await reply(f"❌ Video generation failed: {str(e)[:100]}")
+
+        await submit_job("video", user_id, "video", run_video, reply)
         return
 
     # Check for content type keywords for skill routing
     content_type = detect_content_type(message)
-    if content_type:
-        # Handle slow content types (slides, images, SEO) with async pattern
-        if is_slow_content_type(content_type):
-            emoji, name, time_msg = CONTENT_TYPE_INFO.get(content_type, ("✍️", content_type, ""))
-            say(f"{emoji} Generating {name}... {time_msg}", thread_ts=thread_ts)
+
+    # Handle slow content types (slides, images, SEO) on their own pool
+    if content_type and is_slow_content_type(content_type):
+        emoji, name, time_msg = CONTENT_TYPE_INFO.get(content_type, ("✍️", content_type, ""))
+
+        async def run_slow():
+            await reply(f"{emoji} Generating {name}... {time_msg}{when_ready}")
             try:
-                generate_slow_content(client, channel, user_id, content_type, message, username, thread_ts)
+                await generate_slow_content(client, channel, user_id, content_type, message, username, thread_ts)
             except Exception as e:
                 logger.error(f"Slow content error: {e}")
-                say(f"❌ Failed to generate {name}: {str(e)[:100]}", thread_ts=thread_ts)
-            return
+                await reply(busy_message(e) or f"❌ Failed to generate {name}: {str(e)[:100]}")
 
-        # Fast content types
-        say(f"✍️ Creating {content_type} content...", thread_ts=thread_ts)
+        await submit_job("slow", user_id, content_type, run_slow, reply)
+        return
+
+    # Fast content types and regular text requests (stateful chat)
+    async def run_chat():
         try:
-            response = call_content_api(content_type, message)
-            say(response, thread_ts=thread_ts)
+            if content_type:
+                await reply(f"✍️ Creating {content_type} content...")
+                response = await call_content_api(content_type, message, user_id=user_id)
+            elif stream:
+                await reply_with_stream(
+                    client, channel, user_id, message, username, thread_ts,
+                    placeholder="🤔 Thinking..." if thinking else None
+                )
+                return
+            else:
+                if thinking:
+                    await reply("🤔 Thinking...")
+                response = await call_agent(user_id, message, username)
+            await reply(response)
         except Exception as e:
-            logger.error(f"Content API error: {e}")
-            say(f"Sorry, something went wrong. Please try again.", thread_ts=thread_ts)
+            logger.error(f"Agent error: {e}")
+            await reply(busy_message(e) or "Sorry, something went wrong. Please try again.")
+
+    await submit_job("chat", user_id, content_type or "chat", run_chat, reply)
+
+
+# ==================== Slack Handlers ====================
+
+@app.event("app_mention")
+async def handle_mention(event, say, client):
+    """Handle @MarketingBot mentions in channels."""
+    user_id = event["user"]
+    text = event["text"]
+    channel = event["channel"]
+    thread_ts = event.get("thread_ts") or event["ts"]
+    username = get_username(client, user_id)
+
+    # Remove the bot mention from the message
+    message = text.split(">", 1)[-1].strip() if ">" in text else text
+
+    if not message:
+        await say("Hi! How can I help with your marketing today?", thread_ts=thread_ts)
         return
 
-    # Regular text request (stateful chat)
-    say("🤔 Thinking...", thread_ts=thread_ts)
+    async def reply(text: str):
+        await say(text, thread_ts=thread_ts)
 
-    try:
-        response = call_agent(user_id, message, username)
-        say(response, thread_ts=thread_ts)
-    except Exception as e:
-        logger.error(f"Agent error: {e}")
-        say(f"Sorry, something went wrong. Please try again.", thread_ts=thread_ts)
+    await dispatch_request(client, reply, channel, user_id, message, username, thread_ts, stream=True)
 
 
 @app.event("message")
-def handle_dm(event, say, client):
+async def handle_dm(event, say, client):
     """Handle direct messages to the bot."""
     # Ignore bot messages and channel messages
     if event.get("bot_id") or event.get("channel_type") != "im":
@@ -560,53 +728,20 @@ def handle_dm(event, say, client):
     if not message:
         return
 
-    # Check if this is a video request
-    if is_video_request(message):
-        say("🎬 Generating video... This may take 1-2 minutes.")
-        try:
-            generate_and_send_video(client, channel, user_id, message, username)
-        except Exception as e:
-            logger.error(f"Video generation error: {e}")
-            say(f"❌ Video generation failed: {str(e)[:100]}")
-        return
-
-    # Check for content type keywords for skill routing
-    content_type = detect_content_type(message)
-    if content_type:
-        # Handle slow content types (slides, images, SEO) with async pattern
-        if is_slow_content_type(content_type):
-            emoji, name, time_msg = CONTENT_TYPE_INFO.get(content_type, ("✍️", content_type, ""))
-            say(f"{emoji} Generating {name}... {time_msg}")
-            try:
-                generate_slow_content(client, channel, user_id, content_type, message, username)
-            except Exception as e:
-                logger.error(f"Slow content error: {e}")
-                say(f"❌ Failed to generate {name}: {str(e)[:100]}")
-            return
+    await dispatch_request(client, say, channel, user_id, message, username, thinking=False, stream=True)
 
-        # Fast content types
-        say(f"✍️ Creating {content_type} content...")
-        try:
-            response = call_content_api(content_type, message)
-            say(response)
-        except Exception as e:
-            logger.error(f"Content API error: {e}")
-            say("Sorry, something went wrong. Please try again.")
-        return
 
-    # Regular text request (stateful chat)
-    try:
-        response = call_agent(user_id, message, username)
-        say(response)
-    except Exception as e:
-        logger.error(f"Agent error: {e}")
-        say("Sorry, something went wrong. Please try again.")
+@app.event("user_change")
+@app.event("team_join")
+async def handle_user_change(event):
+    """Keep cached profiles current when users join or edit their profile."""
+    profile_cache.handle_event(event["user"])
 
 
 @app.command("/marketing")
-def handle_slash_command(ack, respond, command, client):
+async def handle_slash_command(ack, respond, command, client):
     """Handle /marketing slash command."""
-    ack()
+    await ack()
 
     user_id = command["user_id"]
     channel_id = command["channel_id"]
@@ -614,68 +749,29 @@ def handle_slash_command(ack, respond, command, client):
     username = get_username(client, user_id)
 
     if not message:
-        respond("Usage: `/marketing <your request>`\n\nExamples:\n• `/marketing Write a LinkedIn post about AI consulting`\n• `/marketing video about Base44 speed and simplicity`")
+        await respond("Usage: `/marketing <your request>`\n\nExamples:\n• `/marketing Write a LinkedIn post about AI consulting`\n• `/marketing video about Base44 speed and simplicity`")
         return
 
-    # Check if this is a video request
-    if is_video_request(message):
-        respond("🎬 Generating video... This may take 1-2 minutes. I'll post it when ready!")
-        try:
-            generate_and_send_video(client, channel_id, user_id, message, username)
-        except Exception as e:
-            logger.error(f"Video generation error: {e}")
-            respond(f"❌ Video generation failed: {str(e)[:100]}")
-        return
-
-    # Check for content type keywords for skill routing
-    content_type = detect_content_type(message)
-    if content_type:
-        # Handle slow content types (slides, images, SEO) with async pattern
-        if is_slow_content_type(content_type):
-            emoji, name, time_msg = CONTENT_TYPE_INFO.get(content_type, ("✍️", content_type, ""))
-            respond(f"{emoji} Generating {name}... {time_msg} I'll post it when ready!")
-            try:
-                generate_slow_content(client, channel_id, user_id, content_type, message, username)
-            except Exception as e:
-                logger.error(f"Slow content error: {e}")
-                respond(f"❌ Failed to generate {name}: {str(e)[:100]}")
-            return
-
-        # Fast content types
-        respond(f"✍️ Creating {content_type} content...")
-        try:
-            response = call_content_api(content_type, message)
-            respond(response)
-        except Exception as e:
-            logger.error(f"Content API error: {e}")
-            respond("Sorry, something went wrong. Please try again.")
-        return
-
-    # Regular text request (stateful chat)
-    respond("🤔 Thinking...")
-
-    try:
-        response = call_agent(user_id, message, username)
-        respond(response)
-    except Exception as e:
-        logger.error(f"Agent error: {e}")
-        respond("Sorry, something went wrong. Please try again.")
+    await dispatch_request(
+        client, respond, channel_id, user_id, message, username,
+        when_ready=" I'll post it when ready!"
+    )
 
 
 @app.command("/clear")
-def handle_clear(ack, respond, command):
+async def handle_clear(ack, respond, command):
     """Clear conversation history for the user."""
-    ack()
+    await ack()
     user_id = command["user_id"]
 
-    clear_user_session(user_id)
-    respond("✅ Conversation cleared! I've forgotten our previous chat.")
+    await clear_user_session(user_id)
+    await respond("✅ Conversation cleared! I've forgotten our previous chat.")
 
 
 @app.command("/video")
-def handle_video_command(ack, respond, command, client):
+async def handle_video_command(ack, respond, command, client):
     """Handle /video slash command for video generation."""
-    ack()
+    await ack()
 
     user_id = command["user_id"]
     channel_id = command["channel_id"]
@@ -683,23 +779,84 @@ def handle_video_command(ack, respond, command, client):
     username = get_username(client, user_id)
 
     if not message:
-        respond("Usage: `/video <description>`\n\nExamples:\n• `/video Base44 speed and simplicity`\n• `/video $350K Salesforce contract terminated`\n• `/video AI app builder for small business`")
+        await respond("Usage: `/video <description>`\n\nExamples:\n• `/video Base44 speed and simplicity`\n• `/video $350K Salesforce contract terminated`\n• `/video AI app builder for small business`")
         return
 
-    respond("🎬 Generating video... This may take 1-2 minutes. I'll post it when ready!")
+    async def run_video():
+        await respond("🎬 Generating video... This may take 1-2 minutes. I'll post it when ready!")
+        try:
+            await generate_and_send_video(client, channel_id, user_id, message, username)
+        except Exception as e:
+            logger.error(f"Video generation error: {e}")
+            await respond(f"❌ Video generation failed: {str(e)[:100]}")
+
+    await submit_job("video", user_id, "video", run_video, respond)
 
-    try:
-        generate_and_send_video(client, channel_id, user_id, message, username)
-    except Exception as e:
-        logger.error(f"Video generation error: {e}")
-        respond(f"❌ Video generation failed: {str(e)[:100]}")
 
+@app.command("/queue")
+async def handle_queue_command(ack, respond):
+    """Show how busy each job pool is and how the session cache is doing."""
+    await ack()
+
+    lines = ["*Job queues*"]
+    for job_class, stats in job_runner.stats().items():
+        lines.append(
+            f"• {JOB_CLASS_LABELS[job_class]}: {stats['busy']}/{stats['workers']} running, "
+            f"{stats['queued']} waiting"
+        )
+
+    renders = render_pool.stats()
+    lines.append(
+        f"*Renders*: {renders['running']}/{renders['workers']} running, {renders['waiting']} waiting"
+    )
+    if renders["cache"]:
+        lines.append(
+            f"*Render cache*: {renders['cache']['entries']} videos "
+            f"({renders['cache']['bytes'] // (1024 * 1024)} MB), hit rate {renders['cache']['hit_rate']}"
+        )
+
+    uploads = video_uploader.stats()
+    lines.append(
+        f"*Uploads*: {uploads['uploads']} done, {uploads['failures']} failed, "
+        f"{uploads['retries']} retries, {uploads['transcodes']} transcoded"
+    )
+
+    profiles = profile_cache.stats()
+    lines.append(
+        f"*Profile cache*: {profiles['entries']} users, hit rate {profiles['hit_rate']}, "
+        f"{profiles['fetches']} background fetches"
+    )
+
+    cache = session_store.stats()
+    lines.append(
+        f"*Session cache*: {cache['entries']} users, hit rate {cache['hit_rate']}, "
+        f"{cache['evictions']} evicted, {cache['writes_skipped']} unchanged saves skipped"
+    )
+    await respond("\n".join(lines))
+
+
+async def main():
+    """Run the bot until interrupted."""
+    await init_supabase()
+    render_pool.cleanup_stale()
+    await job_runner.start()
+    # Fill the profile cache without delaying startup
+    warm_task = asyncio.create_task(profile_cache.warm(app.client))
 
-if __name__ == "__main__":
     # Socket Mode uses WebSocket - no public URL needed
-    handler = SocketModeHandler(
+    handler = AsyncSocketModeHandler(
         app,
         os.environ.get("SLACK_APP_TOKEN")
     )
     logger.info("Starting Slack bot in Socket Mode...")
-    handler.start()
+    try:
+        await handler.start_async()
+    finally:
+        warm_task.cancel()
+        await job_runner.stop()
+        if http_client:
+            await http_client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
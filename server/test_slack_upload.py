@@ -1,31 +1,45 @@
 #!/usr/bin/env python3
 """Test uploading a video to Slack."""
 
+import asyncio
 import os
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
+
+import httpx
+from slack_sdk.web.async_client import AsyncWebClient
+
+from bot import UploadError, VideoUploader
 
 # Load from environment
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 
-def upload_video_to_slack(file_path: str, channel: str, title: str = "Video"):
-    """Upload a video file to Slack."""
-    client = WebClient(token=SLACK_BOT_TOKEN)
-
-    try:
-        # Use files_upload_v2 for larger files
-        response = client.files_upload_v2(
-            channel=channel,
-            file=file_path,
-            title=title,
-            initial_comment=f"Here's your video: {title}"
-        )
-        print(f"✅ Video uploaded successfully!")
-        print(f"   File ID: {response['file']['id']}")
-        return response
-    except SlackApiError as e:
-        print(f"❌ Error uploading: {e.response['error']}")
-        raise
+
+async def print_progress(sent: int, total: int):
+    print(f"   {sent * 100 // total}% ({sent / (1024 * 1024):.1f} MB)")
+
+
+async def upload_video_to_slack(file_path: str, channel: str, title: str = "Video"):
+    """Upload a video file to Slack in chunks, retrying transient failures."""
+    client = AsyncWebClient(token=SLACK_BOT_TOKEN)
+    uploader = VideoUploader(progress_interval=1.0)
+
+    async with httpx.AsyncClient() as http:
+        try:
+            file_id = await uploader.upload(
+                client,
+                http,
+                channel,
+                file_path,
+                title,
+                initial_comment=f"Here's your video: {title}",
+                on_progress=print_progress
+            )
+        except UploadError as e:
+            print(f"❌ Error uploading: {e}")
+            raise
+    print(f"✅ Video uploaded successfully!")
+    print(f"   File ID: {file_id}")
+    print(f"   Stats: {uploader.stats()}")
+    return file_id
 
 if __name__ == "__main__":
     import sys
@@ -46,4 +60,4 @@ if __name__ == "__main__":
     # You can find this in Slack: click your profile > ... > Copy member ID
     channel = input("Enter Slack channel ID or your user ID for DM: ").strip()
 
-    upload_video_to_slack(video_path, channel, "Test Base44 Video")
+    asyncio.run(upload_video_to_slack(video_path, channel, "Test Base44 Video"))
@@ -2,6 +2,10 @@
 """
 Upload rendered video to Slack.
 
+Streams the file in chunks with retries, and re-encodes videos larger than
+SLACK_UPLOAD_MAX_MB (default 100) before uploading. Needs the server
+requirements installed (the uploader lives in server/bot).
+
 Usage:
     SLACK_BOT_TOKEN=xoxb-... python upload_to_slack.py <channel_id> [video_path]
 
@@ -9,8 +13,39 @@ Example:
     SLACK_BOT_TOKEN=xoxb-123... python upload_to_slack.py C0123456789 out/test.mp4
 """
 
+import asyncio
 import os
 import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "server"))
+
+
+async def print_progress(sent: int, total: int):
+    print(f"   {sent * 100 // total}% ({sent / (1024 * 1024):.1f} MB)")
+
+
+async def upload(token: str, channel: str, video_path: str) -> str:
+    import httpx
+    from slack_sdk.web.async_client import AsyncWebClient
+
+    from bot import VideoUploader
+
+    uploader = VideoUploader(
+        max_bytes=int(os.getenv("SLACK_UPLOAD_MAX_MB", "100")) * 1024 * 1024,
+        progress_interval=1.0
+    )
+    async with httpx.AsyncClient() as http:
+        return await uploader.upload(
+            AsyncWebClient(token=token),
+            http,
+            channel,
+            video_path,
+            "Base44 Video",
+            initial_comment="🎬 Here's your Base44 video!",
+            on_progress=print_progress
+        )
+
 
 def main():
     token = os.getenv("SLACK_BOT_TOKEN")
@@ -37,26 +72,16 @@ def main():
     print(f"📤 Uploading to channel: {channel}")
 
     try:
-        from slack_sdk import WebClient
-        from slack_sdk.errors import SlackApiError
-
-        client = WebClient(token=token)
-
-        response = client.files_upload_v2(
-            channel=channel,
-            file=video_path,
-            title="Base44 Video",
-            initial_comment="🎬 Here's your Base44 video!"
-        )
+        file_id = asyncio.run(upload(token, channel, video_path))
 
         print(f"✅ Upload successful!")
-        print(f"   File ID: {response['file']['id']}")
+        print(f"   File ID: {file_id}")
 
-    except ImportError:
-        print("❌ slack_sdk not installed. Run: pip install slack_sdk")
+    except ImportError as e:
+        print(f"❌ Missing dependency ({e.name}). Run: pip install -r ../server/requirements.txt")
         sys.exit(1)
-    except SlackApiError as e:
-        print(f"❌ Slack error: {e.response['error']}")
+    except Exception as e:
+        print(f"❌ Slack error: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":